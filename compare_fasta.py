@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Script para comparar en lote las secuencias de un archivo multi-FASTA
+Los pares se identifican por encabezado: >ID|original y >ID|mutated
+"""
+import argparse
+import json
+import os
+import sys
+
+# Agregar el directorio raíz del proyecto al Python path
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+def parse_args():
+    """Lee los argumentos de la línea de comandos"""
+    parser = argparse.ArgumentParser(description="Compara pares de secuencias de un archivo multi-FASTA")
+    parser.add_argument('fasta', help="Archivo FASTA (.fasta, .fa o .gz); '-' para leer de stdin")
+    parser.add_argument('--save', action='store_true', help="Guardar las comparaciones válidas en la base de datos")
+    parser.add_argument('--username', help="Usuario dueño de las comparaciones (requerido con --save)")
+    parser.add_argument('--email', help="Email del usuario (requerido con --save)")
+    parser.add_argument('--processes', type=int, default=None, help="Procesos para validar en paralelo")
+    parser.add_argument('--json', action='store_true', help="Imprimir un resultado JSON por línea")
+    args = parser.parse_args()
+    
+    if args.save and not (args.username and args.email):
+        parser.error("--save requiere --username y --email")
+    
+    return args
+
+def run(args, manager) -> bool:
+    """
+    Procesa el archivo e imprime un resultado por par
+    
+    Returns:
+        False si el archivo está mal formado (los pares anteriores ya se imprimieron)
+    """
+    from src.data.fasta_reader import FastaFormatError, open_fasta
+    
+    stream = sys.stdin if args.fasta == '-' else open_fasta(args.fasta)
+    total = valid = 0
+    readable = True
+    
+    try:
+        for result in manager.iter_fasta_comparisons(
+            stream, username=args.username, email=args.email,
+            save=args.save, processes=args.processes
+        ):
+            total += 1
+            valid += result['valid']
+            
+            if args.json:
+                print(json.dumps(result, ensure_ascii=False))
+            elif result['valid']:
+                saved = f" (ID {result['comparison_id']})" if result['comparison_id'] else ""
+                print(f"✅ {result['pair_id']}: {result['description']}{saved}")
+            else:
+                print(f"❌ {result['pair_id']}: {'; '.join(result['errors'])}")
+    except (FastaFormatError, UnicodeDecodeError) as e:
+        print(f"❌ Archivo FASTA no válido: {e}", file=sys.stderr)
+        readable = False
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    
+    print(f"📊 Pares procesados: {total} | válidos: {valid} | inválidos: {total - valid}", file=sys.stderr)
+    return readable
+
+def main():
+    """Función principal"""
+    args = parse_args()
+    
+    from src.business.comparison_manager import ComparisonManager
+    manager = ComparisonManager()
+    
+    if not args.save:
+        readable = run(args, manager)
+    else:
+        # Guardar requiere el contexto de la aplicación Flask (base de datos)
+        from src.presentation.app import create_app
+        app = create_app('development')
+        with app.app_context():
+            readable = run(args, manager)
+    
+    if not readable:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
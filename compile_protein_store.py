@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Script para compilar la base de datos de proteínas conocidas al formato binario
+Acepta el JSON editable (data/known_proteins/protein_database.json) o un volcado FASTA de UniProt
+"""
+import argparse
+import os
+import sys
+import time
+
+# Agregar el directorio raíz del proyecto al Python path
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+def parse_args():
+    """Lee los argumentos de la línea de comandos"""
+    default_source = os.path.join(project_root, 'data', 'known_proteins', 'protein_database.json')
+    parser = argparse.ArgumentParser(description="Compila la base de datos de proteínas a un almacén binario (mmap)")
+    parser.add_argument('source', nargs='?', default=default_source,
+                        help="Archivo JSON o FASTA (.fasta, .fa o .gz) de origen")
+    parser.add_argument('--output', help="Ruta del almacén (por defecto, junto al origen con extensión .store)")
+    return parser.parse_args()
+
+def main():
+    """Función principal"""
+    args = parse_args()
+    
+    from src.data.protein_store import ProteinStore, compile_fasta, compile_json
+    
+    start = time.perf_counter()
+    if args.source.endswith('.json'):
+        store_path = compile_json(args.source, args.output)
+    else:
+        store_path = compile_fasta(args.source, args.output)
+    elapsed = time.perf_counter() - start
+    
+    store = ProteinStore(store_path)
+    print(f"✅ Almacén generado: {store_path}")
+    print(f"📊 Proteínas: {len(store)} | tamaño: {os.path.getsize(store_path) / 1e6:.1f} MB | tiempo: {elapsed:.2f} s")
+    store.close()
+
+if __name__ == '__main__':
+    main()
@@ -28,6 +28,31 @@ class Config:
     API_TIMEOUT = int(os.environ.get('API_TIMEOUT', '300'))  # 5 minutos por defecto
     MAX_SEQUENCE_LENGTH = int(os.environ.get('MAX_SEQUENCE_LENGTH', '2000'))
     ENABLE_ALPHAFOLD = os.environ.get('ENABLE_ALPHAFOLD', 'true').lower() == 'true'
+    
+    # Segundos entre comprobaciones de cambios en la base de datos de proteínas conocidas (0 = no recargar)
+    PROTEIN_DB_RELOAD_INTERVAL = float(os.environ.get('PROTEIN_DB_RELOAD_INTERVAL', '5'))
+    
+    # Procesos entre los que se reparte la búsqueda por similitud (0 = en el propio proceso)
+    PROTEIN_DB_SEARCH_SHARDS = int(os.environ.get('PROTEIN_DB_SEARCH_SHARDS', '0'))
+    
+    # Sondeo de ColabFold en segundo plano: segundos entre sondeos, fallos seguidos que
+    # abren el circuito, segundos con el circuito abierto antes de volver a probar y
+    # segundos que el arranque espera al primer sondeo
+    COLABFOLD_HEALTH_TTL = float(os.environ.get('COLABFOLD_HEALTH_TTL', '30'))
+    COLABFOLD_FAILURE_THRESHOLD = int(os.environ.get('COLABFOLD_FAILURE_THRESHOLD', '3'))
+    COLABFOLD_RECOVERY_TIMEOUT = float(os.environ.get('COLABFOLD_RECOVERY_TIMEOUT', '60'))
+    COLABFOLD_STARTUP_WAIT = float(os.environ.get('COLABFOLD_STARTUP_WAIT', '2'))
+    
+    # Conexiones HTTP simultáneas por host (una por hilo de trabajo) y reintentos de los GET
+    HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', '10'))
+    HTTP_RETRIES = int(os.environ.get('HTTP_RETRIES', '3'))
+    
+    # Tamaño máximo de la caché de predicciones en models/alphafold/cache (0 = sin caché)
+    PREDICTION_CACHE_MAX_BYTES = int(os.environ.get('PREDICTION_CACHE_MAX_BYTES', str(1 << 30)))
+    
+    # Segundos que se guardan los metadatos de AlphaFold DB por UniProt (encontrados / sin modelo)
+    AFDB_METADATA_TTL = float(os.environ.get('AFDB_METADATA_TTL', str(7 * 86400)))
+    AFDB_NEGATIVE_TTL = float(os.environ.get('AFDB_NEGATIVE_TTL', '86400'))
 
 class DevelopmentConfig(Config):
     """Configuración para desarrollo"""
@@ -57,5 +82,16 @@ def get_config_dict(config_name='development'):
         'MODELS_DIRECTORY': config_class.MODELS_DIRECTORY,
         'API_TIMEOUT': config_class.API_TIMEOUT,
         'MAX_SEQUENCE_LENGTH': config_class.MAX_SEQUENCE_LENGTH,
-        'ENABLE_ALPHAFOLD': config_class.ENABLE_ALPHAFOLD
+        'ENABLE_ALPHAFOLD': config_class.ENABLE_ALPHAFOLD,
+        'PROTEIN_DB_RELOAD_INTERVAL': config_class.PROTEIN_DB_RELOAD_INTERVAL,
+        'PROTEIN_DB_SEARCH_SHARDS': config_class.PROTEIN_DB_SEARCH_SHARDS,
+        'COLABFOLD_HEALTH_TTL': config_class.COLABFOLD_HEALTH_TTL,
+        'COLABFOLD_FAILURE_THRESHOLD': config_class.COLABFOLD_FAILURE_THRESHOLD,
+        'COLABFOLD_RECOVERY_TIMEOUT': config_class.COLABFOLD_RECOVERY_TIMEOUT,
+        'COLABFOLD_STARTUP_WAIT': config_class.COLABFOLD_STARTUP_WAIT,
+        'HTTP_POOL_SIZE': config_class.HTTP_POOL_SIZE,
+        'HTTP_RETRIES': config_class.HTTP_RETRIES,
+        'PREDICTION_CACHE_MAX_BYTES': config_class.PREDICTION_CACHE_MAX_BYTES,
+        'AFDB_METADATA_TTL': config_class.AFDB_METADATA_TTL,
+        'AFDB_NEGATIVE_TTL': config_class.AFDB_NEGATIVE_TTL
     }
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Script para importar un conjunto de referencia grande (FASTA o UniProt flat file) a la base de datos
+Las entradas se añaden al almacén de importaciones junto a data/known_proteins/protein_database.json
+"""
+import argparse
+import os
+import sys
+
+# Agregar el directorio raíz del proyecto al Python path
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+def parse_args():
+    """Lee los argumentos de la línea de comandos"""
+    default_database = os.path.join(project_root, 'data', 'known_proteins', 'protein_database.json')
+    parser = argparse.ArgumentParser(description="Importa proteínas de referencia a la base de datos")
+    parser.add_argument('source', help="Archivo FASTA o UniProt flat file (.dat), opcionalmente .gz")
+    parser.add_argument('--format', choices=('fasta', 'uniprot'), help="Formato (por defecto se detecta)")
+    parser.add_argument('--database', default=default_database, help="Base de datos de destino")
+    parser.add_argument('--batch-size', type=int, default=None, help="Proteínas por lote")
+    return parser.parse_args()
+
+def main():
+    """Función principal"""
+    args = parse_args()
+    
+    from src.data.protein_database import IMPORT_BATCH_SIZE, ProteinDatabase
+    from src.data.protein_importer import import_reference_file
+    
+    database = ProteinDatabase(args.database)
+    report = import_reference_file(database, args.source, file_format=args.format,
+                                   batch_size=args.batch_size or IMPORT_BATCH_SIZE)
+    
+    print(f"✅ Importación de {report['source']} ({report['format']}) completada")
+    print(f"📊 Leídas: {report['read']} | nuevas: {report['imported']} | "
+          f"secuencias duplicadas: {report['duplicate_sequences']} | IDs duplicados: {report['duplicate_ids']} | "
+          f"descartadas: {report['skipped']}")
+    print(f"⏱️ {report['elapsed_seconds']:.2f} s | {report['proteins_per_second']:.0f} proteínas/s | "
+          f"{report['residues_per_second'] / 1e6:.2f} M residuos/s")
+    print(f"💾 Pico de memoria (RSS): {report['peak_rss_mb']:.1f} MB | total en la base de datos: {report['total_proteins']}")
+
+if __name__ == '__main__':
+    main()
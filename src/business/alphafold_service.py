@@ -4,15 +4,25 @@ Maneja la comunicación con la API de AlphaFold y el procesamiento de modelos 3D
 """
 import os
 import json
+import hashlib
 import time
 import math
-import requests
+import sqlite3
 import tempfile
 import numpy as np
 from typing import Dict, Optional, Tuple, Any, List
 from datetime import datetime
 from pathlib import Path
+from .backend_health import BackendHealth
+from .http_transport import PART_SUFFIX, HttpTransport
+from ..data.afdb_metadata_cache import AFDB_METADATA_DATABASE, AlphaFoldMetadataCache
+from ..data.prediction_cache import PREDICTION_CACHE_DIRECTORY, PredictionCache, prediction_key
 from ..data.protein_database import ProteinDatabase
+from ..data.protein_sequence import ProteinSequence, residue_table
+from ..data.sequence_matrix import IDENTITY, sequence_similarity
+
+# Subdirectorio de models_directory con las descargas a medio completar
+PARTIAL_DOWNLOADS_DIRECTORY = 'downloads'
 
 class AlphaFoldIntegrationError(Exception):
     """Excepción personalizada para errores de integración con AlphaFold"""
@@ -24,6 +34,57 @@ class AlphaFoldService:
     Soporta tanto la API web como ColabFold local
     """
     
+    # Propensidades de Chou-Fasman para α-hélice
+    HELIX_PROPENSITY = {
+        'A': 1.42, 'E': 1.51, 'L': 1.21, 'M': 1.45, 'Q': 1.11, 'K': 1.16,
+        'R': 0.98, 'H': 1.00, 'V': 1.06, 'I': 1.08, 'Y': 0.69, 'F': 1.13,
+        'W': 1.08, 'T': 0.83, 'S': 0.77, 'C': 0.70, 'N': 0.67, 'D': 1.01,
+        'P': 0.57, 'G': 0.57
+    }
+    
+    # Propensidades para β-sheet
+    SHEET_PROPENSITY = {
+        'V': 1.70, 'I': 1.60, 'Y': 1.47, 'F': 1.38, 'W': 1.37, 'L': 1.30,
+        'T': 1.19, 'C': 1.19, 'A': 0.83, 'R': 0.93, 'G': 0.75, 'D': 0.54,
+        'H': 0.87, 'Q': 1.10, 'K': 0.74, 'S': 0.75, 'E': 0.37, 'P': 0.55,
+        'N': 0.89, 'M': 1.05
+    }
+    
+    # Escala de hidrofobicidad de Kyte-Doolittle (simplificada)
+    # Positivo = hidrofóbico, Negativo = hidrofílico
+    HYDROPHOBICITY = {
+        'I': 4.5, 'V': 4.2, 'L': 3.8, 'F': 2.8, 'C': 2.5, 'M': 1.9, 'A': 1.8,
+        'G': -0.4, 'T': -0.7, 'S': -0.8, 'W': -0.9, 'Y': -1.3, 'P': -1.6,
+        'H': -3.2, 'E': -3.5, 'Q': -3.5, 'D': -3.5, 'N': -3.5, 'K': -3.9, 'R': -4.5
+    }
+    
+    # Aminoácidos estabilizantes vs desestabilizantes
+    STABILIZING_RESIDUES = {'A', 'V', 'L', 'I', 'F', 'W', 'Y'}
+    DESTABILIZING_RESIDUES = {'P', 'G'}
+    CHARGED_RESIDUES = {'K', 'R', 'D', 'E'}
+    RARE_RESIDUES = {'U', 'O', 'B', 'Z', 'J', 'X'}
+    
+    # Longitud mínima para buscar la secuencia como fragmento de una proteína conocida
+    # (los fragmentos más cortos aparecen por azar en proteínas no relacionadas)
+    MIN_FRAGMENT_LENGTH = 20
+    
+    # API de AlphaFold DB que relaciona identificadores UniProt con sus modelos
+    ALPHAFOLD_DB_PREDICTION_URL = 'https://alphafold.ebi.ac.uk/api/prediction'
+    
+    # Métodos cuyas predicciones se guardan en la caché (las simulaciones se repiten siempre)
+    CACHED_PREDICTION_METHODS = ('colabfold', 'alphafold_db_real')
+    
+    # Parámetros de los trabajos enviados a ColabFold (forman parte de la clave de la caché)
+    COLABFOLD_PARAMETERS = {'num_models': 1, 'use_amber': True, 'use_templates': False}
+    
+    # Tablas indexadas por código ASCII para puntuar la composición de una ProteinSequence
+    _HELIX_TABLE = residue_table(HELIX_PROPENSITY, 1.0)
+    _SHEET_TABLE = residue_table(SHEET_PROPENSITY, 1.0)
+    _STABILIZING_TABLE = residue_table(STABILIZING_RESIDUES)
+    _DESTABILIZING_TABLE = residue_table(DESTABILIZING_RESIDUES)
+    _CHARGED_TABLE = residue_table(CHARGED_RESIDUES)
+    _RARE_TABLE = residue_table(RARE_RESIDUES)
+    
     def __init__(self, config: Dict[str, Any]):
         """
         Inicializa el servicio de AlphaFold
@@ -37,12 +98,60 @@ class AlphaFoldService:
         self.models_directory = config.get('MODELS_DIRECTORY', 'models/alphafold')
         self.timeout = config.get('API_TIMEOUT', 300)  # 5 minutos
         
+        # Conexiones reutilizadas para todo el tráfico con AlphaFold DB y ColabFold
+        self.http = HttpTransport(
+            pool_size=config.get('HTTP_POOL_SIZE', 10),
+            retries=config.get('HTTP_RETRIES', 3)
+        )
+        
         # Crear directorio de modelos si no existe
         Path(self.models_directory).mkdir(parents=True, exist_ok=True)
         
+        # Predicciones anteriores por secuencia (0 desactiva la caché)
+        cache_bytes = config.get('PREDICTION_CACHE_MAX_BYTES', 1 << 30)
+        self.prediction_cache = PredictionCache(
+            Path(self.models_directory) / PREDICTION_CACHE_DIRECTORY, cache_bytes
+        ) if cache_bytes else None
+        
+        # Metadatos de AlphaFold DB por UniProt, incluidas las proteínas sin modelo
+        self.afdb_metadata = AlphaFoldMetadataCache(
+            Path(self.models_directory) / PREDICTION_CACHE_DIRECTORY / AFDB_METADATA_DATABASE,
+            ttl=config.get('AFDB_METADATA_TTL', 7 * 86400),
+            negative_ttl=config.get('AFDB_NEGATIVE_TTL', 86400)
+        )
+        
         # Inicializar base de datos de proteínas conocidas
-        self.protein_db = ProteinDatabase()
+        self.protein_db = ProteinDatabase(search_shards=config.get('PROTEIN_DB_SEARCH_SHARDS', 0))
         print(f"🧬 Proteínas conocidas disponibles: {len(self.protein_db.proteins)}")
+        
+        # Recargar la base de datos en segundo plano cuando cambie su archivo
+        reload_interval = config.get('PROTEIN_DB_RELOAD_INTERVAL', 0)
+        if reload_interval and reload_interval > 0:
+            self.protein_db.start_watching(reload_interval)
+        
+        # Disponibilidad de ColabFold sondeada en segundo plano: predict_structure
+        # solo lee el último resultado y nunca espera al /health. Al arrancar se
+        # espera un poco al primer sondeo; si no llega a tiempo, las predicciones
+        # van a AlphaFold DB hasta que termine
+        self.colabfold_health = BackendHealth(
+            'ColabFold',
+            lambda: self._is_colabfold_available(),
+            ttl=config.get('COLABFOLD_HEALTH_TTL', 30),
+            failure_threshold=config.get('COLABFOLD_FAILURE_THRESHOLD', 3),
+            recovery_timeout=config.get('COLABFOLD_RECOVERY_TIMEOUT', 60)
+        )
+        self.colabfold_health.start()
+        self.colabfold_health.wait_for_probe(config.get('COLABFOLD_STARTUP_WAIT', 2))
+    
+    def close(self):
+        """Detiene los hilos y procesos de fondo y cierra las conexiones y las cachés"""
+        self.colabfold_health.stop()
+        self.protein_db.stop_watching()
+        self.protein_db.stop_search_workers()
+        self.http.close()
+        self.afdb_metadata.close()
+        if self.prediction_cache is not None:
+            self.prediction_cache.close()
     
     def predict_structure(self, sequence: str, job_name: str = None) -> Dict[str, Any]:
         """
@@ -58,12 +167,25 @@ class AlphaFoldService:
         start_time = time.time()
         
         try:
-            # Intentar primero con ColabFold local si está disponible
-            if self._is_colabfold_available():
-                result = self._predict_with_colabfold(sequence, job_name)
+            # Intentar primero con ColabFold local si el último sondeo lo dio por disponible
+            method = 'colabfold' if self.colabfold_health.is_available() else 'alphafold_db'
+            result = self._cached_prediction(sequence, method, job_name)
+            if result is not None:
+                print(f"⚡ Predicción recuperada de la caché ({result['prediction_method']})")
+            elif method == 'colabfold':
+                try:
+                    result = self._predict_with_colabfold(sequence, job_name)
+                    self.colabfold_health.record_success()
+                except Exception as e:
+                    self.colabfold_health.record_failure()
+                    print(f"⚠️ ColabFold falló ({e}), usando AlphaFold DB")
+                    method = 'alphafold_db'
+                    result = self._predict_with_alphafold_db(sequence, job_name)
+                result = self._cache_prediction(sequence, method, result)
             else:
                 # Fallback a búsqueda en AlphaFold DB o predicción simple
                 result = self._predict_with_alphafold_db(sequence, job_name)
+                result = self._cache_prediction(sequence, method, result)
                 
             processing_time = time.time() - start_time
             result['processing_time'] = processing_time
@@ -73,6 +195,65 @@ class AlphaFoldService:
         except Exception as e:
             raise AlphaFoldIntegrationError(f"Error en predicción de estructura: {str(e)}")
     
+    def _prediction_parameters(self, method: str) -> Dict[str, Any]:
+        """
+        Parámetros que, junto con la secuencia y el método, determinan una predicción
+        
+        Para AlphaFold DB incluye el tamaño de la base de datos de proteínas conocidas:
+        al añadir proteínas, una secuencia simulada puede pasar a tener estructura real.
+        """
+        if method == 'colabfold':
+            return self.COLABFOLD_PARAMETERS
+        return {'known_proteins': len(self.protein_db.proteins)}
+    
+    def _cached_prediction(self, sequence: str, method: str, job_name: str = None) -> Optional[Dict[str, Any]]:
+        """
+        Predicción guardada para la secuencia y el método, o None
+        
+        El modelo se enlaza con un nombre nuevo en el directorio de modelos, como si
+        se hubiera descargado, así que expulsarlo de la caché no afecta a quien lo usa.
+        """
+        if self.prediction_cache is None:
+            return None
+        if not job_name:
+            job_name = f"protein_{int(time.time())}"
+        try:
+            return self.prediction_cache.get(
+                prediction_key(sequence, method, self._prediction_parameters(method)),
+                link_stem=os.path.join(self.models_directory, f"{job_name}_{int(time.time())}")
+            )
+        except (OSError, sqlite3.Error) as e:
+            print(f"⚠️ No se pudo leer la caché de predicciones: {e}")
+            return None
+    
+    def _cache_prediction(self, sequence: str, method: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Guarda una predicción nueva en la caché (solo estructuras reales de ColabFold o AlphaFold DB)
+        
+        Returns:
+            El mismo resultado (su modelo queda en el directorio de modelos)
+        """
+        if self.prediction_cache is None or not result.get('model_path'):
+            return result
+        if result.get('prediction_method') not in self.CACHED_PREDICTION_METHODS:
+            # Las simulaciones también son el fallback ante errores transitorios de AlphaFold DB:
+            # guardarlas dejaría la secuencia sin su estructura real
+            return result
+        try:
+            self.prediction_cache.put(prediction_key(sequence, method, self._prediction_parameters(method)), result)
+        except (OSError, sqlite3.Error) as e:
+            print(f"⚠️ No se pudo guardar la predicción en la caché: {e}")
+        return result
+    
+    def get_prediction_cache_stats(self) -> Dict[str, Any]:
+        """
+        Aciertos, fallos y ocupación de la caché de predicciones
+        
+        Returns:
+            Dict con las estadísticas (vacío si la caché está desactivada)
+        """
+        return self.prediction_cache.stats() if self.prediction_cache is not None else {}
+    
     def compare_structures(self, original_result: Dict, mutated_result: Dict) -> Dict[str, Any]:
         """
         Compara dos estructuras predichas y calcula diferencias estructurales
@@ -100,10 +281,25 @@ class AlphaFoldService:
         except Exception as e:
             raise AlphaFoldIntegrationError(f"Error comparando estructuras: {str(e)}")
     
+    def get_backend_status(self) -> Dict[str, Any]:
+        """
+        Estado de los backends externos para monitorización
+        
+        Returns:
+            Dict con el estado del circuit breaker de ColabFold, la latencia de su último
+            sondeo, la latencia de las peticiones HTTP por host y los aciertos de la
+            caché de metadatos de AlphaFold DB
+        """
+        return {
+            'colabfold': self.colabfold_health.status(),
+            'http': self.http.stats(),
+            'afdb_metadata_cache': self.afdb_metadata.stats()
+        }
+    
     def _is_colabfold_available(self) -> bool:
         """Verifica si ColabFold está disponible localmente"""
         try:
-            response = requests.get(f"{self.colabfold_endpoint}/health", timeout=5)
+            response = self.http.get(f"{self.colabfold_endpoint}/health", timeout=5, retry=False)
             return response.status_code == 200
         except:
             return False
@@ -126,13 +322,11 @@ class AlphaFoldService:
         job_data = {
             'sequence': sequence,
             'job_name': job_name,
-            'num_models': 1,
-            'use_amber': True,
-            'use_templates': False
+            **self.COLABFOLD_PARAMETERS
         }
         
         # Enviar trabajo a ColabFold
-        response = requests.post(
+        response = self.http.post(
             f"{self.colabfold_endpoint}/predict",
             json=job_data,
             timeout=self.timeout
@@ -179,6 +373,7 @@ class AlphaFoldService:
             match_type = search_result[1]
             similarity = search_result[2] if len(search_result) > 2 else 1.0
             known_sequence = search_result[3] if len(search_result) > 3 else None
+            fragment_offset = search_result[4] if len(search_result) > 4 else None
             
             print(f"✅ Encontrada estructura real en AlphaFold DB: {cif_url}")
             try:
@@ -204,7 +399,8 @@ class AlphaFoldService:
                     'prediction_method': 'alphafold_db_real',
                     'sequence_length': len(sequence),
                     'match_type': match_type,
-                    'similarity': similarity if match_type == 'similar' else 1.0
+                    'similarity': similarity if match_type == 'similar' else 1.0,
+                    **({'fragment_offset': fragment_offset} if match_type == 'fragment' else {})
                 }
             except Exception as e:
                 print(f"⚠️ Error descargando estructura real: {e}")
@@ -217,6 +413,11 @@ class AlphaFoldService:
         print("🔄 Usando simulación mejorada...")
         return self._predict_improved_simulation(sequence, job_name, is_mutation=False)
     
+    def _partial_download_path(self, url: str) -> str:
+        """Archivo parcial de una descarga: depende solo de la URL para poder reanudarla en otra llamada"""
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()[:32]
+        return os.path.join(self.models_directory, PARTIAL_DOWNLOADS_DIRECTORY, digest + PART_SUFFIX)
+    
     def _download_model(self, model_url: str, job_name: str) -> str:
         """
         Descarga el modelo 3D desde la URL proporcionada
@@ -229,24 +430,18 @@ class AlphaFoldService:
             Ruta local del archivo descargado
         """
         try:
-            response = requests.get(model_url, timeout=30)
-            response.raise_for_status()
-            
-            # Determinar extensión del archivo
-            content_type = response.headers.get('content-type', '')
-            if 'pdb' in content_type:
-                extension = '.pdb'
-            elif 'cif' in content_type:
-                extension = '.cif'
-            else:
-                extension = '.pdb'  # Por defecto
-            
-            # Guardar archivo
-            filename = f"{job_name}_{int(time.time())}{extension}"
+            # Guardar archivo a medida que llega (la extensión se corrige con el Content-Type)
+            filename = f"{job_name}_{int(time.time())}.pdb"
             file_path = os.path.join(self.models_directory, filename)
+            download = self.http.download(model_url, file_path, part_path=self._partial_download_path(model_url),
+                                          timeout=30)
             
-            with open(file_path, 'wb') as f:
-                f.write(response.content)
+            # Determinar extensión del archivo
+            content_type = download['content_type'].lower()
+            if 'cif' in content_type and 'pdb' not in content_type:
+                cif_path = os.path.splitext(file_path)[0] + '.cif'
+                os.replace(file_path, cif_path)
+                file_path = cif_path
             
             return file_path
             
@@ -356,22 +551,6 @@ _atom_site.pdbx_PDB_model_num
         Returns:
             Lista de estructuras secundarias ('H'=hélice, 'E'=sheet, 'C'=coil)
         """
-        # Propensidades de Chou-Fasman para α-hélice
-        helix_propensity = {
-            'A': 1.42, 'E': 1.51, 'L': 1.21, 'M': 1.45, 'Q': 1.11, 'K': 1.16,
-            'R': 0.98, 'H': 1.00, 'V': 1.06, 'I': 1.08, 'Y': 0.69, 'F': 1.13,
-            'W': 1.08, 'T': 0.83, 'S': 0.77, 'C': 0.70, 'N': 0.67, 'D': 1.01,
-            'P': 0.57, 'G': 0.57
-        }
-        
-        # Propensidades para β-sheet
-        sheet_propensity = {
-            'V': 1.70, 'I': 1.60, 'Y': 1.47, 'F': 1.38, 'W': 1.37, 'L': 1.30,
-            'T': 1.19, 'C': 1.19, 'A': 0.83, 'R': 0.93, 'G': 0.75, 'D': 0.54,
-            'H': 0.87, 'Q': 1.10, 'K': 0.74, 'S': 0.75, 'E': 0.37, 'P': 0.55,
-            'N': 0.89, 'M': 1.05
-        }
-        
         structure = []
         
         # Ventana deslizante para predecir estructura
@@ -381,8 +560,8 @@ _atom_site.pdbx_PDB_model_num
             end = min(len(sequence), i + 4)
             window = sequence[start:end]
             
-            helix_score = sum(helix_propensity.get(aa, 1.0) for aa in window) / len(window)
-            sheet_score = sum(sheet_propensity.get(aa, 1.0) for aa in window) / len(window)
+            helix_score = sum(self.HELIX_PROPENSITY.get(aa, 1.0) for aa in window) / len(window)
+            sheet_score = sum(self.SHEET_PROPENSITY.get(aa, 1.0) for aa in window) / len(window)
             
             # Decidir estructura basada en propensidades
             if helix_score > 1.05 and helix_score > sheet_score:
@@ -505,14 +684,6 @@ _atom_site.pdbx_PDB_model_num
         Returns:
             Coordenadas refinadas.
         """
-        # Escala de hidrofobicidad de Kyte-Doolittle (simplificada)
-        # Positivo = hidrofóbico, Negativo = hidrofílico
-        hydrophobicity = {
-            'I': 4.5, 'V': 4.2, 'L': 3.8, 'F': 2.8, 'C': 2.5, 'M': 1.9, 'A': 1.8,
-            'G': -0.4, 'T': -0.7, 'S': -0.8, 'W': -0.9, 'Y': -1.3, 'P': -1.6,
-            'H': -3.2, 'E': -3.5, 'Q': -3.5, 'D': -3.5, 'N': -3.5, 'K': -3.9, 'R': -4.5
-        }
-        
         # Bucle de refinamiento
         for _ in range(iterations):
             # 1. Calcular el centro de masa (centroide) de la proteína
@@ -520,7 +691,7 @@ _atom_site.pdbx_PDB_model_num
             
             # 2. Para cada residuo, aplicar una fuerza hacia o desde el centroide
             for i, aa in enumerate(sequence):
-                score = hydrophobicity.get(aa, 0.0)
+                score = self.HYDROPHOBICITY.get(aa, 0.0)
                 
                 # Si el residuo es hidrofóbico (score > 0), tirar de él hacia el centro
                 if score > 0:
@@ -577,25 +748,27 @@ SOURCE   3 EXPRESSION_SYSTEM: ALPHAFOLD PREDICTION;
         Returns:
             Puntuación de confianza estimada (0-100)
         """
+        # Una sola instancia compartida: digest y composición se calculan una vez
+        protein = ProteinSequence.of(sequence)
+        
         # Factor único basado en la secuencia específica (hash determinista)
-        import hashlib
-        sequence_hash = hashlib.md5(sequence.encode()).hexdigest()
+        sequence_hash = protein.digest
         sequence_factor = (int(sequence_hash[:8], 16) % 100) / 100.0  # 0.0 a 1.0
         
         # Factor 1: Homología (35% del peso)
-        homology_score = self._calculate_homology_score(sequence) * 0.35
+        homology_score = self._calculate_homology_score(protein.text) * 0.35
         
         # Factor 2: Predicción de estructura secundaria (30% del peso)
-        secondary_structure_score = self._predict_secondary_structure_confidence(sequence) * 0.3
+        secondary_structure_score = self._predict_secondary_structure_confidence(protein) * 0.3
         
         # Factor 3: Estabilidad de la secuencia (20% del peso)
-        stability_score = self._calculate_stability_score(sequence) * 0.2
+        stability_score = self._calculate_stability_score(protein) * 0.2
         
         # Factor 4: Factor único de secuencia (10% del peso)
         unique_sequence_score = (40 + sequence_factor * 40) * 0.1  # 4-8 puntos
         
         # Factor 5: Penalizaciones (5% del peso)
-        penalty_score = self._calculate_penalties(sequence) * 0.05
+        penalty_score = self._calculate_penalties(protein) * 0.05
         
         # Combinar todos los factores
         total_confidence = homology_score + secondary_structure_score + stability_score + unique_sequence_score - penalty_score
@@ -636,26 +809,11 @@ SOURCE   3 EXPRESSION_SYSTEM: ALPHAFOLD PREDICTION;
             
         return min(100, score)
     
-    def _predict_secondary_structure_confidence(self, sequence: str) -> float:
+    def _predict_secondary_structure_confidence(self, sequence) -> float:
         """Predice confianza basada en propensión de estructura secundaria"""
-        # Propensidades de Chou-Fasman para α-hélice
-        helix_propensity = {
-            'A': 1.42, 'E': 1.51, 'L': 1.21, 'M': 1.45, 'Q': 1.11, 'K': 1.16,
-            'R': 0.98, 'H': 1.00, 'V': 1.06, 'I': 1.08, 'Y': 0.69, 'F': 1.13,
-            'W': 1.08, 'T': 0.83, 'S': 0.77, 'C': 0.70, 'N': 0.67, 'D': 1.01,
-            'P': 0.57, 'G': 0.57
-        }
-        
-        # Propensidades para β-sheet
-        sheet_propensity = {
-            'V': 1.70, 'I': 1.60, 'Y': 1.47, 'F': 1.38, 'W': 1.37, 'L': 1.30,
-            'T': 1.19, 'C': 1.19, 'A': 0.83, 'R': 0.93, 'G': 0.75, 'D': 0.54,
-            'H': 0.87, 'Q': 1.10, 'K': 0.74, 'S': 0.75, 'E': 0.37, 'P': 0.55,
-            'N': 0.89, 'M': 1.05
-        }
-        
-        helix_score = sum(helix_propensity.get(aa, 1.0) for aa in sequence) / len(sequence)
-        sheet_score = sum(sheet_propensity.get(aa, 1.0) for aa in sequence) / len(sequence)
+        protein = ProteinSequence.of(sequence)
+        helix_score = protein.weighted_sum(self._HELIX_TABLE) / len(protein)
+        sheet_score = protein.weighted_sum(self._SHEET_TABLE) / len(protein)
         
         # Estructura secundaria balanceada = mayor confianza
         structure_balance = 1 - abs(helix_score - sheet_score)
@@ -663,21 +821,17 @@ SOURCE   3 EXPRESSION_SYSTEM: ALPHAFOLD PREDICTION;
         
         return confidence
     
-    def _calculate_stability_score(self, sequence: str) -> float:
+    def _calculate_stability_score(self, sequence) -> float:
         """Calcula puntuación de estabilidad basada en composición aminoacídica"""
-        # Aminoácidos estabilizantes vs desestabilizantes
-        stabilizing = {'A', 'V', 'L', 'I', 'F', 'W', 'Y'}
-        destabilizing = {'P', 'G'}
-        charged = {'K', 'R', 'D', 'E'}
-        
-        stabilizing_count = sum(1 for aa in sequence if aa in stabilizing)
-        destabilizing_count = sum(1 for aa in sequence if aa in destabilizing)
-        charged_count = sum(1 for aa in sequence if aa in charged)
+        protein = ProteinSequence.of(sequence)
+        stabilizing_count = protein.weighted_sum(self._STABILIZING_TABLE)
+        destabilizing_count = protein.weighted_sum(self._DESTABILIZING_TABLE)
+        charged_count = protein.weighted_sum(self._CHARGED_TABLE)
         
         # Calcular ratios
-        stabilizing_ratio = stabilizing_count / len(sequence)
-        destabilizing_ratio = destabilizing_count / len(sequence)
-        charged_ratio = charged_count / len(sequence)
+        stabilizing_ratio = stabilizing_count / len(protein)
+        destabilizing_ratio = destabilizing_count / len(protein)
+        charged_ratio = charged_count / len(protein)
         
         # Puntuación base
         stability = 60
@@ -690,29 +844,28 @@ SOURCE   3 EXPRESSION_SYSTEM: ALPHAFOLD PREDICTION;
             
         return max(20, min(100, stability))
     
-    def _calculate_penalties(self, sequence: str) -> float:
+    def _calculate_penalties(self, sequence) -> float:
         """Calcula penalizaciones por características problemáticas"""
+        protein = ProteinSequence.of(sequence)
+        composition = protein.composition
+        length = len(protein)
         penalties = 0
         
         # Penalizar aminoácidos raros/no estándar
-        rare_aa = {'U', 'O', 'B', 'Z', 'J', 'X'}
-        rare_count = sum(1 for aa in sequence if aa in rare_aa)
+        rare_count = protein.weighted_sum(self._RARE_TABLE)
         penalties += rare_count * 15
         
         # Penalizar secuencias muy cortas o muy largas
-        if len(sequence) < 30:
-            penalties += (30 - len(sequence)) * 2
-        elif len(sequence) > 1000:
-            penalties += (len(sequence) - 1000) * 0.1
-            
-        # Penalizar repeticiones excesivas
-        for aa in set(sequence):
-            aa_count = sequence.count(aa)
-            if aa_count / len(sequence) > 0.2:  # >20% de un solo aminoácido
-                penalties += 10
+        if length < 30:
+            penalties += (30 - length) * 2
+        elif length > 1000:
+            penalties += (length - 1000) * 0.1
+            
+        # Penalizar repeticiones excesivas (>20% de un solo aminoácido)
+        penalties += 10 * int(np.count_nonzero(composition > 0.2 * length))
                 
         # Penalizar falta de diversidad
-        unique_aa = len(set(sequence))
+        unique_aa = int(np.count_nonzero(composition))
         if unique_aa < 10:
             penalties += (10 - unique_aa) * 3
             
@@ -776,33 +929,76 @@ SOURCE   3 EXPRESSION_SYSTEM: ALPHAFOLD PREDICTION;
             uniprot_id, protein_data = exact_match
             print(f"✅ Coincidencia EXACTA encontrada: {protein_data['name']} (UniProt: {uniprot_id})")
             try:
-                url = f"https://alphafold.ebi.ac.uk/api/prediction/{uniprot_id}"
-                response = requests.get(url, timeout=10)
-                if response.status_code == 200:
-                    data = response.json()
-                    if data:
-                        return data[0].get('cifUrl'), 'exact'
+                entry = self._alphafold_db_entry(uniprot_id)
+                if entry:
+                    return entry.get('cifUrl'), 'exact'
             except Exception as e:
                 print(f"⚠️ Error accediendo a AlphaFold API para {uniprot_id}: {e}")
         
-        # Buscar secuencias similares (>95% similitud)
-        similar_matches = self.protein_db.search_similar_sequences(sequence, min_similarity=0.95)
+        # Buscar la secuencia más similar (>95% similitud)
+        similar_matches = self.protein_db.search_top_k(sequence, k=1, min_similarity=0.95)
         if similar_matches:
-            uniprot_id, protein_data, similarity = similar_matches[0]  # Tomar la más similar
+            uniprot_id, protein_data, similarity = similar_matches[0]
             print(f"✅ Coincidencia de alta similitud ({similarity:.1%}) encontrada: {protein_data['name']} (UniProt: {uniprot_id})")
             try:
-                url = f"https://alphafold.ebi.ac.uk/api/prediction/{uniprot_id}"
-                response = requests.get(url, timeout=10)
-                if response.status_code == 200:
-                    data = response.json()
-                    if data:
-                        return data[0].get('cifUrl'), 'similar', similarity, protein_data['sequence']
+                entry = self._alphafold_db_entry(uniprot_id)
+                if entry:
+                    return entry.get('cifUrl'), 'similar', similarity, protein_data['sequence']
             except Exception as e:
                 print(f"⚠️ Error accediendo a AlphaFold API para {uniprot_id}: {e}")
         
+        # Buscar la secuencia como fragmento o dominio de una proteína conocida
+        if len(sequence) >= self.MIN_FRAGMENT_LENGTH:
+            fragment_matches = self.protein_db.search_fragment(sequence, limit=1)
+            if fragment_matches:
+                uniprot_id, protein_data, offset = fragment_matches[0]
+                print(f"✅ Fragmento encontrado en la posición {offset + 1} de {protein_data['name']} (UniProt: {uniprot_id})")
+                try:
+                    entry = self._alphafold_db_entry(uniprot_id)
+                    if entry:
+                        return entry.get('cifUrl'), 'fragment', 1.0, protein_data['sequence'], offset
+                except Exception as e:
+                    print(f"⚠️ Error accediendo a AlphaFold API para {uniprot_id}: {e}")
+        
         print(f"❌ No se encontró estructura conocida para esta secuencia específica")
         print(f"📊 Base de datos consultada: {len(self.protein_db.proteins)} proteínas")
         return None, 'none'
+    
+    def _alphafold_db_entry(self, uniprot_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Metadatos de AlphaFold DB para una proteína (cifUrl, pdbUrl, versión...)
+        
+        Se consulta la caché antes que la API; los 404 y las listas vacías también
+        se guardan, así que una proteína sin modelo no se vuelve a consultar hasta
+        que caduque su entrada.
+        
+        Args:
+            uniprot_id: Identificador UniProt
+            
+        Returns:
+            Primera entrada de la API, o None si AlphaFold DB no tiene modelo
+            
+        Raises:
+            AlphaFoldIntegrationError: Si la API responde con un error transitorio (no se guarda)
+        """
+        found, entry = self.afdb_metadata.lookup(uniprot_id)
+        if found:
+            return entry
+        
+        response = self.http.get(f"{self.ALPHAFOLD_DB_PREDICTION_URL}/{uniprot_id}", timeout=10)
+        if response.status_code == 200:
+            data = response.json()
+            entry = data[0] if data else None
+        elif response.status_code == 404:
+            entry = None
+        else:
+            raise AlphaFoldIntegrationError(f"AlphaFold DB respondió {response.status_code}")
+        
+        try:
+            self.afdb_metadata.store(uniprot_id, entry)
+        except sqlite3.Error as e:
+            print(f"⚠️ No se pudo guardar en caché la entrada de AlphaFold DB de {uniprot_id}: {e}")
+        return entry
 
     def _download_real_alphafold_structure(self, cif_url: str, job_name: str) -> str:
         """
@@ -816,46 +1012,32 @@ SOURCE   3 EXPRESSION_SYSTEM: ALPHAFOLD PREDICTION;
             Ruta local del archivo descargado
         """
         try:
-            response = requests.get(cif_url, timeout=30)
-            response.raise_for_status()
-            
             # Crear nombre de archivo único
             timestamp = int(time.time())
             filename = f"{job_name}_{timestamp}.cif"
             file_path = os.path.join(self.models_directory, filename)
             
-            # Guardar archivo
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(response.text)
+            # Guardar archivo por bloques, sin pasar por memoria
+            self.http.download(cif_url, file_path, part_path=self._partial_download_path(cif_url), timeout=30)
             
             return file_path
             
         except Exception as e:
             raise AlphaFoldIntegrationError(f"Error descargando estructura real: {str(e)}")
     
-    def _calculate_sequence_similarity(self, seq1: str, seq2: str) -> float:
+    def _calculate_sequence_similarity(self, seq1: str, seq2: str, scoring: str = IDENTITY) -> float:
         """
         Calcula la similitud entre dos secuencias de aminoácidos
         
         Args:
             seq1: Primera secuencia
             seq2: Segunda secuencia
+            scoring: 'identity' (posiciones idénticas) o 'blosum62'
             
         Returns:
             Valor de similitud entre 0 y 1
         """
-        if len(seq1) == 0 or len(seq2) == 0:
-            return 0.0
-        
-        # Si las longitudes son muy diferentes, la similitud es baja
-        if abs(len(seq1) - len(seq2)) / max(len(seq1), len(seq2)) > 0.1:
-            return 0.0
-        
-        # Comparar posición por posición usando la secuencia más corta
-        min_len = min(len(seq1), len(seq2))
-        matches = sum(1 for i in range(min_len) if seq1[i] == seq2[i])
-        
-        return matches / min_len
+        return sequence_similarity(seq1, seq2, scoring)
 
     def _predict_improved_simulation(self, sequence: str, job_name: str = None, is_mutation: bool = False) -> Dict[str, Any]:
         """
@@ -0,0 +1,177 @@
+"""
+Estado de salud de los backends externos (ColabFold) sin bloquear las peticiones
+Un hilo en segundo plano sondea el backend y un circuit breaker espacia los sondeos cuando falla
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+# Estados del circuit breaker
+CLOSED = 'closed'        # Funcionamiento normal: se sondea cada ttl segundos
+OPEN = 'open'            # Demasiados fallos: no se usa y se espera recovery_timeout antes de volver a probar
+HALF_OPEN = 'half_open'  # Sondeo de prueba en curso tras recovery_timeout
+
+
+class BackendHealth:
+    """
+    Sondeo cacheado con circuit breaker para un backend
+    
+    is_available() solo lee el último resultado, así que nunca espera a un
+    sondeo; hasta que termina el primero devuelve False (ver wait_for_probe
+    para no arrancar en frío). El hilo de fondo vuelve a sondear cada ttl segundos mientras el
+    circuito está cerrado; tras failure_threshold fallos seguidos (de sondeos o
+    de llamadas reales, ver record_failure) el circuito se abre y el siguiente
+    sondeo, ya en estado semiabierto, se hace pasados recovery_timeout segundos.
+    """
+    
+    def __init__(self, name: str, probe: Callable[[], bool], ttl: float = 30.0,
+                 failure_threshold: int = 3, recovery_timeout: float = 60.0):
+        """
+        Args:
+            name: Nombre del backend (para los logs y el estado)
+            probe: Función que comprueba el backend (bloqueante); True si está disponible
+            ttl: Segundos que vale un sondeo correcto
+            failure_threshold: Fallos seguidos que abren el circuito
+            recovery_timeout: Segundos con el circuito abierto antes de volver a probar
+        """
+        self.name = name
+        self.ttl = ttl
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._probe = probe
+        
+        self.state = CLOSED
+        self.available: Optional[bool] = None  # None = aún sin sondear
+        self.consecutive_failures = 0
+        self.last_probe_latency: Optional[float] = None
+        self.last_probe_at: Optional[datetime] = None
+        self._next_probe = 0.0
+        
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._probed = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def is_available(self) -> bool:
+        """Indica si se puede usar el backend según el último sondeo (no bloquea)"""
+        return self.state == CLOSED and self.available is True
+    
+    def probe(self) -> bool:
+        """
+        Sondea el backend ahora y actualiza el circuito (bloqueante; lo llama el hilo de fondo)
+        
+        Returns:
+            True si el backend respondió correctamente
+        """
+        with self._lock:
+            if self.state == OPEN:
+                self.state = HALF_OPEN
+        
+        start = time.perf_counter()
+        try:
+            healthy = bool(self._probe())
+        except Exception:
+            healthy = False
+        latency = time.perf_counter() - start
+        
+        with self._lock:
+            self.last_probe_latency = latency
+            self.last_probe_at = datetime.utcnow()
+            if healthy:
+                self._succeeded()
+            else:
+                self.available = False
+                self._failed()
+        self._probed.set()
+        return healthy
+    
+    def wait_for_probe(self, timeout: float) -> bool:
+        """
+        Espera a que termine el primer sondeo
+        
+        Args:
+            timeout: Segundos máximos de espera
+        
+        Returns:
+            True si ya hay un resultado (available deja de ser None)
+        """
+        return self._probed.wait(timeout)
+    
+    def record_success(self):
+        """Registra una llamada real correcta al backend"""
+        with self._lock:
+            self._succeeded()
+    
+    def record_failure(self):
+        """Registra una llamada real fallida (cuenta para abrir el circuito)"""
+        with self._lock:
+            self._failed()
+    
+    def _succeeded(self):
+        """Cierra el circuito (con el lock tomado)"""
+        self.available = True
+        self.consecutive_failures = 0
+        if self.state != CLOSED:
+            print(f"✅ {self.name} vuelve a estar disponible")
+        self.state = CLOSED
+        self._next_probe = time.monotonic() + self.ttl
+    
+    def _failed(self):
+        """Cuenta un fallo y abre el circuito si hace falta (con el lock tomado)"""
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                print(f"⚠️ {self.name} no disponible: circuito abierto durante {self.recovery_timeout:.0f} s")
+            self.state = OPEN
+            self._next_probe = time.monotonic() + self.recovery_timeout
+            self._wake.set()
+        else:
+            self._next_probe = time.monotonic() + self.ttl
+    
+    def start(self):
+        """Arranca el hilo que sondea en segundo plano (el primer sondeo es inmediato)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f'{self.name}-health', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Detiene el hilo de fondo"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    
+    def _run(self):
+        """Sondea cuando toca y espera hasta el siguiente sondeo (o hasta que cambie el circuito)"""
+        while not self._stop.is_set():
+            with self._lock:
+                delay = self._next_probe - time.monotonic()
+            if delay > 0:
+                self._wake.wait(delay)
+                self._wake.clear()
+                continue
+            self.probe()
+    
+    def status(self) -> Dict[str, Any]:
+        """
+        Estado para monitorización
+        
+        Returns:
+            Dict con el estado del circuito, el último resultado, la latencia del
+            último sondeo (segundos) y los fallos seguidos
+        """
+        with self._lock:
+            return {
+                'backend': self.name,
+                'state': self.state,
+                'available': self.is_available(),
+                'last_probe_ok': self.available,
+                'last_probe_latency': round(self.last_probe_latency, 4) if self.last_probe_latency is not None else None,
+                'last_probe_at': self.last_probe_at.isoformat() if self.last_probe_at else None,
+                'consecutive_failures': self.consecutive_failures
+            }
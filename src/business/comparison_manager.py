@@ -1,7 +1,12 @@
-from typing import Dict, Any, Optional
-from src.business.sequence_service import SequenceComparisonService, SequenceValidationError
+from collections import deque
+from typing import Dict, Any, Iterable, Iterator, Optional
+from src.business.sequence_service import SequenceComparisonService, SequenceValidationError, SequenceValidator
+from src.business.sequence_alignment import BandedAligner
+from src.business.mutagenesis_scan import SaturationMutagenesisScanner
 from src.business.alphafold_service import AlphaFoldService, AlphaFoldIntegrationError
 from src.data.repositories import ProteinComparisonRepository, UserRepository
+from src.data.fasta_reader import read_fasta, pair_records
+from src.data.protein_database import ProteinDatabase
 
 class ComparisonManager:
     """Gestor principal para las comparaciones de proteínas"""
@@ -9,6 +14,15 @@ class ComparisonManager:
     def __init__(self, config: Dict[str, Any] = None):
         self.sequence_service = SequenceComparisonService(max_mutations=2)
         self.alphafold_service = AlphaFoldService(config or {}) if config else None
+        self._protein_db = None
+    
+    def _protein_database(self) -> ProteinDatabase:
+        """Base de datos de proteínas conocidas (la del servicio AlphaFold si lo hay)"""
+        if self.alphafold_service:
+            return self.alphafold_service.protein_db
+        if self._protein_db is None:
+            self._protein_db = ProteinDatabase()
+        return self._protein_db
     
     def create_comparison(self, username: str, email: str, original_sequence: str, 
                          mutated_sequence: str, comparison_name: str = None, 
@@ -88,15 +102,14 @@ class ComparisonManager:
             return None
         
         # Recrear el análisis de mutaciones para mostrar detalles
-        differences = []
         original = comparison.original_sequence
         mutated = comparison.mutated_sequence
+        if SequenceValidator.validate_sequence_length(original, mutated):
+            differences = SequenceValidator.find_differences(original, mutated)
+        else:
+            # Comparación con inserciones/deleciones: hay que alinear
+            differences = BandedAligner().align(original, mutated)
         
-        for i, (orig_aa, mut_aa) in enumerate(zip(original, mutated)):
-            if orig_aa != mut_aa:
-                differences.append((i + 1, orig_aa, mut_aa))
-        
-        from src.business.sequence_service import SequenceValidator
         mutations_summary = SequenceValidator.get_mutation_summary(differences)
         
         return {
@@ -109,6 +122,125 @@ class ComparisonManager:
             }
         }
     
+    def iter_fasta_comparisons(self, lines: Iterable, username: str = None, email: str = None,
+                               save: bool = True, processes: int = None) -> Iterator[Dict[str, Any]]:
+        """
+        Valida (y opcionalmente guarda) las comparaciones de un multi-FASTA en streaming
+        
+        Los registros se emparejan por encabezado ('>ID|original' / '>ID|mutated')
+        y se validan en lotes con SequenceComparisonService.validate_and_compare_many,
+        así que la memoria no crece con el tamaño del archivo.
+        
+        Args:
+            lines: Archivo abierto o iterable de líneas FASTA (str o bytes)
+            username: Usuario dueño de las comparaciones (obligatorio si save=True)
+            email: Email del usuario (obligatorio si save=True)
+            save: Si guardar las comparaciones válidas en la base de datos
+            processes: Procesos para validar los lotes en paralelo
+        
+        Yields:
+            Dict por par con 'pair_id', 'valid', 'description', 'comparison_id' y 'errors'
+        """
+        user = UserRepository.get_or_create_user(username, email) if save else None
+        
+        # Los IDs se guardan en el mismo orden en que se entregan los pares al servicio;
+        # como mucho quedan pendientes los lotes en vuelo
+        pair_ids = deque()
+        
+        def pairs():
+            for pair_id, original, mutated in pair_records(read_fasta(lines)):
+                pair_ids.append(pair_id)
+                yield original, mutated
+        
+        for validation in self.sequence_service.validate_and_compare_many(pairs(), processes=processes):
+            pair_id = pair_ids.popleft()
+            result = {
+                'pair_id': pair_id,
+                'valid': validation['valid'],
+                'description': validation['description'],
+                'comparison_id': None,
+                'errors': validation['errors']
+            }
+            
+            if validation['valid'] and save:
+                try:
+                    comparison = ProteinComparisonRepository.create_comparison(
+                        user_id=user.id,
+                        original_sequence=validation['original_sequence'],
+                        mutated_sequence=validation['mutated_sequence'],
+                        mutation_positions=[pos for pos, _, _ in validation['differences']],
+                        mutations_description=validation['description'],
+                        comparison_name=pair_id
+                    )
+                    result['comparison_id'] = comparison.id
+                except Exception as e:
+                    result['valid'] = False
+                    result['errors'] = [f"Error al crear la comparación: {str(e)}"]
+            
+            yield result
+    
+    def scan_saturation_mutagenesis(self, sequence: str = None, uniprot_id: str = None) -> Dict[str, Any]:
+        """
+        Puntúa todas las mutaciones puntuales de una secuencia de referencia
+        
+        Args:
+            sequence: Secuencia de referencia
+            uniprot_id: UniProt ID de una proteína conocida (alternativa a la secuencia)
+            
+        Returns:
+            Dict con la tabla posición × aminoácido o los errores
+        """
+        result = {
+            'success': False,
+            'scan': None,
+            'errors': []
+        }
+        
+        if not sequence and not uniprot_id:
+            result['errors'].append("Debe indicar una secuencia o un UniProt ID")
+            return result
+        
+        protein_db = self._protein_database() if uniprot_id else None
+        try:
+            result['scan'] = SaturationMutagenesisScanner(protein_db).scan(sequence, uniprot_id)
+            result['success'] = True
+        except SequenceValidationError as e:
+            result['errors'].append(str(e))
+        
+        return result
+    
+    def get_protein_database_statistics(self) -> Dict[str, Any]:
+        """
+        Estadísticas de la base de datos de proteínas conocidas
+        
+        Returns:
+            Dict con número de proteínas, longitudes, histograma y organismos
+            (mantenidas de forma incremental, sin recorrer la base de datos)
+        """
+        return self._protein_database().get_statistics()
+    
+    def get_backend_status(self) -> Dict[str, Any]:
+        """
+        Estado de los backends externos (vacío si AlphaFold no está habilitado)
+        
+        Returns:
+            Dict con el estado del circuit breaker y la latencia del último sondeo de cada backend
+        """
+        if not self.alphafold_service:
+            return {}
+        return self.alphafold_service.get_backend_status()
+    
+    def get_prediction_cache_stats(self) -> Dict[str, Any]:
+        """
+        Estadísticas de la caché de predicciones (vacío si AlphaFold no está habilitado)
+        
+        Returns:
+            Dict con aciertos, fallos, entradas y bytes ocupados
+        """
+        if not self.alphafold_service:
+            return {}
+        return self.alphafold_service.get_prediction_cache_stats()
+    
     def get_user_comparisons(self, username: str) -> Dict[str, Any]:
         """
         Obtiene todas las comparaciones de un usuario
@@ -0,0 +1,337 @@
+"""
+Transporte HTTP compartido para AlphaFold DB y ColabFold
+Reutiliza conexiones por host, reintenta los GET con espera exponencial y mide la latencia por host
+"""
+import gzip
+import hashlib
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se excluyen los hilos del propio proceso
+    fcntl = None
+
+# Códigos de estado transitorios que justifican reintentar un GET
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Descargas: bytes escritos en cada bloque y sufijo del archivo parcial
+DOWNLOAD_CHUNK_SIZE = 1 << 16
+PART_SUFFIX = '.part'
+LOCK_SUFFIX = '.lock'
+_GZIP_MAGIC = b'\x1f\x8b'
+
+
+class DownloadError(OSError):
+    """La descarga terminó pero no coincide con el tamaño o la suma de comprobación esperados"""
+    pass
+
+
+def _content_range(response: requests.Response) -> Tuple[Optional[int], Optional[int]]:
+    """(primer byte, tamaño total) de la cabecera Content-Range ('bytes 100-199/1000' o 'bytes */1000')"""
+    value = response.headers.get('Content-Range', '')
+    try:
+        span, total = value.split(' ', 1)[1].split('/')
+        start = None if span == '*' else int(span.split('-')[0])
+        return start, None if total == '*' else int(total)
+    except (IndexError, ValueError):
+        return None, None
+
+
+_part_locks: Dict[str, threading.Lock] = {}
+_part_locks_guard = threading.Lock()
+
+
+@contextmanager
+def _exclusive(part: Path):
+    """
+    Bloqueo exclusivo del archivo parcial entre hilos y procesos
+    
+    Se bloquea un archivo .lock al lado del parcial y se borra antes de
+    soltarlo. Quien esperaba con el archivo ya borrado lo detecta (su inodo ya
+    no es el de la ruta) y vuelve a intentarlo con el nuevo.
+    """
+    if fcntl is None:
+        with _part_locks_guard:
+            lock = _part_locks.setdefault(str(part), threading.Lock())
+        with lock:
+            yield
+        return
+    
+    lock_path = part.with_name(part.name + LOCK_SUFFIX)
+    while True:
+        handle = open(lock_path, 'a')
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            if os.stat(lock_path).st_ino == os.fstat(handle.fileno()).st_ino:
+                break
+        except FileNotFoundError:
+            pass
+        handle.close()
+    try:
+        yield
+    finally:
+        lock_path.unlink(missing_ok=True)
+        handle.close()
+
+
+class HttpTransport:
+    """
+    Sesiones keep-alive por host con un pool de conexiones acotado
+    
+    Cada host tiene su propia requests.Session, así que las conexiones TCP/TLS
+    se reutilizan entre peticiones. El pool admite pool_size conexiones por host
+    (una por hilo de trabajo) y, si están todas ocupadas, la petición espera a
+    que quede una libre en lugar de abrir otra. Los GET y HEAD se reintentan
+    ante errores de conexión y estados transitorios; los POST solo si la
+    conexión no llegó a establecerse.
+    """
+    
+    def __init__(self, pool_size: int = 10, retries: int = 3, backoff_factor: float = 0.5):
+        """
+        Args:
+            pool_size: Conexiones simultáneas por host
+            retries: Reintentos de cada petición (0 = ninguno)
+            backoff_factor: Espera base entre reintentos (se duplica en cada uno)
+        """
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self._sessions: Dict[Tuple[str, bool], requests.Session] = {}
+        self._latency: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+    
+    def _session(self, host: str, retry: bool) -> requests.Session:
+        """Sesión del host (se crea la primera vez)"""
+        key = (host, retry)
+        session = self._sessions.get(key)
+        if session is not None:
+            return session
+        
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                max_retries = Retry(
+                    total=self.retries,
+                    backoff_factor=self.backoff_factor,
+                    status_forcelist=RETRY_STATUSES,
+                    allowed_methods=frozenset({'GET', 'HEAD'}),
+                    raise_on_status=False
+                ) if retry and self.retries else 0
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size,
+                                      pool_block=True, max_retries=max_retries)
+                session = requests.Session()
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._sessions[key] = session
+        return session
+    
+    def request(self, method: str, url: str, retry: bool = True, **kwargs) -> requests.Response:
+        """
+        Hace una petición por la sesión del host de la URL
+        
+        Args:
+            method: Método HTTP
+            url: URL completa
+            retry: False para un único intento (p. ej. sondeos de salud)
+            **kwargs: Argumentos de requests (timeout, json, stream, headers...)
+        
+        Returns:
+            La respuesta de requests
+        
+        Raises:
+            requests.RequestException: Si la petición falla tras los reintentos
+        """
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        start = time.perf_counter()
+        failed = True
+        try:
+            response = self._session(host, retry).request(method, url, **kwargs)
+            failed = False
+            return response
+        finally:
+            self._record(host, time.perf_counter() - start, failed)
+    
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """GET por la sesión del host (ver request)"""
+        return self.request('GET', url, **kwargs)
+    
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """POST por la sesión del host (ver request)"""
+        return self.request('POST', url, **kwargs)
+    
+    def download(self, url: str, destination: Union[str, Path], part_path: Union[str, Path, None] = None,
+                 expected_size: Optional[int] = None, sha256: Optional[str] = None,
+                 timeout: float = 30) -> Dict[str, Any]:
+        """
+        Descarga un archivo por bloques directamente a disco
+        
+        El cuerpo se escribe en un archivo parcial a medida que llega (descomprimido
+        si el servidor usa Content-Encoding gzip). Si la conexión se corta, o si el
+        archivo parcial ya existía de un intento anterior, se pide solo el resto con
+        una cabecera Range. Al terminar se comprueban el tamaño y la suma SHA-256 y
+        el archivo se mueve a su destino con os.replace. Un cuerpo que es a su vez
+        un archivo gzip (p. ej. model.cif.gz) se descomprime al moverlo, salvo que
+        el destino también termine en .gz. Mientras dura, el archivo parcial se
+        bloquea en exclusiva: otra descarga de la misma URL (de este u otro
+        proceso) espera a que termine y luego empieza la suya desde cero.
+        
+        Args:
+            url: URL del archivo
+            destination: Ruta final
+            part_path: Archivo parcial (por defecto destination + '.part'); conviene
+                que dependa solo de la URL para poder reanudar desde otra llamada
+            expected_size: Tamaño esperado en bytes (por defecto el que anuncie el servidor)
+            sha256: Suma SHA-256 esperada del cuerpo recibido (antes de descomprimir el .gz)
+            timeout: Segundos de espera de cada conexión y de cada bloque
+        
+        Returns:
+            Dict con path, size, sha256, content_type y resumed (si se reanudó)
+        
+        Raises:
+            requests.RequestException: Si la descarga falla tras los reintentos
+            DownloadError: Si el tamaño o la suma no coinciden (el parcial se borra)
+        """
+        destination = Path(destination)
+        part = Path(part_path) if part_path else destination.with_name(destination.name + PART_SUFFIX)
+        part.parent.mkdir(parents=True, exist_ok=True)
+        
+        with _exclusive(part):
+            return self._download(url, destination, part, expected_size, sha256, timeout)
+    
+    def _download(self, url: str, destination: Path, part: Path, expected_size: Optional[int],
+                  sha256: Optional[str], timeout: float) -> Dict[str, Any]:
+        """Descarga con el archivo parcial ya bloqueado (ver download)"""
+        hasher = hashlib.sha256()
+        offset = part.stat().st_size if part.exists() else 0
+        if offset:
+            with open(part, 'rb') as handle:
+                for chunk in iter(lambda: handle.read(DOWNLOAD_CHUNK_SIZE), b''):
+                    hasher.update(chunk)
+        
+        resumed = False
+        total = validator = None
+        content_type = ''
+        attempt = 0
+        while True:
+            headers = {}
+            if offset:
+                # Range cuenta bytes de la representación sin comprimir
+                headers = {'Range': f'bytes={offset}-', 'Accept-Encoding': 'identity'}
+                if validator:
+                    headers['If-Range'] = validator
+            try:
+                with self.get(url, stream=True, timeout=timeout, headers=headers) as response:
+                    if response.status_code == 416:
+                        # El parcial ya estaba completo (o no corresponde a este archivo)
+                        total = _content_range(response)[1]
+                        if total == offset:
+                            break
+                        part.unlink()
+                        hasher, offset = hashlib.sha256(), 0
+                        continue
+                    response.raise_for_status()
+                    
+                    start, range_total = _content_range(response)
+                    if response.status_code == 206 and start != offset:
+                        # Rango inesperado: se vuelve a pedir el archivo completo
+                        part.unlink(missing_ok=True)
+                        hasher, offset = hashlib.sha256(), 0
+                        continue
+                    if response.status_code == 206:
+                        mode, total, resumed = 'ab', range_total, True
+                    else:
+                        # El servidor envía el archivo completo: se empieza de cero
+                        mode, hasher, offset = 'wb', hashlib.sha256(), 0
+                        encoded = response.headers.get('Content-Encoding', 'identity') != 'identity'
+                        length = response.headers.get('Content-Length')
+                        total = int(length) if length and not encoded else None
+                    validator = response.headers.get('ETag') or response.headers.get('Last-Modified')
+                    content_type = response.headers.get('Content-Type', '')
+                    
+                    with open(part, mode) as handle:
+                        for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                            handle.write(chunk)
+                            hasher.update(chunk)
+                            offset += len(chunk)
+                break
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                attempt += 1
+                if attempt > self.retries:
+                    raise
+                print(f"⚠️ Descarga interrumpida ({e}), se reanuda desde el byte {offset}")
+        
+        digest = hasher.hexdigest()
+        expected_size = expected_size if expected_size is not None else total
+        if expected_size is not None and offset != expected_size:
+            part.unlink()
+            raise DownloadError(f"Descarga incompleta de {url}: {offset} de {expected_size} bytes")
+        if sha256 and digest != sha256.lower():
+            part.unlink()
+            raise DownloadError(f"Suma SHA-256 incorrecta en {url}")
+        
+        with open(part, 'rb') as handle:
+            compressed = handle.read(len(_GZIP_MAGIC)) == _GZIP_MAGIC
+        if compressed and destination.suffix != '.gz':
+            unpacked = part.with_name(part.name + '.gunzip')
+            try:
+                with gzip.open(part, 'rb') as source, open(unpacked, 'wb') as target:
+                    shutil.copyfileobj(source, target, DOWNLOAD_CHUNK_SIZE)
+                os.replace(unpacked, destination)
+            finally:
+                unpacked.unlink(missing_ok=True)
+                part.unlink(missing_ok=True)
+        else:
+            os.replace(part, destination)
+        
+        return {'path': str(destination), 'size': offset, 'sha256': digest,
+                'content_type': content_type, 'resumed': resumed}
+    
+    def _record(self, host: str, elapsed: float, failed: bool):
+        """Acumula la latencia de una petición"""
+        with self._lock:
+            counters = self._latency.get(host)
+            if counters is None:
+                counters = self._latency[host] = {'requests': 0, 'errors': 0, 'total_seconds': 0.0,
+                                                  'max_seconds': 0.0, 'last_seconds': 0.0}
+            counters['requests'] += 1
+            counters['errors'] += failed
+            counters['total_seconds'] += elapsed
+            counters['max_seconds'] = max(counters['max_seconds'], elapsed)
+            counters['last_seconds'] = elapsed
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Latencia por host para monitorización
+        
+        Returns:
+            {host: {requests, errors, avg_seconds, max_seconds, last_seconds}}
+        """
+        with self._lock:
+            return {
+                host: {
+                    'requests': counters['requests'],
+                    'errors': counters['errors'],
+                    'avg_seconds': round(counters['total_seconds'] / counters['requests'], 4),
+                    'max_seconds': round(counters['max_seconds'], 4),
+                    'last_seconds': round(counters['last_seconds'], 4)
+                }
+                for host, counters in self._latency.items()
+            }
+    
+    def close(self):
+        """Cierra todas las conexiones"""
+        with self._lock:
+            sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            session.close()
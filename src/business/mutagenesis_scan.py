@@ -0,0 +1,137 @@
+"""
+Escaneo de mutagénesis por saturación
+Puntúa las 19·L mutaciones puntuales de una secuencia en una sola pasada vectorizada
+"""
+from typing import Any, Dict, Optional
+import numpy as np
+from src.business.alphafold_service import AlphaFoldService
+from src.business.sequence_service import SequenceValidator, SequenceValidationError
+from src.data.protein_database import ProteinDatabase
+from src.data.protein_sequence import ProteinSequence, residue_table
+
+# Orden de las columnas de la tabla posición × aminoácido
+SCAN_AMINO_ACIDS = "ARNDCQEGHILKMFPSTWYV"
+
+
+class SaturationMutagenesisScanner:
+    """
+    Genera y puntúa todas las mutaciones puntuales de una secuencia de referencia
+    
+    Usa las mismas heurísticas que AlphaFoldService (_calculate_stability_score,
+    _predict_secondary_structure_confidence e hidrofobicidad de Kyte-Doolittle),
+    pero como operaciones sobre una matriz L×20: cada heurística depende de sumas
+    sobre la secuencia, y una mutación puntual solo cambia un término de la suma.
+    """
+    
+    _HELIX = residue_table(AlphaFoldService.HELIX_PROPENSITY, 1.0)
+    _SHEET = residue_table(AlphaFoldService.SHEET_PROPENSITY, 1.0)
+    _HYDROPHOBICITY = residue_table(AlphaFoldService.HYDROPHOBICITY)
+    _STABILIZING = residue_table(AlphaFoldService.STABILIZING_RESIDUES)
+    _DESTABILIZING = residue_table(AlphaFoldService.DESTABILIZING_RESIDUES)
+    _CHARGED = residue_table(AlphaFoldService.CHARGED_RESIDUES)
+    
+    _SCAN_CODES = np.frombuffer(SCAN_AMINO_ACIDS.encode('ascii'), dtype=np.uint8)
+    
+    def __init__(self, protein_db: Optional[ProteinDatabase] = None):
+        """
+        Args:
+            protein_db: Base de datos para resolver referencias por UniProt ID
+        """
+        self.protein_db = protein_db
+    
+    def scan(self, sequence: str = None, uniprot_id: str = None) -> Dict[str, Any]:
+        """
+        Puntúa todas las mutaciones puntuales de la referencia
+        
+        Args:
+            sequence: Secuencia de referencia
+            uniprot_id: UniProt ID de una proteína de ProteinDatabase (si no hay secuencia)
+        
+        Returns:
+            Dict con la tabla posición × aminoácido de cada heurística ('stability',
+            'secondary_structure_confidence', 'hydrophobicity'), los valores de la
+            secuencia silvestre ('wild_type') y los metadatos de la referencia
+        
+        Raises:
+            SequenceValidationError: Si la referencia no existe o no es válida
+        """
+        reference = self._resolve_reference(sequence, uniprot_id)
+        tables = self.score_mutants(reference)
+        
+        return {
+            'uniprot_id': uniprot_id,
+            'reference_sequence': reference,
+            'length': len(reference),
+            'amino_acids': SCAN_AMINO_ACIDS,
+            'mutant_count': 19 * len(reference),
+            'wild_type': {name: round(float(value), 2) for name, (value, _) in tables.items()},
+            'tables': {name: np.round(table, 2).tolist() for name, (_, table) in tables.items()}
+        }
+    
+    def _resolve_reference(self, sequence: Optional[str], uniprot_id: Optional[str]) -> str:
+        """Obtiene y valida la secuencia de referencia"""
+        if not sequence and uniprot_id:
+            protein = self.protein_db.get_protein_info(uniprot_id) if self.protein_db else None
+            if not protein:
+                raise SequenceValidationError(f"Proteína no encontrada en la base de datos: {uniprot_id}")
+            sequence = protein['sequence']
+        
+        reference = SequenceValidator.clean_sequence(sequence)
+        valid, invalid_chars = SequenceValidator.validate_amino_acids(reference)
+        if not valid:
+            raise SequenceValidationError(
+                f"La secuencia de referencia contiene caracteres inválidos: {', '.join(invalid_chars)}"
+            )
+        return reference
+    
+    def score_mutants(self, reference: str) -> Dict[str, tuple]:
+        """
+        Calcula las tablas L×20 de cada heurística
+        
+        Args:
+            reference: Secuencia de referencia ya validada
+        
+        Returns:
+            Dict {nombre: (valor_silvestre, matriz L×20)}; la celda (i, aa) es el
+            valor de la secuencia con el residuo i reemplazado por aa
+        """
+        codes = ProteinSequence.of(reference).codes
+        length = len(codes)
+        
+        def mutant_sums(table: np.ndarray):
+            # Suma silvestre y suma de cada mutante: total - valor[wt_i] + valor[aa]
+            per_residue = table[codes]
+            total = per_residue.sum()
+            return total, total - per_residue[:, None] + table[self._SCAN_CODES][None, :]
+        
+        helix_total, helix = mutant_sums(self._HELIX)
+        sheet_total, sheet = mutant_sums(self._SHEET)
+        hydro_total, hydro = mutant_sums(self._HYDROPHOBICITY)
+        stab_total, stabilizing = mutant_sums(self._STABILIZING)
+        destab_total, destabilizing = mutant_sums(self._DESTABILIZING)
+        charged_total, charged = mutant_sums(self._CHARGED)
+        
+        return {
+            'stability': (
+                self._stability(stab_total, destab_total, charged_total, length),
+                self._stability(stabilizing, destabilizing, charged, length)
+            ),
+            'secondary_structure_confidence': (
+                self._secondary_structure_confidence(helix_total, sheet_total, length),
+                self._secondary_structure_confidence(helix, sheet, length)
+            ),
+            'hydrophobicity': (hydro_total / length, hydro / length)
+        }
+    
+    @staticmethod
+    def _stability(stabilizing, destabilizing, charged, length):
+        """Versión vectorizada de AlphaFoldService._calculate_stability_score"""
+        charged_ratio = charged / length
+        stability = 60 + (stabilizing / length) * 30 - (destabilizing / length) * 20
+        stability = stability - np.where(charged_ratio > 0.3, (charged_ratio - 0.3) * 50, 0.0)
+        return np.clip(stability, 20, 100)
+    
+    @staticmethod
+    def _secondary_structure_confidence(helix, sheet, length):
+        """Versión vectorizada de AlphaFoldService._predict_secondary_structure_confidence"""
+        return 50 + (1 - np.abs(helix / length - sheet / length)) * 40
@@ -0,0 +1,141 @@
+"""
+Alineamiento global en banda (Needleman-Wunsch) vectorizado con NumPy
+Permite comparar secuencias con inserciones y deleciones en O(L·k)
+"""
+from typing import List, Tuple
+import numpy as np
+
+# Símbolo usado para el hueco en las mutaciones de inserción/deleción
+GAP = '-'
+
+_DIAGONAL, _UP, _LEFT = 0, 1, 2
+
+
+class BandedAligner:
+    """
+    Alineador global restringido a una banda alrededor de la diagonal
+
+    La banda tiene semiancho |len(a) - len(b)| + expected_indels, así que el
+    costo es O(L·k) en lugar de O(L²). Cada fila de la matriz se calcula con
+    operaciones vectorizadas; los huecos horizontales se resuelven con un
+    máximo acumulado (np.maximum.accumulate) en lugar de un bucle.
+    """
+
+    MATCH_SCORE = 2
+    MISMATCH_SCORE = -1
+    GAP_SCORE = -2
+
+    def __init__(self, expected_indels: int = 5):
+        """
+        Args:
+            expected_indels: Número de inserciones/deleciones esperadas además
+                             de la diferencia de longitudes
+        """
+        self.expected_indels = max(0, int(expected_indels))
+
+    def align(self, original: str, mutated: str) -> List[Tuple[int, str, str]]:
+        """
+        Alinea dos secuencias y devuelve las diferencias encontradas
+
+        Args:
+            original: Secuencia original
+            mutated: Secuencia mutada
+
+        Returns:
+            Lista de (posición, amino_original, amino_mutado) donde:
+            - sustitución: ('E', 'V') en la posición de la secuencia original
+            - deleción: ('E', '-') en la posición del residuo eliminado
+            - inserción: ('-', 'A') tras la posición indicada de la original
+        """
+        # El prefijo y el sufijo comunes se alinean sin huecos: solo se alinea el resto
+        limit = min(len(original), len(mutated))
+        prefix = 0
+        while prefix < limit and original[prefix] == mutated[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and original[-1 - suffix] == mutated[-1 - suffix]:
+            suffix += 1
+
+        events = self._align_band(original[prefix:len(original) - suffix],
+                                  mutated[prefix:len(mutated) - suffix])
+        return [(position + prefix, orig, mut) for position, orig, mut in events]
+
+    def _align_band(self, original: str, mutated: str) -> List[Tuple[int, str, str]]:
+        """Alineamiento en banda de dos secuencias (posiciones relativas a 'original')"""
+        a = np.frombuffer(original.encode('utf-32-le'), dtype='<u4')
+        b = np.frombuffer(mutated.encode('utf-32-le'), dtype='<u4')
+        n, m = len(a), len(b)
+        half_width = abs(n - m) + self.expected_indels
+        width = 2 * half_width + 1
+
+        gap = float(self.GAP_SCORE)
+        band = np.arange(width)
+        # Penalización acumulada al recorrer k celdas de la banda en horizontal
+        gap_ramp = band * -gap
+
+        # Columna j de la mutada que corresponde a cada celda (i, c) de la banda;
+        # las celdas fuera de la matriz valen -inf
+        columns = np.arange(n + 1)[:, None] + band[None, :] - half_width
+        outside = np.where((columns >= 0) & (columns <= m), 0.0, -np.inf)
+
+        # Puntuación diagonal de toda la banda, ya enmascarada, en una sola operación
+        substitution = np.full((n, width), -np.inf)
+        if n and m:
+            cols = np.clip(columns[1:] - 1, 0, m - 1)
+            substitution = np.where(a[:, None] == b[cols], float(self.MATCH_SCORE), float(self.MISMATCH_SCORE))
+            substitution[columns[1:] < 1] = -np.inf
+
+        # Movimiento elegido en cada celda: hueco horizontal o, si no, vertical/diagonal
+        from_left = np.zeros((n + 1, width), dtype=bool)
+        from_up = np.zeros((n + 1, width), dtype=bool)
+        previous = columns[0] * gap + outside[0]
+        up = np.full(width, -np.inf)
+        best = np.empty(width)
+        row = np.empty(width)
+
+        for i in range(1, n + 1):
+            diagonal = previous + substitution[i - 1]
+            np.add(previous[1:], gap, out=up[:-1])
+            np.greater(up, diagonal, out=from_up[i])
+
+            np.maximum(diagonal, up, out=best)
+            best += outside[i]
+
+            # H[c] = max(T[c], H[c-1] + gap) resuelto como máximo acumulado
+            np.add(best, gap_ramp, out=row)
+            np.maximum.accumulate(row, out=row)
+            row -= gap_ramp
+            row += outside[i]
+            np.greater(row, best, out=from_left[i])
+
+            previous, row = row, previous
+
+        moves = np.where(from_left, _LEFT, from_up.astype(np.uint8))
+        return self._traceback(original, mutated, moves, half_width)
+
+    @staticmethod
+    def _traceback(original: str, mutated: str, moves: np.ndarray,
+                   half_width: int) -> List[Tuple[int, str, str]]:
+        """Reconstruye las diferencias recorriendo la matriz de movimientos"""
+        events = []
+        i, j = len(original), len(mutated)
+
+        while i > 0 or j > 0:
+            move = moves[i, j - i + half_width] if i > 0 else _LEFT
+            if j == 0:
+                move = _UP
+
+            if move == _DIAGONAL:
+                if original[i - 1] != mutated[j - 1]:
+                    events.append((i, original[i - 1], mutated[j - 1]))
+                i -= 1
+                j -= 1
+            elif move == _UP:
+                events.append((i, original[i - 1], GAP))
+                i -= 1
+            else:
+                events.append((i, GAP, mutated[j - 1]))
+                j -= 1
+
+        events.reverse()
+        return events
@@ -1,5 +1,10 @@
-import re
-from typing import List, Tuple, Dict, Any
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, List, Tuple, Dict, Any
+from src.data import sequence_encoding
+from src.data.protein_sequence import ProteinSequence, clean_text, residue_table
+from src.business.sequence_alignment import BandedAligner, GAP
 
 class SequenceValidationError(Exception):
     """Excepción personalizada para errores de validación de secuencias"""
@@ -23,6 +28,8 @@ class SequenceValidator:
         'T': 'Treonina', 'W': 'Triptófano', 'Y': 'Tirosina', 'V': 'Valina'
     }
     
+    _VALID_AMINO_ACID_TABLE = residue_table(VALID_AMINO_ACIDS)
+    
     @classmethod
     def clean_sequence(cls, sequence: str) -> str:
         """Limpia la secuencia removiendo espacios y convirtiendo a mayúsculas"""
@@ -30,7 +37,7 @@ class SequenceValidator:
             raise SequenceValidationError("La secuencia no puede estar vacía")
         
         # Remover espacios, saltos de línea y convertir a mayúsculas
-        cleaned = re.sub(r'\s+', '', sequence.upper())
+        cleaned = clean_text(sequence)
         
         # Validar que después de limpiar no quede vacía
         if not cleaned:
@@ -46,6 +53,11 @@ class SequenceValidator:
         Returns:
             Tuple[bool, List[str]]: (es_válida, lista_de_caracteres_inválidos)
         """
+        # Camino rápido: la composición compartida cubre toda la secuencia con residuos válidos
+        protein = ProteinSequence.of(sequence)
+        if protein.weighted_sum(cls._VALID_AMINO_ACID_TABLE) == len(protein):
+            return True, []
+        
         invalid_chars = []
         for char in sequence:
             if char not in cls.VALID_AMINO_ACIDS:
@@ -67,12 +79,20 @@ class SequenceValidator:
         Returns:
             List[Tuple[int, str, str]]: Lista de (posición, amino_original, amino_mutado)
         """
-        differences = []
-        for i, (orig_aa, mut_aa) in enumerate(zip(original, mutated)):
-            if orig_aa != mut_aa:
-                differences.append((i + 1, orig_aa, mut_aa))  # Posición 1-indexed
+        return sequence_encoding.find_differences(original, mutated)  # Posición 1-indexed
+    
+    @classmethod
+    def find_differences_batch(cls, pairs: Iterable[Tuple[str, str]]) -> List[List[Tuple[int, str, str]]]:
+        """
+        Encuentra las diferencias de muchos pares de secuencias en una sola llamada
         
-        return differences
+        Args:
+            pairs: Iterable de tuplas (original, mutada)
+            
+        Returns:
+            Lista (una por par) de listas de (posición, amino_original, amino_mutado)
+        """
+        return sequence_encoding.find_differences_batch(pairs)
     
     @classmethod
     def validate_mutation_count(cls, differences: List[Tuple[int, str, str]], 
@@ -93,10 +113,34 @@ class SequenceValidator:
         """
         mutations = []
         for pos, orig, mut in differences:
-            mutations.append(f"{orig}{pos}{mut}")
+            mutations.append(cls.format_mutation_notation(pos, orig, mut))
         
         return ", ".join(mutations)
     
+    @classmethod
+    def get_mutation_type(cls, orig: str, mut: str) -> str:
+        """Clasifica una diferencia como sustitución, inserción o deleción"""
+        if orig == GAP:
+            return 'insertion'
+        if mut == GAP:
+            return 'deletion'
+        return 'substitution'
+    
+    @classmethod
+    def format_mutation_notation(cls, pos: int, orig: str, mut: str) -> str:
+        """
+        Formatea una diferencia en notación compacta
+        
+        Returns:
+            str: "E6V" (sustitución), "E6del" (deleción) o "6_7insA" (inserción)
+        """
+        mutation_type = cls.get_mutation_type(orig, mut)
+        if mutation_type == 'deletion':
+            return f"{orig}{pos}del"
+        if mutation_type == 'insertion':
+            return f"{pos}_{pos + 1}ins{mut}"
+        return f"{orig}{pos}{mut}"
+    
     @classmethod
     def get_mutation_summary(cls, differences: List[Tuple[int, str, str]]) -> Dict[str, Any]:
         """
@@ -119,7 +163,8 @@ class SequenceValidator:
                 'mutated_amino_acid': mut,
                 'original_name': cls.AMINO_ACID_NAMES.get(orig, orig),
                 'mutated_name': cls.AMINO_ACID_NAMES.get(mut, mut),
-                'mutation_notation': f"{orig}{pos}{mut}"
+                'mutation_notation': cls.format_mutation_notation(pos, orig, mut),
+                'mutation_type': cls.get_mutation_type(orig, mut)
             }
             summary['mutations'].append(mutation_info)
         
@@ -128,8 +173,42 @@ class SequenceValidator:
 class SequenceComparisonService:
     """Servicio principal para comparar secuencias de proteínas"""
     
-    def __init__(self, max_mutations: int = 2):
+    NO_DIFFERENCES_ERROR = "No se encontraron diferencias entre las secuencias"
+    
+    # Tamaño de los lotes que se validan juntos (y que se envían a cada proceso)
+    BATCH_CHUNK_SIZE = 2000
+    
+    _VALID_CHARSET_MASK = sequence_encoding.build_charset_mask(SequenceValidator.VALID_AMINO_ACIDS)
+    
+    def __init__(self, max_mutations: int = 2, alignment_mode: bool = False,
+                 expected_indels: int = 5):
+        """
+        Args:
+            max_mutations: Máximo de mutaciones permitidas por comparación
+            alignment_mode: Si alinear las secuencias (permite inserciones y deleciones)
+            expected_indels: Indels esperados; define el ancho de banda del alineamiento
+        """
         self.max_mutations = max_mutations
+        self.alignment_mode = alignment_mode
+        self.expected_indels = expected_indels
+        self.aligner = BandedAligner(expected_indels) if alignment_mode else None
+    
+    @staticmethod
+    def _invalid_characters_error(label: str, invalid_chars: List[str]) -> str:
+        return f"La secuencia {label} contiene caracteres inválidos: {', '.join(invalid_chars)}"
+    
+    @staticmethod
+    def _length_error(clean_original: str, clean_mutated: str) -> str:
+        return (f"Las secuencias tienen diferentes longitudes: original={len(clean_original)}, "
+                f"mutada={len(clean_mutated)}")
+    
+    def _mutation_count_error(self, differences: List[Tuple[int, str, str]]) -> str:
+        return (f"Demasiadas mutaciones encontradas: {len(differences)}. "
+                f"Máximo permitido: {self.max_mutations}")
+    
+    @staticmethod
+    def _unexpected_error(error: Exception) -> str:
+        return f"Error inesperado durante la validación: {str(error)}"
     
     def validate_and_compare_sequences(self, original_sequence: str, 
                                      mutated_sequence: str) -> Dict[str, Any]:
@@ -166,45 +245,39 @@ class SequenceComparisonService:
             # Validar caracteres válidos en secuencia original
             valid_orig, invalid_orig = SequenceValidator.validate_amino_acids(clean_original)
             if not valid_orig:
-                result['errors'].append(
-                    f"La secuencia original contiene caracteres inválidos: {', '.join(invalid_orig)}"
-                )
+                result['errors'].append(self._invalid_characters_error('original', invalid_orig))
             
             # Validar caracteres válidos en secuencia mutada
             valid_mut, invalid_mut = SequenceValidator.validate_amino_acids(clean_mutated)
             if not valid_mut:
-                result['errors'].append(
-                    f"La secuencia mutada contiene caracteres inválidos: {', '.join(invalid_mut)}"
-                )
+                result['errors'].append(self._invalid_characters_error('mutada', invalid_mut))
             
             # Si hay caracteres inválidos, no continuar
             if not (valid_orig and valid_mut):
                 return result
             
-            # Validar longitud
-            if not SequenceValidator.validate_sequence_length(clean_original, clean_mutated):
-                result['errors'].append(
-                    f"Las secuencias tienen diferentes longitudes: original={len(clean_original)}, "
-                    f"mutada={len(clean_mutated)}"
-                )
-                return result
+            if self.alignment_mode:
+                # Alinear para detectar sustituciones, inserciones y deleciones
+                differences = self.aligner.align(clean_original, clean_mutated)
+            else:
+                # Validar longitud
+                if not SequenceValidator.validate_sequence_length(clean_original, clean_mutated):
+                    result['errors'].append(self._length_error(clean_original, clean_mutated))
+                    return result
+                
+                # Encontrar diferencias
+                differences = SequenceValidator.find_differences(clean_original, clean_mutated)
             
             result['sequence_length'] = len(clean_original)
             
-            # Encontrar diferencias
-            differences = SequenceValidator.find_differences(clean_original, clean_mutated)
-            
             # Validar número de mutaciones
             if not SequenceValidator.validate_mutation_count(differences, self.max_mutations):
-                result['errors'].append(
-                    f"Demasiadas mutaciones encontradas: {len(differences)}. "
-                    f"Máximo permitido: {self.max_mutations}"
-                )
+                result['errors'].append(self._mutation_count_error(differences))
                 return result
             
             # Si no hay mutaciones
             if len(differences) == 0:
-                result['errors'].append("No se encontraron diferencias entre las secuencias")
+                result['errors'].append(self.NO_DIFFERENCES_ERROR)
                 return result
             
             # Generar resumen de mutaciones
@@ -214,6 +287,132 @@ class SequenceComparisonService:
         except SequenceValidationError as e:
             result['errors'].append(str(e))
         except Exception as e:
-            result['errors'].append(f"Error inesperado durante la validación: {str(e)}")
+            result['errors'].append(self._unexpected_error(e))
         
         return result
+    
+    def validate_and_compare_many(self, pairs: Iterable[Tuple[str, str]],
+                                  chunk_size: int = None,
+                                  processes: int = None) -> Iterator[Dict[str, Any]]:
+        """
+        Valida y compara muchos pares de secuencias de forma perezosa
+        
+        Los pares se consumen en lotes; en cada lote la validación de caracteres
+        y la búsqueda de diferencias se hacen con una sola pasada vectorizada.
+        Con processes > 1 los lotes se reparten en un pool de procesos, sin
+        tener en memoria más de 2 lotes pendientes por proceso.
+        
+        Args:
+            pairs: Iterable o generador de tuplas (original, mutada)
+            chunk_size: Pares por lote (por defecto BATCH_CHUNK_SIZE)
+            processes: Número de procesos; None o 1 procesa en el proceso actual
+            
+        Yields:
+            Un resultado compacto por par, en el mismo orden de entrada, con las
+            claves 'valid', 'original_sequence', 'mutated_sequence',
+            'sequence_length', 'differences', 'description' y 'errors' (mismos
+            errores que validate_and_compare_sequences)
+        """
+        chunk_size = chunk_size or self.BATCH_CHUNK_SIZE
+        iterator = iter(pairs)
+        chunks = iter(lambda: list(islice(iterator, chunk_size)), [])
+        
+        if not processes or processes <= 1:
+            for chunk in chunks:
+                yield from self._compare_chunk(chunk)
+            return
+        
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(
+                    _compare_pairs_chunk, chunk, self.max_mutations,
+                    self.alignment_mode, self.expected_indels
+                ))
+                if len(pending) >= processes * 2:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+    
+    def _compare_chunk(self, chunk: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Valida y compara un lote de pares
+        
+        Args:
+            chunk: Lista de tuplas (original, mutada)
+            
+        Returns:
+            Lista de resultados compactos, uno por par
+        """
+        results = []
+        cleaned = []
+        
+        # Limpieza por par: los errores se reportan igual que en el flujo individual
+        for original_sequence, mutated_sequence in chunk:
+            result = {
+                'valid': False,
+                'original_sequence': '',
+                'mutated_sequence': '',
+                'sequence_length': 0,
+                'differences': [],
+                'description': '',
+                'errors': []
+            }
+            results.append(result)
+            try:
+                clean_original = SequenceValidator.clean_sequence(original_sequence)
+                clean_mutated = SequenceValidator.clean_sequence(mutated_sequence)
+                result['original_sequence'] = clean_original
+                result['mutated_sequence'] = clean_mutated
+                cleaned.append((result, clean_original, clean_mutated))
+            except SequenceValidationError as e:
+                result['errors'].append(str(e))
+            except Exception as e:
+                result['errors'].append(self._unexpected_error(e))
+        
+        # Validación de caracteres de todo el lote en una sola pasada
+        sequences = [seq for _, clean_original, clean_mutated in cleaned
+                     for seq in (clean_original, clean_mutated)]
+        invalid_flags = sequence_encoding.find_invalid_sequences(sequences, self._VALID_CHARSET_MASK)
+        
+        comparable = []
+        for index, (result, clean_original, clean_mutated) in enumerate(cleaned):
+            if invalid_flags[2 * index] or invalid_flags[2 * index + 1]:
+                for label, sequence in (('original', clean_original), ('mutada', clean_mutated)):
+                    valid, invalid_chars = SequenceValidator.validate_amino_acids(sequence)
+                    if not valid:
+                        result['errors'].append(self._invalid_characters_error(label, invalid_chars))
+            elif (not self.alignment_mode
+                  and not SequenceValidator.validate_sequence_length(clean_original, clean_mutated)):
+                result['errors'].append(self._length_error(clean_original, clean_mutated))
+            else:
+                result['sequence_length'] = len(clean_original)
+                comparable.append((result, clean_original, clean_mutated))
+        
+        if self.alignment_mode:
+            all_differences = [self.aligner.align(clean_original, clean_mutated)
+                               for _, clean_original, clean_mutated in comparable]
+        else:
+            # Diferencias de todos los pares comparables con un único kernel
+            all_differences = SequenceValidator.find_differences_batch(
+                (clean_original, clean_mutated) for _, clean_original, clean_mutated in comparable
+            )
+        
+        for (result, _, _), differences in zip(comparable, all_differences):
+            if not SequenceValidator.validate_mutation_count(differences, self.max_mutations):
+                result['errors'].append(self._mutation_count_error(differences))
+            elif len(differences) == 0:
+                result['errors'].append(self.NO_DIFFERENCES_ERROR)
+            else:
+                result['differences'] = differences
+                result['description'] = SequenceValidator.format_mutations_description(differences)
+                result['valid'] = True
+        
+        return results
+
+
+def _compare_pairs_chunk(chunk: List[Tuple[str, str]], max_mutations: int,
+                         alignment_mode: bool, expected_indels: int) -> List[Dict[str, Any]]:
+    """Punto de entrada de los procesos del pool para validar un lote"""
+    service = SequenceComparisonService(max_mutations, alignment_mode, expected_indels)
+    return service._compare_chunk(chunk)
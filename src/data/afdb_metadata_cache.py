@@ -0,0 +1,107 @@
+"""
+Caché persistente de los metadatos de AlphaFold DB por identificador UniProt
+Guarda también las consultas sin resultado para no repetirlas hasta que caduquen
+"""
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+AFDB_METADATA_DATABASE = 'afdb_metadata.sqlite'
+
+
+class AlphaFoldMetadataCache:
+    """
+    UniProt → primera entrada de /api/prediction/{uniprot_id} con caducidad por entrada
+    
+    Las entradas se guardan en SQLite en modo WAL, así que las comparten todos
+    los procesos; cada proceso mantiene además una copia en memoria de las que
+    ya ha leído, de modo que una consulta repetida no toca ni la red ni el disco.
+    Un resultado negativo (404 o lista vacía) se guarda como None con su propia
+    caducidad, normalmente más corta.
+    """
+    
+    def __init__(self, path: Union[str, Path], ttl: float = 7 * 86400, negative_ttl: float = 86400):
+        """
+        Args:
+            path: Archivo SQLite (su directorio se crea si no existe)
+            ttl: Segundos que vale una entrada encontrada
+            negative_ttl: Segundos que vale una consulta sin resultado
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        
+        self._memory: Dict[str, Tuple[Optional[Dict[str, Any]], float]] = {}
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS afdb_metadata ('
+            'uniprot_id TEXT PRIMARY KEY, entry TEXT, expires REAL NOT NULL)'
+        )
+    
+    def lookup(self, uniprot_id: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Busca los metadatos de una proteína
+        
+        Args:
+            uniprot_id: Identificador UniProt
+        
+        Returns:
+            (encontrado, entrada): encontrado es False si no hay entrada vigente y hay
+            que consultar la API; entrada es None si la consulta anterior no dio resultado
+        """
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(uniprot_id)
+            if cached is None or cached[1] <= now:
+                row = self._connection.execute(
+                    'SELECT entry, expires FROM afdb_metadata WHERE uniprot_id = ?', (uniprot_id,)).fetchone()
+                cached = (json.loads(row[0]) if row[0] is not None else None, row[1]) if row else None
+                if cached is not None:
+                    self._memory[uniprot_id] = cached
+            
+            if cached is None or cached[1] <= now:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+            return True, cached[0]
+    
+    def store(self, uniprot_id: str, entry: Optional[Dict[str, Any]]):
+        """
+        Guarda el resultado de una consulta a la API
+        
+        Args:
+            uniprot_id: Identificador UniProt
+            entry: Primera entrada devuelta por la API, o None si no había ninguna
+        """
+        expires = time.time() + (self.ttl if entry is not None else self.negative_ttl)
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO afdb_metadata (uniprot_id, entry, expires) VALUES (?, ?, ?)',
+                (uniprot_id, json.dumps(entry) if entry is not None else None, expires)
+            )
+            self._memory[uniprot_id] = (entry, expires)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Aciertos y fallos de este proceso y entradas guardadas
+        
+        Returns:
+            Dict con hits, misses, entries y negative_entries (incluidas las caducadas)
+        """
+        with self._lock:
+            entries, negative = self._connection.execute(
+                'SELECT COUNT(*), COALESCE(SUM(entry IS NULL), 0) FROM afdb_metadata').fetchone()
+            return {'hits': self.hits, 'misses': self.misses, 'entries': entries, 'negative_entries': negative}
+    
+    def close(self):
+        """Cierra la base de datos"""
+        with self._lock:
+            self._connection.close()
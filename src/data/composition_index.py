@@ -0,0 +1,129 @@
+"""
+Vectores de composición de aminoácidos para descartar candidatas antes de compararlas
+Media distancia L1 entre composiciones es una cota inferior de las diferencias posición a posición
+"""
+from array import array
+from typing import Optional, Sequence
+import numpy as np
+from src.data.sequence_matrix import MAX_LENGTH_DIFFERENCE
+
+AMINO_ACIDS = 'ACDEFGHIKLMNPQRSTVWY'
+
+# Columna de cada byte; el resto de caracteres van a una columna extra que se descarta
+_OTHER = len(AMINO_ACIDS)
+_COLUMNS = np.full(256, _OTHER, dtype=np.int64)
+_COLUMNS[np.frombuffer(AMINO_ACIDS.encode('ascii'), dtype=np.uint8)] = np.arange(len(AMINO_ACIDS))
+
+
+def composition_vectors(sequences: Sequence[str]) -> np.ndarray:
+    """
+    Matriz N×20 int32 con el número de cada aminoácido estándar por secuencia
+    
+    Args:
+        sequences: Secuencias (los caracteres fuera de los 20 estándar no se cuentan)
+    """
+    if not len(sequences):
+        return np.zeros((0, len(AMINO_ACIDS)), dtype=np.int32)
+    
+    lengths = np.fromiter((len(sequence) for sequence in sequences), dtype=np.int64, count=len(sequences))
+    columns = _COLUMNS[np.frombuffer(''.join(sequences).encode('ascii', errors='replace'), dtype=np.uint8)]
+    # errors='replace' deja un byte por carácter, así que las filas siguen alineadas
+    rows = np.repeat(np.arange(len(sequences), dtype=np.int64), lengths)
+    counts = np.bincount(rows * (_OTHER + 1) + columns, minlength=len(sequences) * (_OTHER + 1))
+    return counts.reshape(len(sequences), _OTHER + 1)[:, :_OTHER].astype(np.int32)
+
+
+class CompositionIndex:
+    """
+    Composición de aminoácidos de cada entrada (matriz N×20 int32)
+    
+    Cota: entre dos secuencias de longitudes n1 y n2 comparadas en sus primeras
+    m = min(n1, n2) posiciones, cada diferencia cambia a lo sumo dos componentes
+    en una unidad y los residuos sobrantes de la más larga suman |n1 - n2| a la
+    distancia L1. Por tanto diferencias >= (L1 - |n1 - n2|) / 2 y una entrada se
+    descarta si ni siquiera con ese mínimo de diferencias alcanza la similitud.
+    """
+    
+    def __init__(self):
+        self._vectors = np.zeros((0, len(AMINO_ACIDS)), dtype=np.int32)
+        self._lengths = array('i')
+        self._active = bytearray()
+    
+    def __len__(self) -> int:
+        return len(self._lengths)
+    
+    def build(self, sequences: Sequence[str]):
+        """
+        Reconstruye el índice; la entrada i corresponde a sequences[i]
+        
+        Args:
+            sequences: Secuencias de la base de datos
+        """
+        self._vectors = composition_vectors(sequences)
+        self._lengths = array('i', (len(sequence) for sequence in sequences))
+        self._active = bytearray(b'\x01' * len(sequences))
+    
+    def extend(self, sequences: Sequence[str]) -> int:
+        """
+        Añade un lote de entradas
+        
+        Returns:
+            Posición asignada a la primera entrada del lote
+        """
+        base = len(self._lengths)
+        count = base + len(sequences)
+        if count > len(self._vectors):
+            # Crecimiento geométrico para que añadir entradas de una en una no copie la matriz cada vez
+            grown = np.zeros((max(count, 2 * len(self._vectors)), len(AMINO_ACIDS)), dtype=np.int32)
+            grown[:base] = self._vectors[:base]
+            self._vectors = grown
+        self._vectors[base:count] = composition_vectors(sequences)
+        # La longitud se añade la última: filter() solo ve las entradas con fila completa
+        self._active.extend(b'\x01' * len(sequences))
+        self._lengths.extend(len(sequence) for sequence in sequences)
+        return base
+    
+    def add(self, sequence: str) -> int:
+        """
+        Añade una entrada
+        
+        Returns:
+            Posición asignada a la entrada
+        """
+        return self.extend([sequence])
+    
+    def remove(self, entry: int):
+        """Marca una entrada como eliminada (filter() deja de devolverla)"""
+        self._active[entry] = 0
+    
+    def filter(self, sequence: str, min_similarity: float, entries: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Entradas cuya cota de composición no impide alcanzar min_similarity
+        
+        Args:
+            sequence: Secuencia de consulta
+            min_similarity: Similitud mínima
+            entries: Entradas a filtrar (por defecto todas)
+        
+        Returns:
+            Array ordenado con las posiciones de las entradas que hay que comparar
+        """
+        if entries is None:
+            entries = np.arange(len(self._lengths), dtype=np.int64)
+        else:
+            entries = np.asarray(entries, dtype=np.int64)
+        if not len(entries) or not sequence:
+            return entries[:0]
+        
+        length = len(sequence)
+        query = composition_vectors([sequence])[0]
+        lengths = np.frombuffer(self._lengths, dtype=np.int32)[entries].astype(np.int64)
+        active = np.frombuffer(bytes(self._active), dtype=np.bool_)[entries]
+        distances = np.abs(self._vectors[entries] - query).sum(axis=1, dtype=np.int64)
+        
+        # Diferencias mínimas en las posiciones comparadas (redondeando hacia arriba)
+        compared = np.maximum(np.minimum(lengths, length), 1)
+        mismatches = np.maximum(distances - np.abs(lengths - length) + 1, 0) // 2
+        reachable = (compared - np.minimum(mismatches, compared)) / compared
+        within_window = np.abs(lengths - length) / np.maximum(np.maximum(lengths, length), 1) <= MAX_LENGTH_DIFFERENCE
+        return entries[active & within_window & (lengths > 0) & (reachable >= min_similarity)]
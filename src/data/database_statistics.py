@@ -0,0 +1,122 @@
+"""
+Estadísticas agregadas de la base de datos de proteínas mantenidas de forma incremental
+Se calculan al cargar y se actualizan con cada entrada añadida o reemplazada
+"""
+import threading
+from bisect import bisect_right
+from collections import Counter
+from typing import Any, Dict, Mapping, Optional
+import numpy as np
+from src.data.protein_store import ProteinStore
+
+# Límites inferiores de los intervalos del histograma de longitudes
+LENGTH_BINS = (0, 50, 100, 200, 300, 400, 500, 750, 1000, 1500, 2000, 5000)
+
+# Organismos más frecuentes que se incluyen en el resumen
+TOP_ORGANISMS = 25
+
+
+class DatabaseStatistics:
+    """
+    Número de entradas, longitudes (mínima, máxima, media, histograma) y organismos
+    
+    Cada entrada se cuenta en O(1). La longitud mínima y la máxima salen de un
+    contador por longitud exacta, que solo se recorre si se elimina la última
+    entrada con la longitud mínima o la máxima. El resumen se guarda hasta el
+    siguiente cambio, así que consultarlo no depende del tamaño de la base de datos.
+    """
+    
+    def __init__(self):
+        self.count = 0
+        self.total_length = 0
+        self.min_length: Optional[int] = None
+        self.max_length: Optional[int] = None
+        self._lengths: Counter = Counter()
+        self._bins = [0] * len(LENGTH_BINS)
+        self.organisms: Counter = Counter()
+        self._summary: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+    
+    def _count_lengths(self, lengths: Mapping[int, int], sign: int):
+        """Suma (sign=1) o resta (sign=-1) entradas por longitud"""
+        for length, count in lengths.items():
+            self.count += sign * count
+            self.total_length += sign * length * count
+            self._lengths[length] += sign * count
+            self._bins[bisect_right(LENGTH_BINS, length) - 1] += sign * count
+            if self._lengths[length] <= 0:
+                del self._lengths[length]
+        
+        if sign > 0 and lengths:
+            low, high = min(lengths), max(lengths)
+            self.min_length = low if self.min_length is None else min(self.min_length, low)
+            self.max_length = high if self.max_length is None else max(self.max_length, high)
+        elif self.min_length not in self._lengths or self.max_length not in self._lengths:
+            self.min_length = min(self._lengths) if self._lengths else None
+            self.max_length = max(self._lengths) if self._lengths else None
+        self._summary = None
+    
+    def add(self, protein_data: Dict[str, Any]):
+        """Cuenta una entrada"""
+        with self._lock:
+            self._count_lengths({len(protein_data['sequence']): 1}, 1)
+            self.organisms[protein_data.get('organism', 'Unknown')] += 1
+    
+    def remove(self, protein_data: Dict[str, Any]):
+        """Descuenta una entrada (al reemplazarla)"""
+        with self._lock:
+            self._count_lengths({len(protein_data['sequence']): 1}, -1)
+            organism = protein_data.get('organism', 'Unknown')
+            self.organisms[organism] -= 1
+            if self.organisms[organism] <= 0:
+                del self.organisms[organism]
+    
+    def add_store(self, store: ProteinStore):
+        """
+        Cuenta todas las entradas de un almacén
+        
+        Las longitudes salen de los offsets de las secuencias y los organismos del
+        encabezado; solo los almacenes anteriores a ese campo se recorren entrada a entrada.
+        """
+        lengths, counts = np.unique(store.lengths, return_counts=True)
+        organisms = store.header.get('organisms')
+        if organisms is None:
+            organisms = Counter(store.protein(entry).get('organism', 'Unknown') for entry in range(store.count))
+        with self._lock:
+            self._count_lengths(dict(zip(lengths.tolist(), counts.tolist())), 1)
+            self.organisms.update(organisms)
+    
+    def summary(self) -> Dict[str, Any]:
+        """
+        Resumen para la API (el mismo diccionario hasta el siguiente cambio; no modificarlo)
+        
+        Returns:
+            Diccionario con total_proteins, avg/min/max_length, length_histogram,
+            organisms (lista de todos los organismos, como antes), organism_counts
+            (los TOP_ORGANISMS más frecuentes con su número de entradas) y
+            distinct_organisms; vacío si no hay entradas
+        """
+        summary = self._summary
+        if summary is not None:
+            return summary
+        
+        with self._lock:
+            if not self.count:
+                summary = {}
+            else:
+                edges = LENGTH_BINS[1:] + (None,)
+                summary = {
+                    'total_proteins': self.count,
+                    'avg_length': self.total_length / self.count,
+                    'min_length': self.min_length,
+                    'max_length': self.max_length,
+                    'length_histogram': [
+                        {'min': low, 'max': high - 1 if high is not None else None, 'count': count}
+                        for low, high, count in zip(LENGTH_BINS, edges, self._bins)
+                    ],
+                    'organisms': sorted(self.organisms),
+                    'organism_counts': dict(self.organisms.most_common(TOP_ORGANISMS)),
+                    'distinct_organisms': len(self.organisms)
+                }
+            self._summary = summary
+        return summary
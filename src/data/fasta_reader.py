@@ -0,0 +1,160 @@
+"""
+Lectura en streaming de archivos FASTA y multi-FASTA
+Los registros se leen uno a uno, así que la memoria no depende del tamaño del archivo
+"""
+import gzip
+import io
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional, Tuple, Union
+
+
+class FastaFormatError(Exception):
+    """Excepción para archivos FASTA mal formados"""
+    pass
+
+
+class FastaRecord(NamedTuple):
+    """Registro FASTA: encabezado (sin '>') y secuencia"""
+    header: str
+    sequence: str
+
+
+ORIGINAL_TAG = 'original'
+MUTATED_TAG = 'mutated'
+
+# Separador de los campos 'OS=', 'OX=', 'GN=', ... de los encabezados de UniProt
+_UNIPROT_FIELD = re.compile(r'\s(?=[A-Z]{2}=)')
+
+
+def open_fasta(path: Union[str, Path]) -> io.TextIOBase:
+    """
+    Abre un archivo FASTA en modo texto (admite archivos .gz)
+    
+    Args:
+        path: Ruta al archivo
+    
+    Returns:
+        Archivo de texto abierto
+    """
+    path = Path(path)
+    if path.suffix == '.gz':
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def read_fasta(lines: Iterable[Union[str, bytes]]) -> Iterator[FastaRecord]:
+    """
+    Lee registros FASTA de un archivo o de cualquier iterable de líneas
+    
+    Solo se mantiene en memoria el registro que se está leyendo.
+    
+    Args:
+        lines: Archivo abierto, stream de la petición o iterable de líneas (str o bytes)
+    
+    Yields:
+        FastaRecord por cada registro
+    
+    Raises:
+        FastaFormatError: Si aparece una secuencia antes del primer encabezado
+    """
+    header: Optional[str] = None
+    chunks = []
+    
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.strip()
+        if not line or line.startswith(';'):
+            continue
+        
+        if line.startswith('>'):
+            if header is not None:
+                yield FastaRecord(header, ''.join(chunks))
+            header = line[1:].strip()
+            chunks = []
+        elif header is None:
+            raise FastaFormatError("Se encontró una secuencia antes del primer encabezado '>'")
+        else:
+            chunks.append(line)
+    
+    if header is not None:
+        yield FastaRecord(header, ''.join(chunks))
+
+
+def parse_pair_header(header: str) -> Tuple[str, Optional[str]]:
+    """
+    Separa un encabezado con la convención 'ID|original' / 'ID|mutated'
+    
+    Returns:
+        Tupla (id, tipo) donde tipo es 'original', 'mutated' o None si no sigue la convención
+    """
+    fields = header.split()
+    pair_id, _, tag = (fields[0] if fields else '').rpartition('|')
+    tag = tag.lower()
+    if pair_id and tag in (ORIGINAL_TAG, MUTATED_TAG):
+        return pair_id, tag
+    return header, None
+
+
+def parse_uniprot_header(header: str) -> Tuple[str, Dict[str, str]]:
+    """
+    Extrae el accession y los metadatos de un encabezado FASTA de UniProt
+    
+    Ejemplo: 'sp|P68871|HBB_HUMAN Hemoglobin subunit beta OS=Homo sapiens OX=9606 GN=HBB PE=1 SV=2'
+    
+    Returns:
+        Tupla (uniprot_id, metadatos con 'name' y, si están, 'organism' y 'gene')
+    """
+    identifier, _, description = header.partition(' ')
+    parts = identifier.split('|')
+    uniprot_id = parts[1] if len(parts) >= 3 and parts[0] in ('sp', 'tr') else identifier
+    
+    fields = _UNIPROT_FIELD.split(description)
+    metadata = {'name': fields[0].strip() or uniprot_id}
+    for field in fields[1:]:
+        key, _, value = field.partition('=')
+        if key == 'OS':
+            metadata['organism'] = value.strip()
+        elif key == 'GN':
+            metadata['gene'] = value.strip()
+    return uniprot_id, metadata
+
+
+def pair_records(records: Iterable[FastaRecord]) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+    """
+    Empareja registros originales y mutados por su ID
+    
+    Un par se emite apenas se leen sus dos registros; si los pares están
+    contiguos en el archivo, la memoria usada es constante. Los registros sin
+    pareja (o que no siguen la convención) se emiten con None en el lado
+    faltante para que la validación los reporte.
+    
+    Args:
+        records: Registros FASTA
+    
+    Yields:
+        Tuplas (id, secuencia_original, secuencia_mutada)
+    """
+    pending = {}
+    
+    for record in records:
+        pair_id, tag = parse_pair_header(record.header)
+        if tag is None:
+            yield pair_id, record.sequence, None
+            continue
+        
+        sides = pending.get(pair_id)
+        if sides is None or tag in sides:
+            if sides is not None:
+                # ID repetido antes de completar el par: se emite el incompleto
+                yield pair_id, sides.get(ORIGINAL_TAG), sides.get(MUTATED_TAG)
+            pending[pair_id] = {tag: record.sequence}
+            continue
+        
+        del pending[pair_id]
+        sides[tag] = record.sequence
+        yield pair_id, sides[ORIGINAL_TAG], sides[MUTATED_TAG]
+    
+    for pair_id, sides in pending.items():
+        yield pair_id, sides.get(ORIGINAL_TAG), sides.get(MUTATED_TAG)
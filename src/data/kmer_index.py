@@ -0,0 +1,274 @@
+"""
+Índice invertido de k-mers para la búsqueda de secuencias similares
+Descarta sin compararlas las entradas que no pueden alcanzar la similitud mínima
+"""
+from array import array
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+import numpy as np
+
+# Longitud de k-mer por defecto
+DEFAULT_KMER_SIZE = 4
+
+# Cada residuo se reduce a 5 bits; letras fuera de A-Z comparten códigos. Las
+# colisiones solo pueden aumentar los k-mers compartidos, nunca descartar un acierto
+_RESIDUE_BITS = 5
+_RESIDUE_CODES = np.full(256, 27, dtype=np.uint64)
+_RESIDUE_CODES[np.arange(ord('A'), ord('Z') + 1)] = np.arange(1, 27, dtype=np.uint64)
+_RANK_BITS = np.uint64(32)
+
+# Residuos por segmento del índice: acota la memoria temporal de la construcción
+SEGMENT_RESIDUES = 4_000_000
+
+
+def _sequence_codes(sequence: str) -> np.ndarray:
+    """Códigos de 5 bits de una secuencia (los caracteres no ASCII comparten código)"""
+    data = sequence.encode('ascii', errors='replace')
+    return _RESIDUE_CODES[np.frombuffer(data, dtype=np.uint8)]
+
+
+def _kmer_values(codes: np.ndarray, k: int) -> np.ndarray:
+    """Valor entero de cada ventana de k residuos"""
+    windows = len(codes) - k + 1
+    values = np.zeros(max(windows, 0), dtype=np.uint64)
+    for offset in range(k):
+        values <<= np.uint64(_RESIDUE_BITS)
+        values |= codes[offset:offset + windows]
+    return values
+
+
+def _ranked_keys(kmers: np.ndarray, groups: np.ndarray) -> np.ndarray:
+    """
+    Convierte k-mers en claves (k-mer, número de aparición dentro de su grupo)
+    
+    Contar claves compartidas equivale a contar la intersección de los
+    multiconjuntos de k-mers, que es lo que acota el lema de q-gramas.
+    
+    Args:
+        kmers: Valores de k-mer
+        groups: Grupo (entrada) de cada k-mer
+    
+    Returns:
+        Array uint64 de claves en el mismo orden que kmers
+    """
+    # k-mers de 30 bits como máximo: grupo y k-mer caben en una sola clave de ordenación
+    combined = (groups.astype(np.uint64) << np.uint64(30)) | kmers
+    order = np.argsort(combined, kind='stable')
+    sorted_combined = combined[order]
+    sorted_kmers = kmers[order]
+    
+    starts = np.ones(len(order), dtype=bool)
+    starts[1:] = sorted_combined[1:] != sorted_combined[:-1]
+    start_positions = np.nonzero(starts)[0]
+    run_index = np.cumsum(starts) - 1
+    ranks = np.arange(len(order)) - start_positions[run_index]
+    
+    keys = np.empty(len(order), dtype=np.uint64)
+    keys[order] = (sorted_kmers << _RANK_BITS) | ranks.astype(np.uint64)
+    return keys
+
+
+class _Segment(NamedTuple):
+    """Bloque CSR del índice para un rango contiguo de entradas"""
+    base: int
+    size: int
+    keys: np.ndarray
+    offsets: np.ndarray
+    postings: np.ndarray
+
+
+def sequence_kmers(sequences: Sequence[str], k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    k-mers de varias secuencias calculados de una vez sobre su concatenación
+    
+    Args:
+        sequences: Secuencias
+        k: Longitud de k-mer
+    
+    Returns:
+        Tupla (valores de k-mer uint64, índice int32 de la secuencia de cada k-mer),
+        agrupados por secuencia en orden
+    """
+    lengths = np.fromiter((len(sequence) for sequence in sequences), dtype=np.int64, count=len(sequences))
+    ends = np.cumsum(lengths)
+    kmers = _kmer_values(_sequence_codes(''.join(sequences)), k)
+    groups = np.repeat(np.arange(len(sequences), dtype=np.int32), lengths)[:len(kmers)]
+    
+    # Descartar las ventanas que cruzan el final de su secuencia
+    crossing = np.zeros(len(kmers) + k, dtype=bool)
+    for distance in range(1, k):
+        crossing[np.maximum(ends - distance, 0)] = True
+    inside = ~crossing[:len(kmers)]
+    return kmers[inside], groups[inside]
+
+
+def _build_segment(sequences: Sequence[str], base: int, k: int) -> _Segment:
+    """Construye el bloque CSR de las entradas base .. base + len(sequences) - 1"""
+    kmers, groups = sequence_kmers(sequences, k)
+    
+    keys = _ranked_keys(kmers, groups)
+    del kmers
+    order = np.argsort(keys)
+    keys = keys[order]
+    postings = groups[order]
+    del order, groups
+    
+    if len(keys):
+        boundaries = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+        unique_keys = keys[np.concatenate(([0], boundaries))]
+    else:
+        boundaries = np.empty(0, dtype=np.int64)
+        unique_keys = keys
+    offsets = np.concatenate(([0], boundaries, [len(keys)])).astype(np.int64)
+    return _Segment(base, len(sequences), unique_keys, offsets, postings)
+
+
+class KmerIndex:
+    """
+    Índice invertido (k-mer, aparición) -> entradas
+    
+    Las entradas se identifican por su posición de inserción. El índice base
+    se guarda en segmentos CSR (claves ordenadas, offsets y postings int32 con
+    la posición relativa al segmento) y las entradas añadidas después se
+    guardan en un índice auxiliar en memoria.
+    
+    Poda (lema de q-gramas): si dos secuencias tienen a lo sumo X posiciones
+    distintas en sus primeros m residuos, comparten al menos (m - k + 1) - k·X
+    k-mers contando multiplicidad, porque cada diferencia afecta a k ventanas.
+    """
+    
+    def __init__(self, k: int = DEFAULT_KMER_SIZE):
+        """
+        Args:
+            k: Longitud de k-mer (máximo 6 para que quepa en 30 bits)
+        """
+        if not 1 <= k <= 6:
+            raise ValueError("La longitud de k-mer debe estar entre 1 y 6")
+        self.k = k
+        self._segments: List[_Segment] = []
+        self._overlay: Dict[int, List[int]] = {}
+        self._lengths = array('i')
+        self._active = bytearray()
+    
+    def __len__(self) -> int:
+        return len(self._lengths)
+    
+    def build(self, sequences: Sequence[str]):
+        """
+        Reconstruye el índice; la entrada i corresponde a sequences[i]
+        
+        Args:
+            sequences: Secuencias de la base de datos
+        """
+        self._lengths = array('i')
+        self._active = bytearray()
+        self._overlay = {}
+        self._segments = []
+        self.extend(sequences)
+    
+    def extend(self, sequences: Sequence[str]) -> int:
+        """
+        Añade un lote de entradas como segmentos CSR nuevos (sin pasar por el índice auxiliar)
+        
+        Args:
+            sequences: Secuencias del lote
+        
+        Returns:
+            Posición asignada a la primera entrada del lote
+        """
+        base = len(self._lengths)
+        self._lengths.extend(len(sequence) for sequence in sequences)
+        self._active.extend(b'\x01' * len(sequences))
+        
+        start = residues = 0
+        for position, sequence in enumerate(sequences):
+            residues += len(sequence)
+            if residues >= SEGMENT_RESIDUES:
+                self._segments.append(_build_segment(sequences[start:position + 1], base + start, self.k))
+                start, residues = position + 1, 0
+        if start < len(sequences):
+            self._segments.append(_build_segment(sequences[start:], base + start, self.k))
+        return base
+    
+    def add(self, sequence: str) -> int:
+        """
+        Añade una entrada al índice auxiliar
+        
+        Returns:
+            Posición asignada a la entrada
+        """
+        entry = len(self._lengths)
+        self._lengths.append(len(sequence))
+        self._active.append(1)
+        
+        kmers = _kmer_values(_sequence_codes(sequence), self.k)
+        for key in _ranked_keys(kmers, np.zeros(len(kmers), dtype=np.int64)).tolist():
+            self._overlay.setdefault(key, []).append(entry)
+        return entry
+    
+    def remove(self, entry: int):
+        """Marca una entrada como eliminada (deja de devolverse como candidata)"""
+        self._active[entry] = 0
+    
+    def candidates(self, sequence: str, min_similarity: float) -> np.ndarray:
+        """
+        Entradas que pueden tener similitud >= min_similarity con la secuencia
+        
+        La similitud es la de ProteinDatabase._calculate_similarity: identidad
+        posición a posición sobre la longitud menor, y 0 si las longitudes
+        difieren más de un 10%.
+        
+        Args:
+            sequence: Secuencia de consulta
+            min_similarity: Similitud mínima (> 0)
+        
+        Returns:
+            Array ordenado con las posiciones de las entradas candidatas
+        """
+        if not self._lengths or not sequence:
+            return np.empty(0, dtype=np.int64)
+        
+        length = len(sequence)
+        lengths = np.frombuffer(self._lengths, dtype=np.int32).astype(np.int64)
+        active = np.frombuffer(bytes(self._active), dtype=np.bool_)
+        
+        # Mismo filtro de longitud que la comparación completa
+        within_window = np.abs(lengths - length) / np.maximum(np.maximum(lengths, length), 1) <= 0.1
+        
+        # Umbral de k-mers compartidos por entrada: (m - k + 1) - k·X_max
+        compared = np.minimum(lengths, length)
+        max_mismatches = ((1 - min_similarity) * compared).astype(np.int64) + 1
+        required = compared - self.k + 1 - self.k * max_mismatches
+        
+        shared = self._shared_counts(sequence)
+        mask = within_window & active & (lengths > 0) & (shared >= required)
+        return np.nonzero(mask)[0]
+    
+    def _shared_counts(self, sequence: str) -> np.ndarray:
+        """Número de claves (k-mer, aparición) compartidas con cada entrada"""
+        kmers = _kmer_values(_sequence_codes(sequence), self.k)
+        query_keys = np.unique(_ranked_keys(kmers, np.zeros(len(kmers), dtype=np.int64)))
+        counts = np.zeros(len(self._lengths), dtype=np.int64)
+        
+        for segment in self._segments:
+            if not len(segment.keys) or not len(query_keys):
+                continue
+            slots = np.searchsorted(segment.keys, query_keys)
+            in_range = slots < len(segment.keys)
+            slots = slots[in_range]
+            found = slots[segment.keys[slots] == query_keys[in_range]]
+            starts = segment.offsets[found]
+            sizes = segment.offsets[found + 1] - starts
+            total = int(sizes.sum())
+            if total:
+                # Posiciones de todos los postings de las claves encontradas sin bucles en Python
+                positions = np.repeat(starts - np.cumsum(sizes) + sizes, sizes) + np.arange(total)
+                counts[segment.base:segment.base + segment.size] += np.bincount(
+                    segment.postings[positions], minlength=segment.size
+                )
+        
+        if self._overlay:
+            for key in query_keys.tolist():
+                for entry in self._overlay.get(key, ()):
+                    counts[entry] += 1
+        
+        return counts
@@ -0,0 +1,325 @@
+"""
+Índice MinHash/LSH para buscar homólogos aproximados (identidad ~50-95 %)
+Cada secuencia se resume en una firma MinHash de sus k-mers y las firmas se
+reparten en bandas; dos secuencias son candidatas si coinciden en alguna banda
+"""
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+import numpy as np
+from src.data.kmer_index import _RESIDUE_BITS, sequence_kmers
+
+MINHASH_SUFFIX = '.minhash.npz'
+MINHASH_VERSION = 1
+
+SHINGLE_SIZE = 3
+NUM_PERMUTATIONS = 128
+BANDS = 64
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+
+# Firma de las secuencias sin ningún k-mer: no coincide con nada
+_EMPTY = np.uint32(0xFFFFFFFF)
+# Residuos por bloque al calcular firmas (limita la matriz k-mers × permutaciones)
+_CHUNK_RESIDUES = 200_000
+# Lotes de al menos este tamaño forman su propio bloque de cubetas; los menores van al diccionario
+_SEGMENT_MIN_ENTRIES = 256
+
+
+class _Buckets(NamedTuple):
+    """Cubetas LSH en formato CSR: claves únicas ordenadas y sus entradas"""
+    keys: np.ndarray      # uint64, claves de banda ordenadas sin repetir
+    offsets: np.ndarray   # int64, len(keys) + 1
+    entries: np.ndarray   # int32, entradas de cada cubeta
+
+
+def _build_buckets(keys: np.ndarray, entries: np.ndarray) -> _Buckets:
+    """Agrupa pares (clave de banda, entrada) en cubetas CSR ordenadas por clave"""
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = keys[1:] != keys[:-1]
+    starts = np.flatnonzero(first)
+    return _Buckets(keys[starts], np.append(starts, len(keys)).astype(np.int64), entries[order].astype(np.int32))
+
+
+def _bucket_entries(buckets: _Buckets, keys: np.ndarray) -> np.ndarray:
+    """Entradas de las cubetas con esas claves, concatenadas"""
+    if not len(buckets.keys):
+        return buckets.entries[:0]
+    slots = np.minimum(np.searchsorted(buckets.keys, keys), len(buckets.keys) - 1)
+    slots = slots[buckets.keys[slots] == keys]
+    starts, sizes = buckets.offsets[slots], buckets.offsets[slots + 1] - buckets.offsets[slots]
+    # Concatenar sin bucle: inicio de cada cubeta repetido más un contador
+    return buckets.entries[np.repeat(starts - np.cumsum(sizes) + sizes, sizes) + np.arange(sizes.sum())]
+
+
+def minhash_path_for(database_path: Union[str, Path]) -> Path:
+    """Ruta del índice MinHash guardado junto a la base de datos"""
+    return Path(database_path).with_suffix(MINHASH_SUFFIX)
+
+
+def jaccard_to_identity(jaccard: Union[float, np.ndarray], k: int = SHINGLE_SIZE) -> Union[float, np.ndarray]:
+    """
+    Identidad aproximada a partir de la similitud de Jaccard de los conjuntos de k-mers
+    
+    Con una fracción p de posiciones idénticas se conservan ~p^k de los k-mers,
+    así que J = p^k / (2 - p^k) y p = (2J / (1 + J))^(1/k).
+    """
+    return (2 * jaccard / (1 + jaccard)) ** (1.0 / k)
+
+
+class MinHashIndex:
+    """
+    Firmas MinHash (N × NUM_PERMUTATIONS uint32) con cubetas LSH por bandas
+    
+    Las firmas usan una sola permutación (one permutation hashing): el hash de
+    cada k-mer se reparte en NUM_PERMUTATIONS casillas y cada casilla guarda su
+    mínimo, con densificación por rotación de las casillas vacías. Estima Jaccard
+    igual que NUM_PERMUTATIONS permutaciones independientes con un solo hash por k-mer.
+    
+    Las cubetas de todas las bandas comparten un array ordenado de claves uint64
+    (las filas de la banda mezcladas con una sal por banda), así que una consulta
+    es un searchsorted de BANDS claves por bloque. Como en KmerIndex, cada lote
+    añadido con extend forma un bloque nuevo; las entradas sueltas van a un
+    diccionario aparte. Al guardar se funde todo en un solo bloque.
+    """
+    
+    def __init__(self, k: int = SHINGLE_SIZE, num_permutations: int = NUM_PERMUTATIONS, bands: int = BANDS,
+                 seed: int = 1):
+        if num_permutations % bands or num_permutations & (num_permutations - 1):
+            raise ValueError("El número de permutaciones debe ser potencia de 2 y múltiplo del número de bandas")
+        self.k = k
+        self.num_permutations = num_permutations
+        self.bands = bands
+        self.seed = seed
+        
+        # Hash aleatorio de cada k-mer posible: los bits altos eligen la casilla de la firma
+        rng = np.random.default_rng(seed)
+        self._bin_shift = 32 - (num_permutations.bit_length() - 1)
+        self._hashes = rng.integers(0, 1 << 32, size=1 << (_RESIDUE_BITS * k), dtype=np.uint64).astype(np.uint32)
+        self._band_salts = rng.integers(0, np.iinfo(np.uint64).max, size=bands, dtype=np.uint64, endpoint=True)
+        
+        self._signatures = np.zeros((0, num_permutations), dtype=np.uint32)
+        self._count = 0
+        self._segments: List[_Buckets] = []
+        self._extra: Dict[int, List[int]] = {}
+        self._active = bytearray()
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def signatures(self, sequences: Sequence[str]) -> np.ndarray:
+        """
+        Firmas MinHash de varias secuencias
+        
+        Returns:
+            Matriz len(sequences) × num_permutations uint32
+        """
+        result = np.full((len(sequences), self.num_permutations), _EMPTY, dtype=np.uint32)
+        start = 0
+        while start < len(sequences):
+            stop, residues = start, 0
+            while stop < len(sequences) and (stop == start or residues < _CHUNK_RESIDUES):
+                residues += len(sequences[stop])
+                stop += 1
+            
+            kmers, groups = sequence_kmers(sequences[start:stop], self.k)
+            if len(kmers):
+                result[start:stop] = self._densify(self._one_permutation(kmers, groups, stop - start))
+            start = stop
+        return result
+    
+    def _one_permutation(self, kmers: np.ndarray, groups: np.ndarray, count: int) -> np.ndarray:
+        """Mínimo del hash dentro de cada casilla (_EMPTY si la casilla no recibe ningún k-mer)"""
+        hashes = self._hashes[kmers]
+        slots = groups.astype(np.int64) * self.num_permutations + (hashes >> np.uint32(self._bin_shift))
+        signatures = np.full(count * self.num_permutations, _EMPTY, dtype=np.uint32)
+        np.minimum.at(signatures, slots, hashes & np.uint32((1 << self._bin_shift) - 1))
+        return signatures.reshape(count, self.num_permutations)
+    
+    def _densify(self, signatures: np.ndarray) -> np.ndarray:
+        """
+        Rellena las casillas vacías con la siguiente casilla ocupada (rotación)
+        
+        Se suma la distancia por encima del rango de la casilla para que un valor
+        prestado nunca coincida con uno propio.
+        """
+        bins = self.num_permutations
+        empty = signatures == _EMPTY
+        # Primera casilla ocupada en o después de cada casilla, dando la vuelta a la firma
+        positions = np.where(np.tile(~empty, 2), np.arange(2 * bins), 2 * bins)
+        following = np.minimum.accumulate(positions[:, ::-1], axis=1)[:, ::-1][:, :bins]
+        distances = (following - np.arange(bins)).astype(np.uint32)
+        dense = np.take_along_axis(signatures, following % bins, axis=1) + (distances << np.uint32(self._bin_shift))
+        dense[empty.all(axis=1)] = _EMPTY
+        return dense
+    
+    def _band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        """Clave uint64 de cada banda (matriz N × bands)"""
+        rows = signatures.reshape(len(signatures), self.bands, -1).astype(np.uint64)
+        keys = np.zeros(rows.shape[:2], dtype=np.uint64)
+        for row in range(rows.shape[2]):
+            keys = keys * np.uint64(0x9E3779B97F4A7C15) + rows[:, :, row]
+        return keys ^ self._band_salts
+    
+    def _store_signatures(self, signatures: np.ndarray) -> int:
+        """Guarda firmas nuevas y devuelve la posición de la primera"""
+        base = self._count
+        count = base + len(signatures)
+        if count > len(self._signatures):
+            # Crecimiento geométrico para que añadir entradas de una en una no copie la matriz cada vez
+            grown = np.zeros((max(count, 2 * len(self._signatures)), self.num_permutations), dtype=np.uint32)
+            grown[:base] = self._signatures[:base]
+            self._signatures = grown
+        self._signatures[base:count] = signatures
+        self._count = count
+        self._active.extend(b'\x01' * len(signatures))
+        return base
+    
+    def build(self, sequences: Sequence[str]):
+        """
+        Reconstruye el índice; la entrada i corresponde a sequences[i]
+        
+        Args:
+            sequences: Secuencias de la base de datos
+        """
+        signatures = self.signatures(sequences)
+        self._signatures = signatures
+        self._count = len(signatures)
+        self._active = bytearray(b'\x01' * len(signatures))
+        self._extra = {}
+        
+        self._segments = [self._signature_buckets(signatures, 0)]
+    
+    def _signature_buckets(self, signatures: np.ndarray, base: int) -> _Buckets:
+        """Cubetas de las entradas base .. base + len(signatures) - 1"""
+        indexed = np.flatnonzero(signatures[:, 0] != _EMPTY)
+        return _build_buckets(self._band_keys(signatures[indexed]).ravel(), np.repeat(indexed + base, self.bands))
+    
+    def extend(self, sequences: Sequence[str]) -> int:
+        """
+        Añade un lote de entradas
+        
+        Returns:
+            Posición asignada a la primera entrada del lote
+        """
+        signatures = self.signatures(sequences)
+        base = self._store_signatures(signatures)
+        if len(signatures) >= _SEGMENT_MIN_ENTRIES:
+            self._segments.append(self._signature_buckets(signatures, base))
+            return base
+        
+        for offset, keys in enumerate(self._band_keys(signatures)):
+            if signatures[offset, 0] == _EMPTY:
+                continue
+            for key in keys.tolist():
+                self._extra.setdefault(key, []).append(base + offset)
+        return base
+    
+    def add(self, sequence: str) -> int:
+        """
+        Añade una entrada
+        
+        Returns:
+            Posición asignada a la entrada
+        """
+        return self.extend([sequence])
+    
+    def remove(self, entry: int):
+        """Excluye una entrada de los resultados"""
+        if 0 <= entry < len(self._active):
+            self._active[entry] = 0
+    
+    def query(self, sequence: str, limit: int = 10) -> List[Tuple[int, float]]:
+        """
+        Entradas que comparten alguna banda con la consulta, ordenadas por Jaccard estimado
+        
+        Args:
+            sequence: Secuencia de consulta
+            limit: Número máximo de resultados
+        
+        Returns:
+            Lista de (posición de la entrada, similitud de Jaccard estimada), de mayor a menor
+        """
+        signature = self.signatures([sequence])
+        if signature[0, 0] == _EMPTY or limit <= 0:
+            return []
+        keys = self._band_keys(signature)[0]
+        
+        hits = [_bucket_entries(segment, keys) for segment in self._segments]
+        hits.append(np.zeros(0, dtype=np.int32))
+        if self._extra:
+            hits.extend(np.asarray(self._extra[key], dtype=np.int32) for key in keys.tolist() if key in self._extra)
+        
+        candidates = np.unique(np.concatenate(hits))
+        if not len(candidates):
+            return []
+        candidates = candidates[np.frombuffer(self._active, dtype=np.uint8)[candidates] == 1]
+        estimates = (self._signatures[candidates] == signature[0]).mean(axis=1)
+        if len(candidates) > limit:
+            best = np.argpartition(-estimates, limit - 1)[:limit]
+            candidates, estimates = candidates[best], estimates[best]
+        order = np.lexsort((candidates, -estimates))
+        return list(zip(candidates[order].tolist(), estimates[order].tolist()))
+    
+    def save(self, path: Union[str, Path], fingerprint: str):
+        """
+        Guarda el índice de forma atómica (archivo temporal + os.replace)
+        
+        Args:
+            path: Ruta de destino
+            fingerprint: Identifica la versión de la base de datos indexada
+        """
+        path = Path(path)
+        header = {
+            'version': MINHASH_VERSION, 'fingerprint': fingerprint, 'k': self.k,
+            'num_permutations': self.num_permutations, 'bands': self.bands, 'seed': self.seed
+        }
+        if len(self._segments) != 1 or self._extra:
+            # Fundir los bloques de los lotes añadidos y el diccionario en un solo bloque
+            keys = [np.repeat(segment.keys, np.diff(segment.offsets)) for segment in self._segments]
+            entries = [segment.entries for segment in self._segments]
+            sizes = [len(bucket) for bucket in self._extra.values()]
+            keys.append(np.repeat(np.fromiter(self._extra.keys(), dtype=np.uint64, count=len(self._extra)), sizes))
+            entries.append(np.fromiter((entry for bucket in self._extra.values() for entry in bucket),
+                                       dtype=np.int32, count=sum(sizes)))
+            self._segments = [_build_buckets(np.concatenate(keys), np.concatenate(entries))]
+            self._extra = {}
+        segment = self._segments[0]
+        
+        fd, temp_path = tempfile.mkstemp(prefix=path.name, suffix='.tmp', dir=path.parent)
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                np.savez(handle, header=np.frombuffer(json.dumps(header).encode('utf-8'), dtype=np.uint8),
+                         signatures=self._signatures[:self._count], active=np.frombuffer(self._active, dtype=np.uint8),
+                         keys=segment.keys, offsets=segment.offsets, entries=segment.entries)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    
+    @classmethod
+    def load(cls, path: Union[str, Path], fingerprint: str) -> Optional['MinHashIndex']:
+        """
+        Carga un índice guardado con save
+        
+        Returns:
+            El índice, o None si no existe, está dañado o corresponde a otra versión
+            de la base de datos
+        """
+        try:
+            with np.load(path) as data:
+                header = json.loads(data['header'].tobytes().decode('utf-8'))
+                if header.get('version') != MINHASH_VERSION or header.get('fingerprint') != fingerprint:
+                    return None
+                index = cls(header['k'], header['num_permutations'], header['bands'], header['seed'])
+                index._signatures = data['signatures']
+                index._count = len(index._signatures)
+                index._active = bytearray(data['active'].tobytes())
+                index._segments = [_Buckets(data['keys'], data['offsets'], data['entries'])]
+        except (OSError, KeyError, ValueError):
+            return None
+        return index
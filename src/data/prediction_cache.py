@@ -0,0 +1,239 @@
+"""
+Caché persistente de predicciones de estructura direccionada por el contenido de la secuencia
+Cada modelo se guarda una sola vez junto con los metadatos de su predicción (SQLite + archivos)
+"""
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+PREDICTION_CACHE_DIRECTORY = 'cache'
+PREDICTION_CACHE_DATABASE = 'predictions.sqlite'
+
+# Entradas cuyos metadatos se mantienen en memoria en cada proceso
+_MEMORY_ENTRIES = 1024
+
+
+def _link_model(source: Path, target: Path):
+    """
+    Enlace duro de source en target (copia si el sistema de archivos no lo admite)
+    
+    Los dos nombres comparten el mismo contenido en disco, y borrar uno no afecta al otro.
+    """
+    temp_target = target.with_name(f"{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        os.link(source, temp_target)
+    except OSError:
+        shutil.copyfile(source, temp_target)
+    os.replace(temp_target, target)
+
+
+def prediction_key(sequence: str, method: str, parameters: Dict[str, Any]) -> str:
+    """
+    Clave de una predicción
+    
+    Args:
+        sequence: Secuencia de aminoácidos
+        method: Vía de predicción ('colabfold', 'alphafold_db'...)
+        parameters: Parámetros que afectan al resultado
+    
+    Returns:
+        SHA-256 en hexadecimal de (SHA-256 de la secuencia, método, parámetros)
+    """
+    digest = hashlib.sha256(sequence.encode('utf-8')).hexdigest()
+    material = json.dumps([digest, method, parameters], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class PredictionCache:
+    """
+    Modelos y metadatos de predicciones anteriores con expulsión LRU
+    
+    La caché guarda un enlace duro a cada modelo y entrega a cada llamador otro
+    enlace en el directorio de modelos: las comparaciones guardadas apuntan a su
+    propio archivo, que la expulsión nunca borra, y el contenido se guarda en
+    disco una sola vez mientras haya enlaces a él.
+    
+    El índice (clave, archivo, resultado, tamaño, último acceso) está en SQLite
+    en modo WAL, así que lo comparten todos los procesos que usan el mismo
+    directorio. Cada proceso guarda además los metadatos de las últimas entradas
+    en memoria: un acierto solo cuesta una búsqueda en un diccionario y un stat
+    del modelo. Los últimos accesos se anotan en memoria y se escriben en SQLite
+    al guardar la siguiente predicción, antes de decidir qué expulsar.
+    """
+    
+    def __init__(self, directory: Union[str, Path], max_bytes: int = 1 << 30):
+        """
+        Args:
+            directory: Directorio de la caché (se crea si no existe)
+            max_bytes: Tamaño máximo de los modelos guardados
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        
+        self._memory: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._touched: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.directory / PREDICTION_CACHE_DATABASE, timeout=30,
+                                           check_same_thread=False, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS predictions ('
+            'key TEXT PRIMARY KEY, model_file TEXT NOT NULL, result TEXT NOT NULL, '
+            'size INTEGER NOT NULL, created REAL NOT NULL, last_access REAL NOT NULL)'
+        )
+        self._connection.execute('CREATE INDEX IF NOT EXISTS predictions_lru ON predictions (last_access)')
+    
+    def get(self, key: str, link_stem: Union[str, Path, None] = None) -> Optional[Dict[str, Any]]:
+        """
+        Busca una predicción
+        
+        Args:
+            key: Clave calculada con prediction_key
+            link_stem: Ruta sin extensión donde enlazar el modelo para el llamador;
+                None devuelve la ruta del modelo dentro de la caché
+        
+        Returns:
+            Copia del resultado guardado (con model_path apuntando al enlace creado
+            y cache_hit=True), o None si no está o su modelo ya no existe
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                row = self._connection.execute(
+                    'SELECT model_file, result FROM predictions WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    entry = json.loads(row[1])
+                    entry['model_path'] = str(self.directory / row[0])
+                    self._remember(key, entry)
+            else:
+                self._memory.move_to_end(key)
+            
+            if entry is None or not os.path.exists(entry['model_path']):
+                # Otro proceso puede haber expulsado el modelo
+                self._memory.pop(key, None)
+                self.misses += 1
+                return None
+            
+            model_path = Path(entry['model_path'])
+            if link_stem is not None:
+                target = Path(f"{link_stem}{model_path.suffix}")
+                try:
+                    _link_model(model_path, target)
+                except FileNotFoundError:
+                    # Expulsado por otro proceso después de comprobarlo
+                    self._memory.pop(key, None)
+                    self.misses += 1
+                    return None
+                model_path = target
+            
+            self._touched[key] = time.time()
+            self.hits += 1
+        # Copia para que el llamador pueda modificar el resultado (las listas, como confidence_scores, también)
+        result = {name: list(value) if isinstance(value, list) else value for name, value in entry.items()}
+        result['model_path'] = str(model_path)
+        result['cache_hit'] = True
+        return result
+    
+    def put(self, key: str, result: Dict[str, Any]):
+        """
+        Guarda una predicción; el modelo del llamador queda donde estaba
+        
+        Args:
+            key: Clave calculada con prediction_key
+            result: Resultado de la predicción; result['model_path'] debe existir
+        """
+        source = Path(result['model_path'])
+        model_file = f"{key}{source.suffix}"
+        target = self.directory / model_file
+        _link_model(source, target)
+        
+        stored = {name: value for name, value in result.items() if name not in ('model_path', 'processing_time')}
+        now = time.time()
+        with self._lock:
+            self._flush_touched()
+            self._connection.execute(
+                'INSERT OR REPLACE INTO predictions (key, model_file, result, size, created, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, model_file, json.dumps(stored), target.stat().st_size, now, now)
+            )
+            self._remember(key, dict(stored, model_path=str(target)))
+            self._evict(keep=key)
+    
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        """Guarda los metadatos en memoria (con el lock tomado)"""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > _MEMORY_ENTRIES:
+            self._memory.popitem(last=False)
+    
+    def _flush_touched(self):
+        """Escribe en SQLite los últimos accesos pendientes (con el lock tomado)"""
+        if self._touched:
+            self._connection.executemany(
+                'UPDATE predictions SET last_access = MAX(last_access, ?) WHERE key = ?',
+                [(accessed, key) for key, accessed in self._touched.items()]
+            )
+            self._touched.clear()
+    
+    def _evict(self, keep: str):
+        """
+        Expulsa las entradas menos usadas hasta volver a max_bytes, salvo keep (con el lock tomado)
+        
+        Solo se borra el enlace de la caché: los modelos de las comparaciones siguen en su sitio.
+        """
+        total = self._connection.execute('SELECT COALESCE(SUM(size), 0) FROM predictions').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        
+        evicted = []
+        for key, model_file, size in self._connection.execute(
+                'SELECT key, model_file, size FROM predictions ORDER BY last_access').fetchall():
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            evicted.append(key)
+            total -= size
+            self._memory.pop(key, None)
+            try:
+                os.remove(self.directory / model_file)
+            except FileNotFoundError:
+                pass
+        self._connection.executemany('DELETE FROM predictions WHERE key = ?', [(key,) for key in evicted])
+        print(f"🧹 Caché de predicciones: {len(evicted)} modelos expulsados")
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Estado de la caché para monitorización
+        
+        Returns:
+            Dict con aciertos y fallos de este proceso, entradas y bytes ocupados
+        """
+        with self._lock:
+            entries, size = self._connection.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM predictions').fetchone()
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'entries': entries,
+                'size_bytes': size,
+                'max_bytes': self.max_bytes
+            }
+    
+    def close(self):
+        """Escribe los accesos pendientes y cierra la base de datos"""
+        with self._lock:
+            self._flush_touched()
+            self._connection.close()
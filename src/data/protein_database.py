@@ -2,20 +2,354 @@
 Manejador de base de datos de proteínas conocidas
 Carga y gestiona información de proteínas con estructuras en AlphaFold DB
 """
+import itertools
 import json
 import os
-from typing import Dict, Optional, Tuple, List
+import threading
+from typing import Any, Dict, Iterable, Iterator, Mapping, Optional, Tuple, List
 from pathlib import Path
+from src.data.protein_sequence import ProteinSequence, sequence_digest
+from src.data.kmer_index import KmerIndex
+from src.data.database_statistics import DatabaseStatistics
+from src.data.composition_index import CompositionIndex
+from src.data.protein_log import ProteinLog, log_path_for
+from src.data.minhash_index import MinHashIndex, jaccard_to_identity, minhash_path_for
+from src.data.sharded_search import ShardedSearch
+from src.data.suffix_array import SuffixArray, suffix_array_path_for
+from src.data.sequence_matrix import IDENTITY, SequenceMatrix, sequence_similarity
+from src.data.protein_store import (
+    STORE_SUFFIX, ProteinStore, ProteinStoreError, ProteinStoreWriter, StoreProteins, compile_fasta, compile_json,
+    import_segment_paths, is_store_stale, next_import_segment_path, store_path_for
+)
+
+# Proteínas por lote en las importaciones masivas (~un segmento del índice de k-mers)
+IMPORT_BATCH_SIZE = 10_000
+
+# Segundos entre comprobaciones del archivo de la base de datos al vigilarlo
+RELOAD_INTERVAL = 5.0
+
+# Tamaño del registro de add_protein (bytes, ~1000 proteínas) a partir del cual el vigilante lo compacta
+LOG_COMPACT_SIZE = 1 << 20
+
+# Candidatas mínimas que devuelve el índice MinHash antes de filtrar y reordenar
+HOMOLOG_SHORTLIST = 50
+
+
+class _Snapshot:
+    """
+    Datos e índices de una carga de la base de datos
+    
+    ProteinDatabase lee su snapshot una sola vez por operación y, al recargar,
+    lo reemplaza entero, así que una búsqueda en curso nunca mezcla datos de
+    dos cargas distintas.
+    """
+    
+    def __init__(self, proteins: Mapping[str, Dict]):
+        self.proteins = proteins
+        self.digest_index: Dict[str, List[str]] = {}
+        self.sequence_index: Optional[Dict[str, str]] = None
+        self.kmer_index = KmerIndex()
+        self.sequence_matrix = SequenceMatrix()
+        self.composition_index = CompositionIndex()
+        self.search_indexes_ready = False
+        self.entry_ids: List[str] = []
+        self.entry_positions: Dict[str, int] = {}
+        self.homolog_index: Optional[MinHashIndex] = None
+        self.homolog_ids: List[str] = []
+        self.homolog_positions: Dict[str, int] = {}
+        self.fragment_index: Optional[SuffixArray] = None
+        self.fragment_ids: List[str] = []
+        self.fragment_positions: Dict[str, int] = {}
+        self.sharded_search: Optional[ShardedSearch] = None
+        self._build_lock = threading.Lock()
+        
+        # Las entradas del almacén binario ya traen su índice de digests; el mapeo
+        # secuencia -> ID se construye al primer uso y los índices de similitud, al
+        # cargar (ver ProteinDatabase._prepare_search_indexes)
+        memory_entries = proteins.overlay if isinstance(proteins, StoreProteins) else proteins
+        for uniprot_id, protein_data in memory_entries.items():
+            self.index_protein(uniprot_id, protein_data)
+        self.statistics = self.count_statistics()
+    
+    def count_statistics(self) -> DatabaseStatistics:
+        """Estadísticas de todas las entradas (los almacenes se cuentan sin recorrerlos)"""
+        statistics = DatabaseStatistics()
+        if isinstance(self.proteins, StoreProteins):
+            for store in self.proteins.stores:
+                statistics.add_store(store)
+            # Las copias ocultas por un almacén posterior se cuentan con el almacén y se descuentan aquí
+            for store, entry in self.proteins.shadowed():
+                statistics.remove(store.protein(entry))
+            for uniprot_id, protein_data in self.proteins.overlay.items():
+                replaced = self.proteins.stored(uniprot_id)
+                if replaced is not None:
+                    statistics.remove(replaced)
+                statistics.add(protein_data)
+        else:
+            for protein_data in self.proteins.values():
+                statistics.add(protein_data)
+        return statistics
+    
+    def iter_sequences(self) -> Iterator[str]:
+        """Secuencias en el orden de iteración de proteins"""
+        if isinstance(self.proteins, StoreProteins):
+            return self.proteins.sequences()
+        return (protein_data['sequence'] for protein_data in self.proteins.values())
+    
+    def ensure_search_indexes(self):
+        """Construye el índice de k-mers, la matriz de secuencias y las composiciones si aún no existen"""
+        if self.search_indexes_ready:
+            return
+        
+        with self._build_lock:
+            if self.search_indexes_ready:
+                return
+            self.entry_ids = list(self.proteins)
+            self.entry_positions = {uniprot_id: position for position, uniprot_id in enumerate(self.entry_ids)}
+            sequences = list(self.iter_sequences())
+            self.kmer_index.build(sequences)
+            self.sequence_matrix.build(sequences)
+            self.composition_index.build(sequences)
+            self.search_indexes_ready = True
+    
+    def ensure_homolog_index(self, path: Optional[Path] = None, fingerprint: str = ''):
+        """
+        Carga el índice MinHash guardado junto a la base de datos o lo construye
+        
+        Args:
+            path: Archivo del índice (None para no leerlo ni guardarlo)
+            fingerprint: Versión de la base de datos; un índice guardado de otra versión se reconstruye
+        """
+        if self.homolog_index is not None:
+            return
+        
+        with self._build_lock:
+            if self.homolog_index is not None:
+                return
+            ids = list(self.proteins)
+            index = MinHashIndex.load(path, fingerprint) if path is not None else None
+            if index is None or len(index) != len(ids):
+                index = MinHashIndex()
+                index.build(list(self.iter_sequences()))
+                if path is not None:
+                    try:
+                        index.save(path, fingerprint)
+                    except OSError as e:
+                        print(f"⚠️ No se pudo guardar el índice de homólogos ({e})")
+            self.homolog_ids = ids
+            self.homolog_positions = {uniprot_id: position for position, uniprot_id in enumerate(ids)}
+            self.homolog_index = index
+    
+    def ensure_fragment_index(self, path: Optional[Path] = None, fingerprint: str = ''):
+        """
+        Carga el array de sufijos guardado junto a la base de datos o lo construye
+        
+        Args:
+            path: Archivo del índice (None para no leerlo ni guardarlo)
+            fingerprint: Versión de la base de datos; un índice guardado de otra versión se reconstruye
+        """
+        if self.fragment_index is not None:
+            return
+        
+        with self._build_lock:
+            if self.fragment_index is not None:
+                return
+            ids = list(self.proteins)
+            index = SuffixArray.load(path, fingerprint) if path is not None else None
+            if index is None or len(index) != len(ids):
+                index = SuffixArray()
+                index.build(list(self.iter_sequences()))
+                if path is not None:
+                    try:
+                        index.save(path, fingerprint)
+                    except OSError as e:
+                        print(f"⚠️ No se pudo guardar el índice de fragmentos ({e})")
+            self.fragment_ids = ids
+            self.fragment_positions = {uniprot_id: position for position, uniprot_id in enumerate(ids)}
+            self.fragment_index = index
+    
+    def sequence_mapping(self) -> Dict[str, str]:
+        """Mapeo secuencia -> ID, construido al primer uso"""
+        if self.sequence_index is None:
+            self.sequence_index = dict(zip(self.iter_sequences(), self.proteins))
+        return self.sequence_index
+    
+    def ids_with_digest(self, digest: str) -> List[str]:
+        """IDs de las entradas (almacén y memoria) que pueden tener ese digest"""
+        ids = self.proteins.find_digest(digest) if isinstance(self.proteins, StoreProteins) else []
+        ids.extend(self.digest_index.get(digest, ()))
+        return ids
+    
+    def contains_sequence(self, sequence: str, digest: str) -> bool:
+        """Indica si alguna entrada (almacenes o memoria) tiene exactamente esa secuencia"""
+        if isinstance(self.proteins, StoreProteins) and self.proteins.find_sequence(sequence, digest) is not None:
+            return True
+        return any(self.proteins[uniprot_id]['sequence'] == sequence
+                   for uniprot_id in self.digest_index.get(digest, ()))
+    
+    def index_protein(self, uniprot_id: str, protein_data: Dict):
+        """Añade una entrada en memoria a los índices"""
+        sequence = protein_data['sequence']
+        self.digest_index.setdefault(sequence_digest(sequence), []).append(uniprot_id)
+        if self.sequence_index is not None:
+            self.sequence_index[sequence] = uniprot_id
+    
+    def unindex_protein(self, uniprot_id: str, protein_data: Dict):
+        """Elimina una entrada de los índices"""
+        sequence = protein_data['sequence']
+        digest = sequence_digest(sequence)
+        ids = [other_id for other_id in self.digest_index.get(digest, []) if other_id != uniprot_id]
+        if ids:
+            self.digest_index[digest] = ids
+        else:
+            self.digest_index.pop(digest, None)
+        
+        # Si otra entrada comparte la secuencia, el mapeo pasa a apuntar a la última de ellas
+        if self.sequence_index is not None and self.sequence_index.get(sequence) == uniprot_id:
+            same_sequence = [other_id for other_id in self.ids_with_digest(digest)
+                             if other_id != uniprot_id and self.proteins[other_id]['sequence'] == sequence]
+            if same_sequence:
+                self.sequence_index[sequence] = same_sequence[-1]
+            else:
+                del self.sequence_index[sequence]
+    
+    def add_protein(self, uniprot_id: str, protein_data: Dict):
+        """
+        Añade o reemplaza una entrada en memoria y en los índices ya construidos
+        
+        Las búsquedas leen el snapshot sin bloqueo mientras se escribe, así que el
+        orden importa: la entrada anterior se retira de todos los índices (también
+        de la composición); de la nueva se publican primero su ID, su posición y
+        sus datos, y después las filas, terminando por el índice que propone
+        candidatas. Así cualquier posición que devuelva un índice ya tiene su ID,
+        sus datos y su fila.
+        """
+        sequence = protein_data['sequence']
+        # El bloqueo de construcción evita que una construcción perezosa de los índices
+        # lea las entradas a medio añadir
+        with self._build_lock:
+            previous = self.proteins.get(uniprot_id)
+            if previous is not None:
+                self.unindex_protein(uniprot_id, previous)
+                self.statistics.remove(previous)
+                if self.search_indexes_ready:
+                    position = self.entry_positions[uniprot_id]
+                    self.kmer_index.remove(position)
+                    self.composition_index.remove(position)
+                    self.sequence_matrix.remove(position)
+                if self.homolog_index is not None:
+                    self.homolog_index.remove(self.homolog_positions[uniprot_id])
+                if self.fragment_index is not None:
+                    self.fragment_index.remove(self.fragment_positions[uniprot_id])
+            
+            # Las posiciones de la entrada nueva son las siguientes de cada índice
+            if self.search_indexes_ready:
+                self.entry_positions[uniprot_id] = len(self.entry_ids)
+                self.entry_ids.append(uniprot_id)
+            if self.homolog_index is not None:
+                self.homolog_positions[uniprot_id] = len(self.homolog_ids)
+                self.homolog_ids.append(uniprot_id)
+            if self.fragment_index is not None:
+                self.fragment_positions[uniprot_id] = len(self.fragment_ids)
+                self.fragment_ids.append(uniprot_id)
+        
+            self.proteins[uniprot_id] = protein_data
+            self.index_protein(uniprot_id, protein_data)
+            self.statistics.add(protein_data)
+            
+            if self.search_indexes_ready:
+                self.sequence_matrix.add(sequence)
+                self.composition_index.add(sequence)
+                self.kmer_index.add(sequence)
+            if self.homolog_index is not None:
+                self.homolog_index.add(sequence)
+            if self.fragment_index is not None:
+                self.fragment_index.add(sequence)
+    
+    def add_store(self, store: ProteinStore):
+        """
+        Añade un almacén de entradas nuevas (un lote importado) y las añade a los índices ya construidos
+        
+        Sigue el orden de add_protein: primero los IDs y sus posiciones, después
+        la vista con el almacén y por último las filas de los índices, así que
+        una búsqueda concurrente nunca recibe una posición que no pueda resolver.
+        Los IDs y las secuencias del almacén no deben estar ya en el snapshot.
+        """
+        ids = [store.uniprot_id(entry) for entry in range(store.count)]
+        sequences = [store.sequence(entry) for entry in range(store.count)]
+        with self._build_lock:
+            if self.search_indexes_ready:
+                self.entry_positions.update(zip(ids, itertools.count(len(self.entry_ids))))
+                self.entry_ids.extend(ids)
+            if self.homolog_index is not None:
+                self.homolog_positions.update(zip(ids, itertools.count(len(self.homolog_ids))))
+                self.homolog_ids.extend(ids)
+            if self.fragment_index is not None:
+                self.fragment_positions.update(zip(ids, itertools.count(len(self.fragment_ids))))
+                self.fragment_ids.extend(ids)
+            
+            self.proteins = self.proteins.with_stores(self.proteins.stores + [store])
+            self.statistics.add_store(store)
+            if self.sequence_index is not None:
+                self.sequence_index.update(zip(sequences, ids))
+            
+            if self.search_indexes_ready:
+                for sequence in sequences:
+                    self.sequence_matrix.add(sequence)
+                self.composition_index.extend(sequences)
+                self.kmer_index.extend(sequences)
+            if self.homolog_index is not None:
+                self.homolog_index.extend(sequences)
+            if self.fragment_index is not None:
+                self.fragment_index.extend(sequences)
+    
+    def move_to_stores(self, stores: List[ProteinStore], moved: Iterable[str]):
+        """
+        Cambia a almacenes que ya contienen esas entradas de la capa en memoria
+        
+        Los índices de búsqueda se indexan por ID, así que siguen siendo válidos.
+        """
+        moved = set(moved)
+        overlay = {uniprot_id: protein_data for uniprot_id, protein_data in self.proteins.overlay.items()
+                   if uniprot_id not in moved}
+        moved_data = [(uniprot_id, self.proteins.overlay[uniprot_id]) for uniprot_id in moved]
+        self.proteins = self.proteins.with_stores(stores, overlay)
+        # El índice de digests de los almacenes ya las incluye
+        for uniprot_id, protein_data in moved_data:
+            digest = sequence_digest(protein_data['sequence'])
+            ids = [other_id for other_id in self.digest_index.get(digest, []) if other_id != uniprot_id]
+            if ids:
+                self.digest_index[digest] = ids
+            else:
+                self.digest_index.pop(digest, None)
+    
+    def ensure_sharded_search(self, shards: int) -> ShardedSearch:
+        """Arranca la pool de procesos sobre los almacenes del snapshot si aún no existe"""
+        if self.sharded_search is None:
+            with self._build_lock:
+                if self.sharded_search is None:
+                    self.sharded_search = ShardedSearch([store.path for store in self.proteins.stores], shards)
+        return self.sharded_search
+    
+    def close_sharded_search(self):
+        """Detiene la pool de procesos (termina las consultas pendientes)"""
+        sharded_search, self.sharded_search = self.sharded_search, None
+        if sharded_search is not None:
+            sharded_search.close()
+
 
 class ProteinDatabase:
     """Gestor de base de datos de proteínas conocidas"""
     
-    def __init__(self, database_path: str = None):
+    def __init__(self, database_path: str = None, search_shards: int = 0):
         """
         Inicializa la base de datos de proteínas
         
         Args:
-            database_path: Ruta opcional al archivo JSON de la base de datos
+            database_path: Ruta opcional al archivo JSON (o FASTA) de la base de datos,
+                o directamente a un almacén binario compilado (.store)
+            search_shards: Procesos entre los que repartir la búsqueda por similitud
+                (0 o 1 = búsqueda en este proceso; solo con almacén binario)
         """
         if database_path is None:
             # Usar ruta por defecto relativa al directorio del proyecto
@@ -23,29 +357,117 @@ class ProteinDatabase:
             database_path = current_dir / "data" / "known_proteins" / "protein_database.json"
         
         self.database_path = Path(database_path)
-        self.proteins = {}
-        self._load_database()
+        self.homolog_index_path = minhash_path_for(self.database_path)
+        self.fragment_index_path = suffix_array_path_for(self.database_path)
+        self.protein_log = ProteinLog(log_path_for(self.database_path))
+        self.search_shards = search_shards
+        self._search_counters = {'searches': 0, 'entries': 0, 'kmer_candidates': 0, 'compared': 0}
+        
+        # Las escrituras (add_protein, importaciones y el cambio de snapshot) se serializan;
+        # las lecturas no esperan a ningún lock
+        self._write_lock = threading.RLock()
+        self._reload_lock = threading.Lock()
+        # Proteínas añadidas por este proceso que aún no están en un almacén
+        self._runtime_proteins: Dict[str, Dict] = {}
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watching = threading.Event()
+        
+        self._loaded_version = self._source_version()
+        self._state = _Snapshot(self._load_database())
+        self._prepare_homolog_index(self._state, self._loaded_version)
+        self._prepare_search_indexes(self._state)
+        self._prepare_fragment_index(self._state, self._loaded_version)
+    
+    @property
+    def proteins(self) -> Mapping[str, Dict]:
+        """Entradas de la base de datos ({uniprot_id: datos}) del snapshot actual"""
+        return self._state.proteins
+    
+    @property
+    def _kmer_index(self) -> KmerIndex:
+        """Índice de k-mers del snapshot actual"""
+        return self._state.kmer_index
     
-    def _load_database(self):
-        """Carga la base de datos desde el archivo JSON"""
+    def _load_database(self, strict: bool = False) -> Mapping[str, Dict]:
+        """
+        Carga la base de datos y reproduce encima el registro de proteínas añadidas
+        
+        Args:
+            strict: Propagar los errores en lugar de usar la base de datos reducida
+                (al recargar es preferible conservar los datos actuales)
+        """
+        proteins = self._load_stored_database(strict)
+        try:
+            logged = self.protein_log.read()
+        except OSError as e:
+            if strict:
+                raise
+            print(f"⚠️ No se pudo leer el registro de proteínas añadidas: {e}")
+            return proteins
+        
+        for uniprot_id, protein_data in logged.items():
+            proteins[uniprot_id] = protein_data
+        if logged:
+            print(f"📜 {len(logged)} proteínas recuperadas del registro de add_protein")
+        return proteins
+    
+    def _load_stored_database(self, strict: bool = False) -> Mapping[str, Dict]:
+        """
+        Carga la base de datos desde el almacén binario (lo recompila si el JSON es más reciente)
+        
+        Args:
+            strict: Propagar los errores en lugar de usar la base de datos reducida
+        """
         try:
             if self.database_path.exists():
-                with open(self.database_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.proteins = data.get('proteins', {})
-                print(f"✅ Base de datos de proteínas cargada: {len(self.proteins)} proteínas")
-            else:
-                print(f"⚠️ Archivo de base de datos no encontrado: {self.database_path}")
-                print("📝 Usando base de datos en memoria reducida")
-                self._load_fallback_database()
+                proteins = self._open_store()
+                print(f"✅ Base de datos de proteínas cargada: {len(proteins)} proteínas")
+                return proteins
+            if strict:
+                raise FileNotFoundError(f"Archivo de base de datos no encontrado: {self.database_path}")
+            print(f"⚠️ Archivo de base de datos no encontrado: {self.database_path}")
+            print("📝 Usando base de datos en memoria reducida")
+            return self._load_fallback_database()
         except Exception as e:
+            if strict:
+                raise
             print(f"❌ Error cargando base de datos: {e}")
             print("📝 Usando base de datos en memoria reducida")
-            self._load_fallback_database()
+            return self._load_fallback_database()
+    
+    def _open_store(self) -> Mapping[str, Dict]:
+        """Abre el almacén binario con mmap, compilándolo antes si no existe o está desactualizado"""
+        if self.database_path.suffix == STORE_SUFFIX:
+            store_path = self.database_path
+        else:
+            store_path = store_path_for(self.database_path)
+            if is_store_stale(self.database_path, store_path):
+                try:
+                    if self.database_path.suffix == '.json':
+                        compile_json(self.database_path, store_path)
+                    else:
+                        compile_fasta(self.database_path, store_path)
+                    print(f"🔧 Almacén binario regenerado: {store_path.name}")
+                except (OSError, ProteinStoreError) as e:
+                    # Sin permisos de escritura o con secuencias que el almacén no admite
+                    # (no ASCII): cargar la fuente directamente en memoria
+                    print(f"⚠️ No se pudo compilar el almacén binario ({e}); cargando {self.database_path.name}")
+                    return self._load_json()
+        
+        # Las importaciones masivas van en almacenes aparte que no se pierden al recompilar el JSON
+        stores = [ProteinStore(store_path)]
+        stores.extend(ProteinStore(path) for path in import_segment_paths(self.database_path))
+        return StoreProteins(stores)
     
-    def _load_fallback_database(self):
+    def _load_json(self) -> Dict[str, Dict]:
+        """Carga el archivo JSON completo en memoria"""
+        with open(self.database_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+            return data.get('proteins', {})
+    
+    def _load_fallback_database(self) -> Dict[str, Dict]:
         """Carga una base de datos mínima en memoria como fallback"""
-        self.proteins = {
+        return {
             "P68871": {
                 "name": "Hemoglobin subunit beta",
                 "organism": "Homo sapiens",
@@ -55,7 +477,7 @@ class ProteinDatabase:
                 "confidence_score": 95
             },
             "P69905": {
-                "name": "Hemoglobin subunit alpha", 
+                "name": "Hemoglobin subunit alpha",
                 "organism": "Homo sapiens",
                 "function": "Oxygen transport",
                 "sequence": "MVLSPADKTNVKAAWGKVGAHAGEYGAEALERMFLSFPTTKTYFPHFDLSHGSAQVKGHGKKVADALTNAVAHVDDMPNALSALSDLHAHKLRVDPVNFKLLSHCLLVTLAAHLPAEFTPAVHASLDKFLASVSTVLTSKYR",
@@ -65,73 +487,431 @@ class ProteinDatabase:
             "P02100": {
                 "name": "Hemoglobin subunit epsilon",
                 "organism": "Homo sapiens",
-                "function": "Embryonic oxygen transport", 
+                "function": "Embryonic oxygen transport",
                 "sequence": "MVHFTAEEKAAVTSLWSKMNVEEAGGEALGRLLVVYPWTQRFFDSFGNLSSPSAILGNPKVKAHGKKVLTSFGDAIKNMDNLKPAFAKLSELHCDKLHVDPENFKLLGNVMVIILATHFGKEFTPEVQAAWQKLVSAVAIALAHKYH",
                 "length": 147,
                 "confidence_score": 95
             }
         }
     
+    def _index_fingerprint(self, state: _Snapshot, version: Tuple) -> str:
+        """Identifica los datos indexados por un índice guardado (MinHash o array de sufijos)"""
+        return json.dumps([version, len(state.proteins)])
+    
+    def _prepare_homolog_index(self, state: _Snapshot, version: Tuple):
+        """Carga o construye el índice de homólogos de un snapshot (solo se guarda si hay almacén binario)"""
+        path = self.homolog_index_path if isinstance(state.proteins, StoreProteins) else None
+        state.ensure_homolog_index(path, self._index_fingerprint(state, version))
+    
+    def _prepare_fragment_index(self, state: _Snapshot, version: Tuple):
+        """
+        Carga o construye el array de sufijos de un snapshot (solo se guarda si hay almacén binario)
+        
+        Si no se puede construir, el snapshot se queda sin él y search_fragment
+        recorre las secuencias una a una.
+        """
+        path = self.fragment_index_path if isinstance(state.proteins, StoreProteins) else None
+        try:
+            state.ensure_fragment_index(path, self._index_fingerprint(state, version))
+        except (MemoryError, ValueError) as e:
+            print(f"⚠️ No se pudo construir el índice de fragmentos, se buscará secuencia a secuencia ({e})")
+    
+    def _prepare_search_indexes(self, state: _Snapshot):
+        """Construye los índices de k-mers y de composición al cargar (salvo con búsqueda repartida)"""
+        if not self._uses_shards(state):
+            state.ensure_search_indexes()
+    
+    def _prepare_indexes_like(self, state: _Snapshot, current: _Snapshot, version: Tuple):
+        """Construye en un snapshot nuevo los índices que ya estaban en uso en el actual"""
+        self._prepare_homolog_index(state, version)
+        self._prepare_search_indexes(state)
+        self._prepare_fragment_index(state, version)
+        if current.sequence_index is not None:
+            state.sequence_mapping()
+    
+    def _source_version(self) -> Tuple:
+        """(mtime, tamaño) del archivo de la base de datos, de los segmentos de importaciones y del registro"""
+        version = []
+        for path in (self.database_path, *import_segment_paths(self.database_path), self.protein_log.path):
+            try:
+                stat = path.stat()
+                version.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                version.append(None)
+        return tuple(version)
+    
+    def reload(self) -> bool:
+        """
+        Vuelve a cargar la base de datos y cambia al nuevo snapshot de forma atómica
+        
+        La carga y la construcción de los índices que ya estaban en uso se hacen
+        fuera del camino de las peticiones; las búsquedas en curso terminan con
+        el snapshot anterior. Las proteínas añadidas con add_protein se recuperan
+        del registro (y las que no se pudieron registrar, de memoria).
+        
+        Returns:
+            True si se cargó un snapshot nuevo, False si la carga falló (se conserva el actual)
+        """
+        with self._reload_lock:
+            version = self._source_version()
+            current = self._state
+            try:
+                state = _Snapshot(self._load_database(strict=True))
+                self._prepare_indexes_like(state, current, version)
+            except Exception as e:
+                print(f"❌ Error recargando la base de datos, se conservan los datos actuales: {e}")
+                return False
+            
+            with self._write_lock:
+                # Las añadidas después de leer el registro (o que no se pudieron registrar)
+                for uniprot_id, protein_data in self._runtime_proteins.items():
+                    if state.proteins.get(uniprot_id) != protein_data:
+                        state.add_protein(uniprot_id, protein_data)
+                self._state = state
+                self._loaded_version = version
+            # Los procesos del snapshot anterior terminan sus consultas y se detienen
+            current.close_sharded_search()
+        
+        print(f"🔄 Base de datos de proteínas recargada: {len(state.proteins)} proteínas")
+        return True
+    
+    def check_for_updates(self) -> bool:
+        """
+        Recarga la base de datos si su archivo cambió desde la última carga
+        
+        Returns:
+            True si se recargó
+        """
+        if self._source_version() == self._loaded_version:
+            return False
+        return self.reload()
+    
+    def start_watching(self, interval: float = RELOAD_INTERVAL):
+        """
+        Vigila el archivo de la base de datos en un hilo en segundo plano y recarga al cambiar
+        
+        El mismo hilo compacta el registro de add_protein cuando crece (ver compact_log).
+        
+        Args:
+            interval: Segundos entre comprobaciones
+        """
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        
+        self._stop_watching.clear()
+        
+        def watch():
+            while not self._stop_watching.wait(interval):
+                self.check_for_updates()
+                self.compact_log_if_needed()
+        
+        self._watcher = threading.Thread(target=watch, name='protein-database-watcher', daemon=True)
+        self._watcher.start()
+    
+    def stop_watching(self):
+        """Detiene el hilo de vigilancia"""
+        self._stop_watching.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+    
     def search_exact_match(self, sequence: str) -> Optional[Tuple[str, Dict]]:
         """
         Busca una coincidencia exacta de secuencia
         
         Args:
             sequence: Secuencia de aminoácidos a buscar
-            
+        
         Returns:
             Tupla (uniprot_id, protein_data) si se encuentra, None si no
         """
-        for uniprot_id, protein_data in self.proteins.items():
+        state = self._state
+        if isinstance(sequence, ProteinSequence):
+            digest, sequence = sequence.digest, sequence.text
+        else:
+            digest = sequence_digest(sequence)
+        
+        # El digest localiza los candidatos; la comparación completa descarta colisiones
+        for uniprot_id in state.ids_with_digest(digest):
+            protein_data = state.proteins[uniprot_id]
             if protein_data['sequence'] == sequence:
                 return uniprot_id, protein_data
         return None
     
-    def search_similar_sequences(self, sequence: str, min_similarity: float = 0.95) -> List[Tuple[str, Dict, float]]:
+    def search_similar_sequences(self, sequence: str, min_similarity: float = 0.95,
+                                 scoring: str = IDENTITY) -> List[Tuple[str, Dict, float]]:
         """
         Busca secuencias similares con similitud >= min_similarity
         
         Args:
             sequence: Secuencia de aminoácidos a buscar
             min_similarity: Similitud mínima requerida (0.0-1.0)
-            
+            scoring: 'identity' (posiciones idénticas) o 'blosum62' (puntuación de
+                sustitución normalizada, ver sequence_similarity)
+        
         Returns:
             Lista de tuplas (uniprot_id, protein_data, similarity) ordenadas por similitud
         """
-        results = []
+        state = self._state
+        query = ProteinSequence.of(sequence)
+        if self._uses_shards(state):
+            return self._search_sharded(state, query, min_similarity, scoring)
+        state.ensure_search_indexes()
         
-        for uniprot_id, protein_data in self.proteins.items():
-            similarity = self._calculate_similarity(sequence, protein_data['sequence'])
-            if similarity >= min_similarity:
-                results.append((uniprot_id, protein_data, similarity))
+        # Solo se comparan las entradas que ni el índice de k-mers ni la composición pueden
+        # descartar; la comparación de todas las candidatas es una sola operación por bucket de longitud
+        candidates = self._search_candidates(state, query.text, min_similarity, scoring)
+        positions, similarities = state.sequence_matrix.similarities(query, candidates, min_similarity, scoring)
+        keep = similarities >= min_similarity
+        found = dict(zip(positions[keep].tolist(), similarities[keep].tolist()))
+        
+        if min_similarity <= 0:
+            # Las entradas fuera de la ventana de longitud tienen similitud 0.0
+            found = {position: found.get(position, 0.0) for position in
+                     sorted(state.entry_positions[uniprot_id] for uniprot_id in state.proteins)}
+        
+        results = [
+            (state.entry_ids[position], state.proteins[state.entry_ids[position]], similarity)
+            for position, similarity in found.items()
+        ]
         
         # Ordenar por similitud descendente
         results.sort(key=lambda x: x[2], reverse=True)
         return results
     
-    def _calculate_similarity(self, seq1: str, seq2: str) -> float:
+    def search_top_k(self, sequence: str, k: int = 1, min_similarity: float = 0.95,
+                     scoring: str = IDENTITY) -> List[Tuple[str, Dict, float]]:
+        """
+        Busca las k secuencias más similares con similitud >= min_similarity
+        
+        Cada candidata admite como mucho (1 - min_similarity)·longitud diferencias:
+        se compara por bloques y se abandona al superarlas, y solo se guardan las
+        k mejores. Equivale a search_similar_sequences(...)[:k] sin ordenar todo.
+        
+        Args:
+            sequence: Secuencia de aminoácidos a buscar
+            k: Número máximo de resultados
+            min_similarity: Similitud mínima requerida (0.0-1.0)
+            scoring: 'identity' o 'blosum62'
+        
+        Returns:
+            Lista de hasta k tuplas (uniprot_id, protein_data, similarity) ordenadas por similitud
+        """
+        state = self._state
+        query = ProteinSequence.of(sequence)
+        if self._uses_shards(state):
+            return self._search_sharded(state, query, min_similarity, scoring, k)
+        state.ensure_search_indexes()
+        
+        candidates = self._search_candidates(state, query.text, min_similarity, scoring)
+        best = state.sequence_matrix.top_k(query, k, min_similarity, candidates, scoring)
+        
+        if min_similarity <= 0 and len(best) < k:
+            # Completar con entradas fuera de la ventana de longitud (similitud 0.0)
+            included = {position for position, _ in best}
+            for uniprot_id in state.proteins:
+                if len(best) == k:
+                    break
+                position = state.entry_positions[uniprot_id]
+                if position not in included:
+                    best.append((position, 0.0))
+        
+        return [
+            (state.entry_ids[position], state.proteins[state.entry_ids[position]], similarity)
+            for position, similarity in best
+        ]
+    
+    def _uses_shards(self, state: _Snapshot) -> bool:
+        """Indica si las búsquedas por similitud se reparten entre procesos"""
+        return self.search_shards > 1 and isinstance(state.proteins, StoreProteins)
+    
+    def _search_sharded(self, state: _Snapshot, query: ProteinSequence, min_similarity: float, scoring: str,
+                        k: Optional[int] = None) -> List[Tuple[str, Dict, float]]:
+        """
+        Búsqueda repartida entre los procesos de ShardedSearch
+        
+        Los procesos solo ven los almacenes; las entradas en memoria (overlay)
+        se comparan aquí y sustituyen a las de los almacenes con el mismo ID.
+        
+        Args:
+            k: Número de resultados para top-k (None = todas las que alcanzan min_similarity)
+        """
+        sharded = state.ensure_sharded_search(self.search_shards)
+        overlay = dict(state.proteins.overlay)
+        if k is None:
+            hits = sharded.similar(query.text, min_similarity, scoring)
+        else:
+            # Pedir de más por si alguna de las mejores está reemplazada u oculta
+            hits = sharded.top_k(query.text, k + len(overlay) + state.proteins.shadowed_count,
+                                 min_similarity, scoring)
+        hits = [hit for hit in hits if hit[1] not in overlay]
+        if state.proteins.shadowed_count:
+            # Los procesos ven también las copias ocultas por un almacén posterior
+            hits = [hit for hit in hits if state.proteins.position(hit[1]) == hit[0]]
+        
+        # Misma posición que en el índice local, que se construye al cargar: las entradas
+        # en memoria desde la carga conservan la de su almacén (o van detrás de los
+        # almacenes) y las añadidas después van al final en el orden en que se añadieron
+        runtime = [uniprot_id for uniprot_id in list(self._runtime_proteins) if uniprot_id in overlay]
+        added = set(runtime)
+        loaded = [uniprot_id for uniprot_id in overlay if uniprot_id not in added]
+        position = sum(store.count for store in state.proteins.stores)
+        for uniprot_id in loaded + runtime:
+            protein_data = overlay[uniprot_id]
+            stored = state.proteins.position(uniprot_id) if uniprot_id in loaded else None
+            if stored is None:
+                stored, position = position, position + 1
+            similarity = sequence_similarity(query, protein_data['sequence'], scoring)
+            if similarity >= min_similarity:
+                hits.append((stored, uniprot_id, similarity))
+        
+        # Ordenar por similitud descendente (a igualdad, por posición)
+        hits.sort(key=lambda hit: (-hit[2], hit[0]))
+        if k is not None:
+            hits = hits[:k]
+        return [(uniprot_id, state.proteins[uniprot_id], similarity) for _, uniprot_id, similarity in hits]
+    
+    def stop_search_workers(self):
+        """Detiene los procesos de búsqueda (se vuelven a arrancar en la siguiente búsqueda)"""
+        self._state.close_sharded_search()
+    
+    def search_homologs(self, sequence: str, k: int = 10, min_identity: float = 0.5,
+                        rerank: bool = False) -> List[Tuple[str, Dict, float]]:
+        """
+        Busca homólogos probables (identidad ~50-95 %) con el índice MinHash/LSH
+        
+        Es una búsqueda aproximada: devuelve las entradas que comparten alguna
+        banda LSH con la consulta, ordenadas por la identidad estimada a partir
+        de la similitud de Jaccard de sus k-mers, y puede no encontrar homólogos
+        lejanos. Con rerank=True la lista corta se reordena con la similitud
+        exacta posición a posición.
+        
+        Args:
+            sequence: Secuencia de aminoácidos a buscar
+            k: Número máximo de resultados
+            min_identity: Identidad mínima (estimada, o exacta si rerank)
+            rerank: Reordenar la lista corta con la similitud exacta
+        
+        Returns:
+            Lista de hasta k tuplas (uniprot_id, protein_data, identidad) ordenadas por identidad
+        """
+        state = self._state
+        query = ProteinSequence.of(sequence)
+        state.ensure_homolog_index()
+        
+        shortlist = state.homolog_index.query(query.text, limit=max(k, HOMOLOG_SHORTLIST))
+        scored = []
+        for position, jaccard in shortlist:
+            uniprot_id = state.homolog_ids[position]
+            protein_data = state.proteins[uniprot_id]
+            if rerank:
+                identity = sequence_similarity(query.text, protein_data['sequence'])
+            else:
+                identity = float(jaccard_to_identity(jaccard))
+            if identity >= min_identity:
+                scored.append((uniprot_id, protein_data, identity))
+        
+        # sort es estable: a igual identidad se conserva el orden del índice
+        scored.sort(key=lambda x: x[2], reverse=True)
+        return scored[:k]
+    
+    def search_fragment(self, fragment: str, limit: Optional[int] = None) -> List[Tuple[str, Dict, int]]:
+        """
+        Busca las proteínas que contienen un fragmento o dominio
+        
+        Usa el array de sufijos de todas las secuencias (guardado junto a la base
+        de datos y preparado al cargarla): dos búsquedas binarias de O(m log N)
+        localizan todas las apariciones a la vez. Si el snapshot no tiene el
+        índice, se recorren las secuencias una a una con el mismo resultado.
+        
+        Args:
+            fragment: Secuencia del fragmento
+            limit: Número máximo de apariciones (None = todas)
+        
+        Returns:
+            Lista de tuplas (uniprot_id, protein_data, desplazamiento), una por aparición
+            y ordenadas por posición en la base de datos y desplazamiento
+        """
+        state = self._state
+        query = ProteinSequence.of(fragment)
+        if state.fragment_index is None:
+            return self._scan_fragment(state, query.text, limit)
+        
+        return [
+            (state.fragment_ids[position], state.proteins[state.fragment_ids[position]], offset)
+            for position, offset in state.fragment_index.find(query.text, limit)
+        ]
+    
+    def _scan_fragment(self, state: _Snapshot, fragment: str, limit: Optional[int]) -> List[Tuple[str, Dict, int]]:
+        """Apariciones del fragmento recorriendo todas las secuencias (sin array de sufijos)"""
+        found = []
+        # Mismos casos vacíos que SuffixArray.find
+        if not fragment or not fragment.isascii():
+            return found
+        for uniprot_id, protein_data in state.proteins.items():
+            offset = protein_data['sequence'].find(fragment)
+            while offset >= 0:
+                if len(found) == limit:
+                    return found
+                found.append((uniprot_id, protein_data, offset))
+                offset = protein_data['sequence'].find(fragment, offset + 1)
+        return found
+    
+    def _search_candidates(self, state: _Snapshot, sequence: str, min_similarity: float, scoring: str = IDENTITY):
+        """
+        Entradas a comparar posición a posición (None si hay que comparar todas)
+        
+        Primero se aplica el índice de k-mers y después, como un único filtro
+        vectorizado, la cota de composición de CompositionIndex. Ambas cotas
+        cuentan posiciones idénticas, así que con BLOSUM62 solo queda el
+        abandono por bloques de la comparación.
+        """
+        if min_similarity <= 0 or scoring != IDENTITY:
+            return None
+        
+        candidates = state.kmer_index.candidates(sequence, min_similarity)
+        compared = state.composition_index.filter(sequence, min_similarity, candidates)
+        
+        self._search_counters['searches'] += 1
+        self._search_counters['entries'] += len(state.entry_ids)
+        self._search_counters['kmer_candidates'] += len(candidates)
+        self._search_counters['compared'] += len(compared)
+        return compared
+    
+    def get_search_statistics(self) -> Dict:
+        """
+        Contadores acumulados de la poda de candidatas en las búsquedas por similitud
+        
+        Returns:
+            Diccionario con las búsquedas, las entradas consideradas, las descartadas
+            por cada filtro, las comparadas y la fracción podada por la composición
+        """
+        counters = self._search_counters
+        return {
+            'searches': counters['searches'],
+            'entries': counters['entries'],
+            'kmer_pruned': counters['entries'] - counters['kmer_candidates'],
+            'composition_pruned': counters['kmer_candidates'] - counters['compared'],
+            'compared': counters['compared'],
+            'composition_pruning_ratio': (
+                (counters['kmer_candidates'] - counters['compared']) / counters['kmer_candidates']
+                if counters['kmer_candidates'] else 0.0
+            )
+        }
+    
+    def _calculate_similarity(self, seq1: str, seq2: str, scoring: str = IDENTITY) -> float:
         """
         Calcula similitud entre dos secuencias
         
         Args:
             seq1: Primera secuencia
             seq2: Segunda secuencia
-            
+            scoring: 'identity' o 'blosum62'
+        
         Returns:
             Valor de similitud entre 0.0 y 1.0
         """
-        if len(seq1) == 0 or len(seq2) == 0:
-            return 0.0
-        
-        # Si las longitudes son muy diferentes, similitud baja
-        if abs(len(seq1) - len(seq2)) / max(len(seq1), len(seq2)) > 0.1:
-            return 0.0
-        
-        # Comparar posición por posición
-        min_len = min(len(seq1), len(seq2))
-        matches = sum(1 for i in range(min_len) if seq1[i] == seq2[i])
-        
-        return matches / min_len
+        return sequence_similarity(seq1, seq2, scoring)
     
     def get_protein_info(self, uniprot_id: str) -> Optional[Dict]:
         """
@@ -139,7 +919,7 @@ class ProteinDatabase:
         
         Args:
             uniprot_id: ID de UniProt
-            
+        
         Returns:
             Diccionario con información de la proteína o None
         """
@@ -150,44 +930,225 @@ class ProteinDatabase:
         Obtiene un mapeo de secuencia -> UniProt ID para compatibilidad
         
         Returns:
-            Diccionario {secuencia: uniprot_id}
+            Diccionario {secuencia: uniprot_id} mantenido por la base de datos
+            (no debe modificarse; usar add_protein). Tras una recarga se devuelve
+            un diccionario nuevo.
         """
-        return {
-            protein_data['sequence']: uniprot_id 
-            for uniprot_id, protein_data in self.proteins.items()
-        }
+        return self._state.sequence_mapping()
     
     def add_protein(self, uniprot_id: str, protein_data: Dict):
         """
-        Añade una nueva proteína a la base de datos (solo en memoria)
+        Añade una nueva proteína a la base de datos
+        
+        La entrada se escribe al final del registro (.log.jsonl junto a la base de
+        datos), que se reproduce al cargar, y se añade a los índices ya construidos
+        sin reconstruirlos.
         
         Args:
             uniprot_id: ID de UniProt
             protein_data: Datos de la proteína
         """
-        self.proteins[uniprot_id] = protein_data
+        with self._write_lock:
+            version = self._source_version()
+            try:
+                self.protein_log.append(uniprot_id, protein_data)
+            except OSError as e:
+                print(f"⚠️ No se pudo registrar {uniprot_id}, se conserva solo en memoria: {e}")
+            self._state.add_protein(uniprot_id, protein_data)
+            # Se vuelve a aplicar si la base de datos se recarga (al final, como en los índices)
+            self._runtime_proteins.pop(uniprot_id, None)
+            self._runtime_proteins[uniprot_id] = protein_data
+            if version == self._loaded_version:
+                # El registro solo cambió por esta escritura: el vigilante no necesita recargar
+                self._loaded_version = self._source_version()
         print(f"➕ Proteína {uniprot_id} añadida a la base de datos")
     
-    def get_statistics(self) -> Dict:
+    def compact_log(self) -> Dict[str, int]:
         """
-        Obtiene estadísticas de la base de datos
+        Compacta el registro de add_protein en el almacén de importaciones
+        
+        Las entradas con ID nuevo o que reemplazan a una importada se escriben en
+        un segmento nuevo del almacén de importaciones (que prevalece sobre los
+        anteriores) y salen del registro. Las que reemplazan a una entrada de la base de datos principal,
+        o que este proceso aún no ha cargado, se quedan en el registro, que se
+        reescribe con una sola línea por ID. Los índices no se reconstruyen.
         
         Returns:
-            Diccionario con estadísticas
+            Diccionario con 'moved' (pasadas al almacén) y 'kept' (siguen en el registro)
         """
-        if not self.proteins:
-            return {}
+        with self._reload_lock, self._write_lock:
+            state = self._state
+            version = self._source_version()
+            logged = self.protein_log.read()
+            moved = {}
+            if isinstance(state.proteins, StoreProteins):
+                imports = set(import_segment_paths(self.database_path))
+                main_stores = [store for store in state.proteins.stores if store.path not in imports]
+                moved = {
+                    uniprot_id: protein_data for uniprot_id, protein_data in logged.items()
+                    if state.proteins.overlay.get(uniprot_id) == protein_data
+                    and protein_data['sequence'].isascii()
+                    and all(store.find(uniprot_id) is None for store in main_stores)
+                }
+            
+            if moved:
+                path = next_import_segment_path(self.database_path)
+                with ProteinStoreWriter(path, source=self.protein_log.path.name) as writer:
+                    for uniprot_id, protein_data in moved.items():
+                        writer.add(uniprot_id, protein_data)
+                state.move_to_stores(list(state.proteins.stores) + [ProteinStore(path)], moved)
+                # Los procesos de búsqueda tenían abierto el almacén anterior
+                state.close_sharded_search()
+                for uniprot_id in moved:
+                    self._runtime_proteins.pop(uniprot_id, None)
+            
+            kept = [(uniprot_id, protein_data) for uniprot_id, protein_data in logged.items()
+                    if uniprot_id not in moved]
+            self.protein_log.rewrite(kept)
+            if version == self._loaded_version:
+                self._loaded_version = self._source_version()
         
-        sequences = [p['sequence'] for p in self.proteins.values()]
-        lengths = [len(seq) for seq in sequences]
+        print(f"🗜️ Registro compactado: {len(moved)} proteínas al almacén, {len(kept)} en el registro")
+        return {'moved': len(moved), 'kept': len(kept)}
+    
+    def compact_log_if_needed(self, max_size: int = LOG_COMPACT_SIZE) -> bool:
+        """
+        Compacta el registro si supera max_size bytes
         
-        return {
-            'total_proteins': len(self.proteins),
-            'avg_length': sum(lengths) / len(lengths) if lengths else 0,
-            'min_length': min(lengths) if lengths else 0,
-            'max_length': max(lengths) if lengths else 0,
-            'organisms': list(set(p.get('organism', 'Unknown') for p in self.proteins.values()))
-        }
+        Returns:
+            True si se compactó
+        """
+        try:
+            if self.protein_log.path.stat().st_size < max_size:
+                return False
+        except FileNotFoundError:
+            return False
+        try:
+            self.compact_log()
+        except (OSError, ProteinStoreError) as e:
+            print(f"⚠️ No se pudo compactar el registro de proteínas: {e}")
+            return False
+        return True
+    
+    def import_proteins(self, records: Iterable[Tuple[str, Dict[str, Any]]], source: str = None,
+                        batch_size: int = IMPORT_BATCH_SIZE) -> Dict[str, int]:
+        """
+        Importa en streaming un conjunto de referencia al almacén persistente
+        
+        Cada lote se escribe como un segmento nuevo del almacén de importaciones
+        (junto a la base de datos, .imports.NNNNNN.store) y se añade a la vista y a
+        los índices ya construidos sin reconstruirlos (ver _Snapshot.add_store):
+        una búsqueda concurrente ve los lotes ya terminados, nunca uno a medias.
+        Las secuencias ya presentes en la base de datos (o repetidas en la
+        fuente) se descartan con el índice de digests, así que en memoria solo
+        queda el lote actual.
+        
+        Args:
+            records: Pares (uniprot_id, datos) con al menos 'sequence'
+            source: Descripción de la fuente (se guarda en el encabezado de cada segmento)
+            batch_size: Proteínas por lote
+        
+        Returns:
+            Diccionario con los contadores de la importación
+        
+        Raises:
+            ProteinStoreError: Si la base de datos no está respaldada por un almacén binario
+        """
+        # El bloqueo de recarga evita que el vigilante cambie de snapshot a mitad de la importación
+        with self._reload_lock, self._write_lock:
+            state = self._state
+            if not isinstance(state.proteins, StoreProteins):
+                raise ProteinStoreError("La base de datos no está respaldada por un almacén binario")
+            
+            version = self._source_version()
+            counts = {'read': 0, 'imported': 0, 'duplicate_sequences': 0, 'duplicate_ids': 0,
+                      'skipped': 0, 'batches': 0, 'residues': 0}
+            batch: Dict[str, Dict[str, Any]] = {}
+            batch_sequences = set()
+            
+            for uniprot_id, protein_data in records:
+                counts['read'] += 1
+                sequence = protein_data.get('sequence', '')
+                if not sequence or not sequence.isascii():
+                    counts['skipped'] += 1
+                    continue
+                
+                # Los lotes anteriores ya están en el snapshot: solo el actual se comprueba aparte
+                if sequence in batch_sequences or state.contains_sequence(sequence, sequence_digest(sequence)):
+                    counts['duplicate_sequences'] += 1
+                    continue
+                if uniprot_id in batch or uniprot_id in state.proteins:
+                    counts['duplicate_ids'] += 1
+                    continue
+                    
+                batch[uniprot_id] = protein_data
+                batch_sequences.add(sequence)
+                if len(batch) >= batch_size:
+                    self._import_batch(state, batch, source, counts)
+                    batch, batch_sequences = {}, set()
+                    
+            self._import_batch(state, batch, source, counts)
+            if counts['batches']:
+                self._save_extended_indexes(state, self._source_version())
+            if version == self._loaded_version:
+                # Los segmentos nuevos ya están en el snapshot: el vigilante no necesita recargar
+                self._loaded_version = self._source_version()
+        
+        print(f"📥 Importación completada: {counts['imported']} proteínas nuevas "
+              f"({counts['duplicate_sequences'] + counts['duplicate_ids']} duplicadas)")
+        return counts
+    
+    def _import_batch(self, state: _Snapshot, batch: Dict[str, Dict[str, Any]], source: Optional[str],
+                      counts: Dict[str, int]):
+        """Escribe un lote de la importación como segmento nuevo y lo añade al snapshot"""
+        if not batch:
+            return
+        
+        path = next_import_segment_path(self.database_path)
+        with ProteinStoreWriter(path, source=source) as writer:
+            for uniprot_id, protein_data in batch.items():
+                writer.add(uniprot_id, protein_data)
+        state.add_store(ProteinStore(path))
+        # Los procesos de búsqueda tenían abierta la lista de almacenes anterior
+        state.close_sharded_search()
+        
+        counts['imported'] += len(batch)
+        counts['residues'] += sum(len(protein_data['sequence']) for protein_data in batch.values())
+        counts['batches'] += 1
+        print(f"📦 Lote {counts['batches']}: {counts['imported']} proteínas importadas")
+    
+    def _save_extended_indexes(self, state: _Snapshot, version: Tuple):
+        """
+        Guarda los índices de homólogos y de fragmentos ampliados por una importación
+        
+        Solo se guardan si sus posiciones siguen el orden de carga (sin entradas
+        reemplazadas ni añadidas en memoria); si no, se reconstruyen al cargar.
+        """
+        if not isinstance(state.proteins, StoreProteins):
+            return
+        ids = list(state.proteins)
+        fingerprint = self._index_fingerprint(state, version)
+        for index, index_ids, path, name in (
+                (state.homolog_index, state.homolog_ids, self.homolog_index_path, 'homólogos'),
+                (state.fragment_index, state.fragment_ids, self.fragment_index_path, 'fragmentos')):
+            if index is None or len(index) != len(ids) or index_ids != ids:
+                continue
+            try:
+                index.save(path, fingerprint)
+            except OSError as e:
+                print(f"⚠️ No se pudo guardar el índice de {name} ({e})")
+    
+    def get_statistics(self) -> Dict:
+        """
+        Obtiene estadísticas de la base de datos
+        
+        Se mantienen de forma incremental al cargar y al añadir proteínas, así
+        que el coste no depende del tamaño de la base de datos.
+        
+        Returns:
+            Diccionario con estadísticas (ver DatabaseStatistics.summary)
+        """
+        return self._state.statistics.summary()
     
     def list_proteins(self) -> List[Tuple[str, str, int]]:
         """
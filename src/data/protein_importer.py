@@ -0,0 +1,162 @@
+"""
+Importación masiva de conjuntos de referencia (FASTA o UniProt flat file) a la base de datos
+Los archivos se leen en streaming, así que la memoria no depende de su tamaño
+"""
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Tuple, Union
+from src.data.fasta_reader import open_fasta
+from src.data.protein_database import IMPORT_BATCH_SIZE, ProteinDatabase
+from src.data.protein_store import iter_fasta_proteins
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+FASTA_FORMAT = 'fasta'
+UNIPROT_FORMAT = 'uniprot'
+
+# Nombre recomendado en las líneas DE ('RecName: Full=...' o 'SubName: Full=...')
+_DE_NAME = re.compile(r'(?:RecName|SubName):\s*Full=([^;]+)')
+_GENE_NAME = re.compile(r'\bName=([^;]+)')
+# Etiquetas de evidencia {ECO:...} de los campos de texto
+_EVIDENCE = re.compile(r'\s*\{[^}]*\}')
+
+
+class ImportFormatError(Exception):
+    """Excepción para archivos de importación con formato no reconocido"""
+    pass
+
+
+def read_uniprot_flatfile(lines: Iterable[Union[str, bytes]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Lee entradas de un volcado de UniProt en formato texto (uniprot_sprot.dat)
+    
+    Solo se mantiene en memoria la entrada que se está leyendo. El ID es el
+    primer accession de la línea AC.
+    
+    Args:
+        lines: Archivo abierto o iterable de líneas (str o bytes)
+    
+    Yields:
+        Pares (uniprot_id, datos con 'name', 'organism', 'gene' si existe, 'sequence' y 'length')
+    """
+    accession = name = gene = None
+    organism, chunks = [], []
+    in_sequence = False
+    
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        
+        if line.startswith('//'):
+            if accession and chunks:
+                sequence = ''.join(chunks).upper()
+                protein_data = {'name': name or accession, 'organism': ' '.join(organism).rstrip('.') or 'Unknown'}
+                if gene:
+                    protein_data['gene'] = gene
+                protein_data.update(sequence=sequence, length=len(sequence))
+                yield accession, protein_data
+            accession = name = gene = None
+            organism, chunks = [], []
+            in_sequence = False
+        elif in_sequence:
+            chunks.append(''.join(line.split()))
+        elif line.startswith('AC   ') and accession is None:
+            accession = line[5:].split(';')[0].strip()
+        elif line.startswith('DE   ') and name is None:
+            match = _DE_NAME.search(line)
+            if match:
+                name = _EVIDENCE.sub('', match.group(1)).strip()
+        elif line.startswith('OS   '):
+            organism.append(line[5:].strip())
+        elif line.startswith('GN   ') and gene is None:
+            match = _GENE_NAME.search(line)
+            if match:
+                gene = _EVIDENCE.sub('', match.group(1)).strip()
+        elif line.startswith('SQ   '):
+            in_sequence = True
+
+
+def detect_format(path: Union[str, Path]) -> str:
+    """
+    Detecta si un archivo es FASTA o UniProt flat file por su primera línea
+    
+    Raises:
+        ImportFormatError: Si no es ninguno de los dos formatos
+    """
+    with open_fasta(path) as stream:
+        for line in stream:
+            if not line.strip():
+                continue
+            if line.startswith('>'):
+                return FASTA_FORMAT
+            if line.startswith('ID   '):
+                return UNIPROT_FORMAT
+            break
+    raise ImportFormatError(f"Formato no reconocido (se esperaba FASTA o UniProt flat file): {path}")
+
+
+def iter_reference_proteins(path: Union[str, Path], file_format: str = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Pares (uniprot_id, datos) de un archivo FASTA o UniProt flat file (admite .gz)
+    
+    Args:
+        path: Ruta al archivo
+        file_format: 'fasta', 'uniprot' o None para detectarlo
+    """
+    file_format = file_format or detect_format(path)
+    if file_format == FASTA_FORMAT:
+        yield from iter_fasta_proteins(path)
+    elif file_format == UNIPROT_FORMAT:
+        with open_fasta(path) as stream:
+            yield from read_uniprot_flatfile(stream)
+    else:
+        raise ImportFormatError(f"Formato de importación desconocido: {file_format}")
+
+
+def peak_rss_mb() -> float:
+    """Pico de memoria residente del proceso en MB (0.0 si no se puede medir)"""
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB y macOS bytes
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+
+
+def import_reference_file(database: ProteinDatabase, path: Union[str, Path], file_format: str = None,
+                          batch_size: int = IMPORT_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Importa un archivo de referencia a la base de datos y mide el rendimiento
+    
+    Args:
+        database: Base de datos de destino
+        path: Archivo FASTA o UniProt flat file
+        file_format: 'fasta', 'uniprot' o None para detectarlo
+        batch_size: Proteínas por lote
+    
+    Returns:
+        Contadores de ProteinDatabase.import_proteins más formato, tiempo,
+        rendimiento (proteínas y residuos por segundo) y pico de memoria
+    """
+    path = Path(path)
+    file_format = file_format or detect_format(path)
+    
+    start = time.perf_counter()
+    report = database.import_proteins(iter_reference_proteins(path, file_format), source=path.name,
+                                      batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    
+    report.update({
+        'source': path.name,
+        'format': file_format,
+        'elapsed_seconds': round(elapsed, 3),
+        'proteins_per_second': round(report['read'] / elapsed, 1) if elapsed > 0 else 0.0,
+        'residues_per_second': round(report['residues'] / elapsed, 1) if elapsed > 0 else 0.0,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'total_proteins': len(database.proteins)
+    })
+    return report
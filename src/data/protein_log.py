@@ -0,0 +1,86 @@
+"""
+Registro de solo escritura al final (JSON Lines) de las proteínas añadidas en ejecución
+Se reproduce al cargar la base de datos y se compacta periódicamente en el almacén
+"""
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, Tuple, Union
+
+LOG_SUFFIX = '.log.jsonl'
+
+
+def log_path_for(database_path: Union[str, Path]) -> Path:
+    """Ruta del registro de proteínas añadidas junto a la base de datos"""
+    return Path(database_path).with_suffix(LOG_SUFFIX)
+
+
+def _encode(uniprot_id: str, protein_data: Dict[str, Any]) -> bytes:
+    """Una línea del registro"""
+    return (json.dumps({'id': uniprot_id, 'protein': protein_data}, ensure_ascii=False,
+                       separators=(',', ':')) + '\n').encode('utf-8')
+
+
+class ProteinLog:
+    """
+    Archivo con una línea {"id": ..., "protein": {...}} por cada add_protein
+    
+    Cada entrada se escribe con una sola llamada a write en modo append, así
+    que una caída a mitad de escritura solo puede dejar una última línea
+    incompleta, que se ignora al leer. Si un ID aparece varias veces, la
+    última línea es la que vale.
+    """
+    
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+    
+    def append(self, uniprot_id: str, protein_data: Dict[str, Any]):
+        """
+        Añade una entrada al final del registro
+        
+        Raises:
+            OSError: Si no se puede escribir
+        """
+        with open(self.path, 'ab') as handle:
+            handle.write(_encode(uniprot_id, protein_data))
+    
+    def read(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Lee el registro completo
+        
+        Returns:
+            {uniprot_id: datos} con la última versión de cada ID, en orden de primera aparición
+        """
+        entries: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(self.path, 'rb') as handle:
+                for line in handle:
+                    if not line.endswith(b'\n'):
+                        break
+                    try:
+                        record = json.loads(line)
+                        entries[record['id']] = record['protein']
+                    except (ValueError, KeyError, TypeError):
+                        print(f"⚠️ Línea dañada en {self.path.name}, se ignora")
+        except FileNotFoundError:
+            pass
+        return entries
+    
+    def rewrite(self, entries: Iterable[Tuple[str, Dict[str, Any]]]):
+        """
+        Reemplaza el registro de forma atómica (archivo temporal + os.replace)
+        
+        Args:
+            entries: Pares (uniprot_id, datos) que quedan en el registro
+        """
+        fd, temp_path = tempfile.mkstemp(prefix=self.path.name, suffix='.tmp', dir=self.path.parent)
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                for uniprot_id, protein_data in entries:
+                    handle.write(_encode(uniprot_id, protein_data))
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
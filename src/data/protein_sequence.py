@@ -0,0 +1,162 @@
+"""
+Tipo de valor compartido para secuencias de proteínas
+Guarda la secuencia limpia y calcula una sola vez su codificación, composición y digest
+"""
+import hashlib
+import re
+from functools import lru_cache
+from typing import Union
+import numpy as np
+from src.data.sequence_encoding import encode_sequence
+
+# Número de secuencias recientes que se comparten entre capas
+SHARED_SEQUENCE_CACHE_SIZE = 1024
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def clean_text(sequence: str) -> str:
+    """Elimina espacios y saltos de línea y convierte a mayúsculas"""
+    cleaned = sequence.upper()
+    if not cleaned.isalnum():
+        cleaned = _WHITESPACE.sub('', cleaned)
+    return cleaned
+
+
+def sequence_digest(sequence: str) -> str:
+    """Digest MD5 hexadecimal de una secuencia limpia (el mismo que ProteinSequence.digest)"""
+    return hashlib.md5(sequence.encode('utf-8')).hexdigest()
+
+
+class ProteinSequence:
+    """
+    Secuencia de aminoácidos inmutable con datos derivados perezosos
+    
+    La codificación uint8, el vector de composición y el digest se calculan
+    como mucho una vez por instancia. ProteinSequence.of() devuelve la misma
+    instancia para la misma secuencia, de modo que validador, base de datos de
+    proteínas y servicio AlphaFold comparten esos cálculos dentro de una petición.
+    """
+    
+    __slots__ = ('text', 'data', '_codes', '_composition', '_digest')
+    
+    def __init__(self, text: str):
+        """
+        Args:
+            text: Secuencia ya limpia (ver clean_text)
+        """
+        self.text = text
+        self.data = text.encode('utf-8')
+        self._codes = None
+        self._composition = None
+        self._digest = None
+    
+    @classmethod
+    def of(cls, sequence: Union[str, 'ProteinSequence']) -> 'ProteinSequence':
+        """
+        Obtiene la instancia compartida de una secuencia ya limpia
+        
+        Args:
+            sequence: Secuencia como str o ProteinSequence
+        
+        Returns:
+            ProteinSequence (la misma instancia si se recibe una)
+        """
+        if isinstance(sequence, cls):
+            return sequence
+        return _shared_sequence(sequence)
+    
+    @classmethod
+    def from_raw(cls, sequence: str) -> 'ProteinSequence':
+        """Limpia una secuencia introducida por el usuario y devuelve la instancia compartida"""
+        return cls.of(clean_text(sequence))
+    
+    @property
+    def codes(self) -> np.ndarray:
+        """Array de solo lectura con un código por residuo (uint8 si la secuencia es ASCII)"""
+        if self._codes is None:
+            if len(self.data) == len(self.text):
+                self._codes = np.frombuffer(self.data, dtype=np.uint8)
+            else:
+                self._codes = encode_sequence(self.text)
+        return self._codes
+    
+    @property
+    def composition(self) -> np.ndarray:
+        """
+        Conteo por carácter indexado por código ASCII
+        
+        Tiene 256 entradas para poder indexarlo con cualquier byte, pero solo se
+        cuentan caracteres ASCII: los demás (códigos de carácter >= 128, p. ej.
+        'Á') no aparecen en el conteo. count() los cuenta sobre el texto.
+        """
+        if self._composition is None:
+            codes = self.codes
+            if codes.dtype != np.uint8:
+                codes = codes[codes < 128]
+            composition = np.bincount(codes, minlength=256)
+            composition.flags.writeable = False
+            self._composition = composition
+        return self._composition
+    
+    @property
+    def digest(self) -> str:
+        """Digest MD5 hexadecimal del contenido, estable entre procesos"""
+        if self._digest is None:
+            self._digest = hashlib.md5(self.data).hexdigest()
+        return self._digest
+    
+    def count(self, residue: str) -> int:
+        """Número de apariciones de un residuo"""
+        code = ord(residue)
+        return int(self.composition[code]) if code < 128 else self.text.count(residue)
+    
+    def matches(self, other: 'ProteinSequence') -> int:
+        """Número de posiciones idénticas comparando hasta la longitud de la secuencia más corta"""
+        length = min(len(self), len(other))
+        return int(np.count_nonzero(self.codes[:length] == other.codes[:length]))
+    
+    def weighted_sum(self, table: np.ndarray) -> float:
+        """Suma de un valor por residuo usando una tabla de 256 entradas indexada por código"""
+        return float(self.composition @ table)
+    
+    def __len__(self) -> int:
+        return len(self.text)
+    
+    def __str__(self) -> str:
+        return self.text
+    
+    def __repr__(self) -> str:
+        preview = self.text if len(self.text) <= 20 else f"{self.text[:17]}..."
+        return f"<ProteinSequence {preview} ({len(self.text)} aa)>"
+    
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ProteinSequence):
+            return self.text == other.text
+        return NotImplemented
+    
+    def __hash__(self) -> int:
+        return hash(self.text)
+
+
+@lru_cache(maxsize=SHARED_SEQUENCE_CACHE_SIZE)
+def _shared_sequence(text: str) -> ProteinSequence:
+    """Instancia compartida por texto de secuencia"""
+    return ProteinSequence(text)
+
+
+def residue_table(values: dict, default: float = 0.0) -> np.ndarray:
+    """
+    Construye una tabla de 256 entradas (código ASCII -> valor) para weighted_sum
+    
+    Args:
+        values: Valor por residuo (un dict o un conjunto de residuos, que valen 1)
+        default: Valor de los códigos no incluidos
+    """
+    table = np.full(256, default, dtype=np.float64)
+    if isinstance(values, dict):
+        for residue, value in values.items():
+            table[ord(residue)] = value
+    else:
+        table[[ord(residue) for residue in values]] = 1.0
+    return table
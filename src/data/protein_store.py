@@ -0,0 +1,605 @@
+"""
+Almacén binario de solo lectura para la base de datos de proteínas conocidas
+El JSON sigue siendo la fuente editable; este formato se compila a partir de él
+y se abre con mmap, así que los workers comparten las mismas páginas en memoria
+
+Formato del archivo:
+    MAGIC (8 bytes) | longitud del encabezado (uint64) | encabezado JSON | secciones
+
+El encabezado incluye el número de entradas por organismo ('organisms'), para
+calcular las estadísticas sin decodificar los metadatos de cada entrada.
+
+Secciones (alineadas a 8 bytes):
+    ids, id_offsets             IDs de UniProt concatenados (utf-8) y sus offsets
+    sequences, sequence_offsets Secuencias concatenadas (ASCII) y sus offsets
+    metadata, metadata_offsets  Datos de cada entrada sin la secuencia (JSON)
+    id_order                    Entradas ordenadas por ID (búsqueda binaria)
+    digest_keys, digest_entries Prefijo de 64 bits del digest ordenado y su entrada
+"""
+import json
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Set, Tuple, Union
+import numpy as np
+from src.data.fasta_reader import open_fasta, read_fasta, parse_uniprot_header
+from src.data.protein_sequence import sequence_digest
+
+MAGIC = b'PROTSTO1'
+STORE_VERSION = 1
+STORE_SUFFIX = '.store'
+IMPORTS_SUFFIX = '.imports' + STORE_SUFFIX
+
+_ALIGNMENT = 8
+
+
+class ProteinStoreError(Exception):
+    """Excepción para almacenes binarios inexistentes o corruptos"""
+    pass
+
+
+def digest_key(digest: str) -> int:
+    """Prefijo de 64 bits de un digest hexadecimal (clave del índice de digests)"""
+    return int(digest[:16], 16)
+
+
+def store_path_for(source_path: Union[str, Path]) -> Path:
+    """Ruta del almacén binario compilado junto a un archivo fuente"""
+    return Path(source_path).with_suffix(STORE_SUFFIX)
+
+
+def imports_path_for(source_path: Union[str, Path]) -> Path:
+    """Ruta del almacén de importaciones masivas junto a un archivo fuente"""
+    return Path(source_path).with_suffix(IMPORTS_SUFFIX)
+
+
+def import_segment_path(source_path: Union[str, Path], number: int) -> Path:
+    """Ruta del segmento number del almacén de importaciones (el 0 es imports_path_for)"""
+    if number == 0:
+        return imports_path_for(source_path)
+    return Path(source_path).with_suffix(f'.imports.{number:06d}{STORE_SUFFIX}')
+
+
+def _numbered_import_segments(source_path: Union[str, Path]) -> Dict[int, Path]:
+    """Segmentos numerados del almacén de importaciones ({número: ruta})"""
+    base = imports_path_for(source_path)
+    prefix = base.name[:-len(STORE_SUFFIX)] + '.'
+    numbered = {}
+    for path in base.parent.glob(prefix + '*' + STORE_SUFFIX):
+        number = path.name[len(prefix):-len(STORE_SUFFIX)]
+        if number.isdigit():
+            numbered[int(number)] = path
+    return numbered
+
+
+def import_segment_paths(source_path: Union[str, Path]) -> List[Path]:
+    """
+    Segmentos existentes del almacén de importaciones, en el orden en que se escribieron
+    
+    Cada lote importado se escribe como un segmento nuevo, así que importar no
+    reescribe los anteriores; si un ID se repite, gana el segmento posterior.
+    """
+    base = imports_path_for(source_path)
+    numbered = _numbered_import_segments(source_path)
+    return ([base] if base.exists() else []) + [numbered[number] for number in sorted(numbered)]
+
+
+def next_import_segment_path(source_path: Union[str, Path]) -> Path:
+    """Ruta del siguiente segmento del almacén de importaciones"""
+    numbered = _numbered_import_segments(source_path)
+    if numbered:
+        return import_segment_path(source_path, max(numbered) + 1)
+    return import_segment_path(source_path, 1 if imports_path_for(source_path).exists() else 0)
+
+
+def is_store_stale(source_path: Union[str, Path], store_path: Union[str, Path]) -> bool:
+    """Indica si el almacén no existe o es más antiguo que su fuente"""
+    store_path = Path(store_path)
+    if not store_path.exists():
+        return True
+    return Path(source_path).stat().st_mtime > store_path.stat().st_mtime
+
+
+class ProteinStoreWriter:
+    """
+    Escribe un almacén binario en streaming
+    
+    Secuencias, IDs y metadatos se vuelcan a archivos temporales a medida que
+    llegan; en memoria solo quedan los offsets y las claves de ordenación. El
+    archivo final se reemplaza de forma atómica con os.replace al cerrar.
+    """
+    
+    def __init__(self, path: Union[str, Path], source: str = None):
+        """
+        Args:
+            path: Ruta del almacén a generar
+            source: Descripción de la fuente (se guarda en el encabezado)
+        """
+        self.path = Path(path)
+        self.source = source
+        self._sections = {name: tempfile.TemporaryFile() for name in ('ids', 'sequences', 'metadata')}
+        self._offsets = {name: array('q', [0]) for name in self._sections}
+        self._ids: List[bytes] = []
+        self._digest_keys = array('Q')
+        self._organisms: Counter = Counter()
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+    
+    def __enter__(self) -> 'ProteinStoreWriter':
+        return self
+    
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+    
+    def add(self, uniprot_id: str, protein_data: Dict[str, Any]):
+        """
+        Añade una entrada
+        
+        Args:
+            uniprot_id: ID de UniProt
+            protein_data: Datos de la proteína (debe incluir 'sequence')
+        
+        Raises:
+            ProteinStoreError: Si la secuencia contiene caracteres no ASCII
+        """
+        sequence = protein_data['sequence']
+        if not sequence.isascii():
+            raise ProteinStoreError(f"Secuencia con caracteres no ASCII en {uniprot_id}")
+        metadata = {key: value for key, value in protein_data.items() if key != 'sequence'}
+        encoded_id = uniprot_id.encode('utf-8')
+        
+        self._write('ids', encoded_id)
+        self._write('sequences', sequence.encode('ascii'))
+        self._write('metadata', json.dumps(metadata, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+        self._ids.append(encoded_id)
+        self._digest_keys.append(digest_key(sequence_digest(sequence)))
+        self._organisms[metadata.get('organism', 'Unknown')] += 1
+    
+    def _write(self, section: str, data: bytes):
+        """Añade datos a una sección y registra su offset final"""
+        self._sections[section].write(data)
+        offsets = self._offsets[section]
+        offsets.append(offsets[-1] + len(data))
+    
+    def close(self):
+        """Genera el archivo final y lo reemplaza de forma atómica"""
+        count = len(self._ids)
+        id_order = np.argsort(np.array(self._ids, dtype=bytes), kind='stable').astype(np.int32) \
+            if count else np.empty(0, dtype=np.int32)
+        keys = np.frombuffer(self._digest_keys, dtype=np.uint64) if count else np.empty(0, dtype=np.uint64)
+        digest_entries = np.argsort(keys, kind='stable').astype(np.int32)
+        
+        arrays = {
+            'id_offsets': np.frombuffer(self._offsets['ids'], dtype=np.int64),
+            'sequence_offsets': np.frombuffer(self._offsets['sequences'], dtype=np.int64),
+            'metadata_offsets': np.frombuffer(self._offsets['metadata'], dtype=np.int64),
+            'id_order': id_order,
+            'digest_keys': keys[digest_entries],
+            'digest_entries': digest_entries
+        }
+        blobs = ('ids', 'sequences', 'metadata')
+        
+        # Calcular la posición de cada sección antes de escribir el encabezado
+        layout = {}
+        sizes = {name: self._offsets[name][-1] for name in blobs}
+        sizes.update({name: values.nbytes for name, values in arrays.items()})
+        header = {'format': 'protein-store', 'version': STORE_VERSION, 'count': count, 'source': self.source,
+                  'organisms': dict(self._organisms)}
+        header_size = 4096
+        while True:
+            position = _align(len(MAGIC) + 8 + header_size)
+            for name in list(blobs) + list(arrays):
+                layout[name] = [position, sizes[name], str(arrays[name].dtype) if name in arrays else 'bytes']
+                position = _align(position + sizes[name])
+            encoded_header = json.dumps(dict(header, sections=layout)).encode('utf-8')
+            if len(encoded_header) <= header_size:
+                break
+            header_size = len(encoded_header)
+        
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_fd, temp_path = tempfile.mkstemp(prefix=self.path.name, suffix='.tmp', dir=str(self.path.parent))
+        try:
+            with os.fdopen(temp_fd, 'wb') as output:
+                output.write(MAGIC)
+                output.write(struct.pack('<Q', header_size))
+                output.write(encoded_header.ljust(header_size, b' '))
+                for name in list(blobs) + list(arrays):
+                    output.seek(layout[name][0])
+                    if name in blobs:
+                        source = self._sections[name]
+                        source.seek(0)
+                        while True:
+                            chunk = source.read(1 << 20)
+                            if not chunk:
+                                break
+                            output.write(chunk)
+                    else:
+                        output.write(arrays[name].tobytes())
+                output.truncate(position)
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        finally:
+            self.discard()
+    
+    def discard(self):
+        """Libera los archivos temporales sin generar el almacén"""
+        for section in self._sections.values():
+            section.close()
+
+
+def _align(position: int) -> int:
+    """Redondea una posición al siguiente múltiplo de la alineación"""
+    return (position + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def compile_store(records: Iterable[Tuple[str, Dict[str, Any]]], store_path: Union[str, Path],
+                  source: str = None) -> Path:
+    """
+    Compila un almacén binario a partir de pares (uniprot_id, datos)
+    
+    Returns:
+        Ruta del almacén generado
+    """
+    with ProteinStoreWriter(store_path, source=source) as writer:
+        for uniprot_id, protein_data in records:
+            writer.add(uniprot_id, protein_data)
+    return Path(store_path)
+
+
+def compile_json(json_path: Union[str, Path], store_path: Union[str, Path] = None) -> Path:
+    """Compila el archivo JSON editable de la base de datos"""
+    json_path = Path(json_path)
+    with open(json_path, 'r', encoding='utf-8') as f:
+        proteins = json.load(f).get('proteins', {})
+    return compile_store(proteins.items(), store_path or store_path_for(json_path), source=json_path.name)
+
+
+def iter_fasta_proteins(path: Union[str, Path]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Lee un volcado FASTA de UniProt como pares (uniprot_id, datos)"""
+    with open_fasta(path) as stream:
+        for record in read_fasta(stream):
+            uniprot_id, metadata = parse_uniprot_header(record.header)
+            sequence = record.sequence.upper()
+            yield uniprot_id, dict(metadata, sequence=sequence, length=len(sequence))
+
+
+def compile_fasta(fasta_path: Union[str, Path], store_path: Union[str, Path] = None) -> Path:
+    """Compila un volcado FASTA (p. ej. Swiss-Prot) sin cargarlo completo en memoria"""
+    fasta_path = Path(fasta_path)
+    return compile_store(iter_fasta_proteins(fasta_path), store_path or store_path_for(fasta_path),
+                         source=fasta_path.name)
+
+
+class ProteinStore:
+    """Lector de un almacén binario abierto con mmap (solo lectura)"""
+    
+    def __init__(self, path: Union[str, Path]):
+        """
+        Args:
+            path: Ruta del almacén
+        
+        Raises:
+            ProteinStoreError: Si el archivo no es un almacén válido
+        """
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        try:
+            if self._mmap[:len(MAGIC)] != MAGIC:
+                raise ProteinStoreError(f"Formato de almacén no reconocido: {self.path}")
+            header_size, = struct.unpack_from('<Q', self._mmap, len(MAGIC))
+            header_start = len(MAGIC) + 8
+            self.header = json.loads(bytes(self._mmap[header_start:header_start + header_size]))
+            if self.header.get('version') != STORE_VERSION:
+                raise ProteinStoreError(f"Versión de almacén no soportada: {self.header.get('version')}")
+        except (ProteinStoreError, ValueError, struct.error) as e:
+            self._mmap.close()
+            raise ProteinStoreError(str(e)) from e
+        
+        self.count = self.header['count']
+        self._sections = self.header['sections']
+        self.id_offsets = self._array('id_offsets')
+        self.sequence_offsets = self._array('sequence_offsets')
+        self.metadata_offsets = self._array('metadata_offsets')
+        self.id_order = self._array('id_order')
+        self.digest_keys = self._array('digest_keys')
+        self.digest_entries = self._array('digest_entries')
+    
+    def _array(self, name: str) -> np.ndarray:
+        """Vista NumPy (sin copia) de una sección"""
+        offset, size, dtype = self._sections[name]
+        dtype = np.dtype(dtype)
+        return np.frombuffer(self._mmap, dtype=dtype, count=size // dtype.itemsize, offset=offset)
+    
+    def _blob(self, name: str, offsets: np.ndarray, entry: int) -> bytes:
+        """Bytes de una entrada dentro de una sección concatenada"""
+        base = self._sections[name][0]
+        return self._mmap[base + int(offsets[entry]):base + int(offsets[entry + 1])]
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    @property
+    def lengths(self) -> np.ndarray:
+        """Longitud de cada secuencia"""
+        return np.diff(self.sequence_offsets)
+    
+    @property
+    def sequence_blob(self) -> memoryview:
+        """Todas las secuencias concatenadas (vista del mmap, sin copia)"""
+        offset, size, _ = self._sections['sequences']
+        return memoryview(self._mmap)[offset:offset + size]
+    
+    def uniprot_id(self, entry: int) -> str:
+        """ID de UniProt de una entrada"""
+        return self._blob('ids', self.id_offsets, entry).decode('utf-8')
+    
+    def sequence(self, entry: int) -> str:
+        """Secuencia de una entrada"""
+        return self._blob('sequences', self.sequence_offsets, entry).decode('ascii')
+    
+    def sequence_bytes(self, entry: int) -> bytes:
+        """Secuencia de una entrada como bytes"""
+        return self._blob('sequences', self.sequence_offsets, entry)
+    
+    def protein(self, entry: int) -> Dict[str, Any]:
+        """Datos completos de una entrada (metadatos más la secuencia)"""
+        protein_data = json.loads(self._blob('metadata', self.metadata_offsets, entry))
+        protein_data['sequence'] = self.sequence(entry)
+        return protein_data
+    
+    def find(self, uniprot_id: str) -> Optional[int]:
+        """
+        Busca una entrada por ID de UniProt (búsqueda binaria, O(log N))
+        
+        Returns:
+            Posición de la entrada o None
+        """
+        target = uniprot_id.encode('utf-8')
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._blob('ids', self.id_offsets, int(self.id_order[middle])) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count:
+            entry = int(self.id_order[low])
+            if self._blob('ids', self.id_offsets, entry) == target:
+                return entry
+        return None
+    
+    def find_digest(self, digest: str) -> List[int]:
+        """
+        Entradas cuyo digest comparte el prefijo de 64 bits (hay que confirmar la secuencia)
+        
+        Args:
+            digest: Digest hexadecimal (sequence_digest)
+        """
+        key = digest_key(digest)
+        low = high = int(self.digest_keys.searchsorted(np.uint64(key)))
+        # Casi siempre hay 0 o 1 entradas con la clave: recorrerlas es más barato que otra búsqueda
+        while high < self.count and int(self.digest_keys[high]) == key:
+            high += 1
+        return sorted(int(entry) for entry in self.digest_entries[low:high])
+    
+    def close(self):
+        """
+        Cierra el mmap
+        
+        Primero se sueltan las vistas NumPy propias, que exportan el buffer del
+        mmap e impedirían cerrarlo. Si alguien conserva otra vista (p. ej. de
+        sequence_blob), el mmap se libera cuando desaparezca esa vista.
+        """
+        self.id_offsets = self.sequence_offsets = self.metadata_offsets = None
+        self.id_order = self.digest_keys = self.digest_entries = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+
+class StoreProteins(Mapping):
+    """
+    Vista tipo dict {uniprot_id: datos} sobre uno o varios ProteinStore
+    
+    Si un ID está en varios almacenes tiene prioridad el último (p. ej. el de
+    importaciones sobre el principal) y las copias anteriores quedan ocultas:
+    no se iteran ni se cuentan. Las entradas añadidas o reemplazadas en memoria
+    se guardan en una capa superior (overlay) que tiene prioridad sobre los
+    almacenes. El orden de iteración es el de los almacenes seguido de las
+    entradas nuevas.
+    """
+    
+    def __init__(self, stores: Union[ProteinStore, Sequence[ProteinStore]]):
+        self.stores: List[ProteinStore] = [stores] if isinstance(stores, ProteinStore) else list(stores)
+        self.overlay: Dict[str, Dict[str, Any]] = {}
+        self._new_ids = 0
+        self._shadowed: Optional[List[Set[int]]] = None
+    
+    @property
+    def store(self) -> ProteinStore:
+        """Almacén principal (el primero)"""
+        return self.stores[0]
+    
+    def _locate(self, uniprot_id: str) -> Optional[Tuple[ProteinStore, int]]:
+        """Almacén y posición de un ID (en el último almacén que lo contiene), o None si no está"""
+        for store in reversed(self.stores):
+            entry = store.find(uniprot_id)
+            if entry is not None:
+                return store, entry
+        return None
+    
+    def _shadowed_entries(self) -> List[Set[int]]:
+        """Por almacén, posiciones cuyo ID también está en un almacén posterior (calculado una vez)"""
+        if self._shadowed is None:
+            shadowed = [set() for _ in self.stores]
+            for index, later in enumerate(self.stores[1:], start=1):
+                for entry in range(later.count):
+                    uniprot_id = later.uniprot_id(entry)
+                    for earlier in range(index):
+                        found = self.stores[earlier].find(uniprot_id)
+                        if found is not None:
+                            shadowed[earlier].add(found)
+            self._shadowed = shadowed
+        return self._shadowed
+    
+    @property
+    def shadowed_count(self) -> int:
+        """Entradas de los almacenes ocultas por otra con el mismo ID en un almacén posterior"""
+        return sum(len(entries) for entries in self._shadowed_entries())
+    
+    def shadowed(self) -> Iterator[Tuple[ProteinStore, int]]:
+        """Pares (almacén, posición) de las entradas ocultas"""
+        for store, entries in zip(self.stores, self._shadowed_entries()):
+            for entry in sorted(entries):
+                yield store, entry
+    
+    def stored(self, uniprot_id: str) -> Optional[Dict[str, Any]]:
+        """Datos de un ID en los almacenes, sin tener en cuenta la capa en memoria"""
+        location = self._locate(uniprot_id)
+        if location is None:
+            return None
+        store, entry = location
+        return store.protein(entry)
+    
+    def position(self, uniprot_id: str) -> Optional[int]:
+        """
+        Posición de un ID en los almacenes concatenados, o None si solo está en memoria
+        
+        Cuenta también las entradas ocultas (como ShardedSearch), así que respeta
+        el orden de iteración aunque no coincida con el índice en él.
+        """
+        base = sum(store.count for store in self.stores)
+        for store in reversed(self.stores):
+            base -= store.count
+            entry = store.find(uniprot_id)
+            if entry is not None:
+                return base + entry
+        return None
+    
+    def _store_entries(self) -> Iterator[Tuple[ProteinStore, int]]:
+        """Pares (almacén, posición) de las entradas visibles de los almacenes"""
+        for store, shadowed in zip(self.stores, self._shadowed_entries()):
+            for entry in range(store.count):
+                if not shadowed or entry not in shadowed:
+                    yield store, entry
+    
+    def with_stores(self, stores: Sequence[ProteinStore],
+                    overlay: Optional[Dict[str, Dict[str, Any]]] = None) -> 'StoreProteins':
+        """
+        Nueva vista sobre otros almacenes
+        
+        Args:
+            stores: Almacenes de la nueva vista
+            overlay: Capa en memoria de la nueva vista (por defecto se conserva la actual)
+        """
+        view = StoreProteins(stores)
+        view.overlay = self.overlay if overlay is None else overlay
+        view._new_ids = sum(1 for uniprot_id in self.overlay if view._locate(uniprot_id) is None)
+        return view
+    
+    def __getitem__(self, uniprot_id: str) -> Dict[str, Any]:
+        protein_data = self.overlay.get(uniprot_id)
+        if protein_data is not None:
+            return protein_data
+        location = self._locate(uniprot_id)
+        if location is None:
+            raise KeyError(uniprot_id)
+        store, entry = location
+        return store.protein(entry)
+    
+    def __setitem__(self, uniprot_id: str, protein_data: Dict[str, Any]):
+        if uniprot_id not in self.overlay and self._locate(uniprot_id) is None:
+            self._new_ids += 1
+        self.overlay[uniprot_id] = protein_data
+    
+    def __contains__(self, uniprot_id) -> bool:
+        return uniprot_id in self.overlay or self._locate(uniprot_id) is not None
+    
+    def __iter__(self) -> Iterator[str]:
+        for store, entry in self._store_entries():
+            yield store.uniprot_id(entry)
+        for uniprot_id in self.overlay:
+            if self._locate(uniprot_id) is None:
+                yield uniprot_id
+    
+    def __len__(self) -> int:
+        return sum(store.count for store in self.stores) - self.shadowed_count + self._new_ids
+    
+    def items(self):
+        """Pares (uniprot_id, datos) en orden de iteración"""
+        for store, entry in self._store_entries():
+            uniprot_id = store.uniprot_id(entry)
+            yield uniprot_id, self.overlay.get(uniprot_id) or store.protein(entry)
+        for uniprot_id, protein_data in self.overlay.items():
+            if self._locate(uniprot_id) is None:
+                yield uniprot_id, protein_data
+    
+    def values(self):
+        """Datos de cada entrada en orden de iteración"""
+        for _, protein_data in self.items():
+            yield protein_data
+    
+    def sequences(self) -> Iterator[str]:
+        """Secuencias en orden de iteración sin decodificar los metadatos"""
+        for store, entry in self._store_entries():
+            uniprot_id = store.uniprot_id(entry) if self.overlay else None
+            if uniprot_id in self.overlay:
+                yield self.overlay[uniprot_id]['sequence']
+            else:
+                yield store.sequence(entry)
+        for uniprot_id, protein_data in self.overlay.items():
+            if self._locate(uniprot_id) is None:
+                yield protein_data['sequence']
+    
+    def find_digest(self, digest: str) -> List[str]:
+        """
+        IDs de los almacenes cuyo digest comparte el prefijo de 64 bits
+        
+        Las entradas reemplazadas en el overlay o ocultas por otro almacén no se incluyen.
+        """
+        ids = []
+        for store, shadowed in zip(self.stores, self._shadowed_entries()):
+            for entry in store.find_digest(digest):
+                uniprot_id = store.uniprot_id(entry)
+                if uniprot_id not in self.overlay and entry not in shadowed:
+                    ids.append(uniprot_id)
+        return ids
+    
+    def find_sequence(self, sequence: str, digest: str) -> Optional[str]:
+        """
+        ID de una entrada de los almacenes con exactamente esa secuencia (sin decodificar metadatos)
+        
+        Args:
+            sequence: Secuencia buscada
+            digest: sequence_digest(sequence)
+        """
+        if not sequence.isascii():
+            return None
+        encoded = sequence.encode('ascii')
+        for store, shadowed in zip(self.stores, self._shadowed_entries()):
+            for entry in store.find_digest(digest):
+                if entry not in shadowed and store.sequence_bytes(entry) == encoded:
+                    uniprot_id = store.uniprot_id(entry)
+                    if uniprot_id not in self.overlay:
+                        return uniprot_id
+        return None
+    
+    def close(self):
+        """Cierra todos los almacenes"""
+        for store in self.stores:
+            store.close()
@@ -0,0 +1,146 @@
+"""
+Codificación vectorizada de secuencias de proteínas
+Convierte secuencias a arrays uint8 y compara pares de secuencias con NumPy
+"""
+from typing import Iterable, List, Tuple
+import numpy as np
+
+Difference = Tuple[int, str, str]
+
+
+def encode_sequence(sequence) -> np.ndarray:
+    """
+    Codifica una secuencia como array de bytes sin copiar el buffer
+
+    Args:
+        sequence: Secuencia como str o bytes
+
+    Returns:
+        Array uint8 (ASCII) o uint32 (UCS-4) si la secuencia no es ASCII
+    """
+    if isinstance(sequence, (bytes, bytearray, memoryview)):
+        return np.frombuffer(sequence, dtype=np.uint8)
+    try:
+        return np.frombuffer(sequence.encode('ascii'), dtype=np.uint8)
+    except UnicodeEncodeError:
+        # Caracteres fuera de ASCII: un código por carácter para conservar las posiciones
+        return np.frombuffer(sequence.encode('utf-32-le'), dtype='<u4')
+
+
+def _encode_joined(sequences: List[str]) -> np.ndarray:
+    """Codifica la concatenación de varias secuencias con una sola conversión"""
+    return encode_sequence(''.join(sequences))
+
+
+def find_differences_batch(pairs: Iterable[Tuple[str, str]]) -> List[List[Difference]]:
+    """
+    Encuentra las diferencias de muchos pares de secuencias en una sola pasada
+
+    Todos los pares se concatenan en dos buffers y las posiciones distintas se
+    obtienen con un único np.nonzero. Como zip(), cada par se compara solo hasta
+    la longitud de la secuencia más corta.
+
+    Args:
+        pairs: Iterable de tuplas (original, mutada)
+
+    Returns:
+        Lista (una por par) de listas de (posición 1-indexed, amino_original, amino_mutado)
+    """
+    originals: List[str] = []
+    mutateds: List[str] = []
+    lengths: List[int] = []
+
+    for original, mutated in pairs:
+        length = min(len(original), len(mutated))
+        originals.append(original[:length])
+        mutateds.append(mutated[:length])
+        lengths.append(length)
+
+    if not lengths:
+        return []
+
+    orig_buffer = _encode_joined(originals)
+    mut_buffer = _encode_joined(mutateds)
+    if orig_buffer.dtype != mut_buffer.dtype:
+        orig_buffer = orig_buffer.astype(np.uint32)
+        mut_buffer = mut_buffer.astype(np.uint32)
+
+    mismatch = np.nonzero(orig_buffer != mut_buffer)[0]
+
+    # Repartir las posiciones globales entre los pares usando los offsets acumulados
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    bounds = np.searchsorted(mismatch, offsets).tolist()
+    bases = offsets.tolist()
+
+    orig_chars = orig_buffer[mismatch].tolist()
+    mut_chars = mut_buffer[mismatch].tolist()
+    positions = mismatch.tolist()
+
+    return [
+        [
+            (positions[k] - bases[pair_index] + 1, chr(orig_chars[k]), chr(mut_chars[k]))
+            for k in range(bounds[pair_index], bounds[pair_index + 1])
+        ]
+        for pair_index in range(len(lengths))
+    ]
+
+
+def find_differences(original: str, mutated: str) -> List[Difference]:
+    """
+    Encuentra las diferencias entre dos secuencias
+
+    Returns:
+        Lista de (posición 1-indexed, amino_original, amino_mutado)
+    """
+    return find_differences_batch(((original, mutated),))[0]
+
+
+def build_charset_mask(valid_chars: Iterable[str]) -> np.ndarray:
+    """
+    Construye una tabla de 256 entradas que marca los bytes permitidos
+
+    Args:
+        valid_chars: Caracteres ASCII válidos
+
+    Returns:
+        Array booleano indexable por código de byte
+    """
+    mask = np.zeros(256, dtype=bool)
+    mask[list(''.join(valid_chars).encode('ascii'))] = True
+    return mask
+
+
+def find_invalid_sequences(sequences: List[str], charset_mask: np.ndarray) -> List[bool]:
+    """
+    Indica qué secuencias contienen caracteres fuera del conjunto permitido
+
+    Las secuencias se concatenan en un único buffer uint8 y se validan con una
+    sola búsqueda en la tabla; las que no son ASCII se marcan como inválidas.
+
+    Args:
+        sequences: Secuencias ya limpias
+        charset_mask: Tabla generada por build_charset_mask
+
+    Returns:
+        Lista de booleanos (True si la secuencia tiene caracteres inválidos)
+    """
+    if not sequences:
+        return []
+
+    codes = _encode_joined(sequences)
+    if codes.dtype != np.uint8:
+        # Hay caracteres no ASCII: validar cada secuencia por separado
+        return [not sequence.isascii() or not charset_mask[encode_sequence(sequence)].all()
+                for sequence in sequences]
+
+    offsets = np.zeros(len(sequences) + 1, dtype=np.int64)
+    np.cumsum([len(sequence) for sequence in sequences], out=offsets[1:])
+    invalid_positions = np.nonzero(~charset_mask[codes])[0]
+
+    # Cada posición inválida pertenece a la secuencia cuyo offset la contiene
+    flags = [False] * len(sequences)
+    for index in np.unique(np.searchsorted(offsets, invalid_positions, side='right') - 1).tolist():
+        flags[index] = True
+
+    return flags
@@ -0,0 +1,440 @@
+"""
+Matriz empaquetada de secuencias para calcular similitudes de forma vectorizada
+Las secuencias se agrupan por longitud en matrices uint8 rellenas con PAD
+La similitud puede ser por identidad o puntuada con BLOSUM62
+"""
+import heapq
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from src.data.protein_sequence import ProteinSequence
+from src.data.substitution_matrix import BLOSUM62_BEST, BLOSUM62_TABLE
+
+# Relleno de las filas (ningún residuo usa el byte 0)
+PAD = 0
+
+# Código de consulta para caracteres no ASCII: nunca coincide con una fila
+_NO_MATCH = 255
+
+# Ancho (en residuos) del rango de longitudes de cada bucket
+BUCKET_WIDTH = 32
+
+# Diferencia relativa máxima de longitud para considerar dos secuencias comparables
+MAX_LENGTH_DIFFERENCE = 0.1
+
+# Columnas comparadas por bloque antes de descartar las filas que agotaron su margen de diferencias
+CHUNK_COLUMNS = 64
+
+# Filas por indexación al puntuar con la matriz de sustitución (los índices temporales caben en caché)
+SCORE_ROWS = 256
+
+# Modos de puntuación: fracción de posiciones idénticas o puntuación BLOSUM62 normalizada
+IDENTITY = 'identity'
+BLOSUM62 = 'blosum62'
+SCORING_MODES = (IDENTITY, BLOSUM62)
+
+
+def sequence_similarity(seq1, seq2, scoring: str = IDENTITY) -> float:
+    """
+    Similitud posición a posición entre dos secuencias
+    
+    Args:
+        seq1: Primera secuencia, la consulta (str o ProteinSequence)
+        seq2: Segunda secuencia (str o ProteinSequence)
+        scoring: 'identity' o 'blosum62'
+    
+    Returns:
+        Con 'identity', fracción de posiciones idénticas sobre la longitud menor.
+        Con 'blosum62', puntuación BLOSUM62 de esas posiciones dividida por la
+        máxima que podría obtener seq1 en ellas (1.0 si son idénticas; las
+        negativas cuentan como 0.0). 0.0 si alguna está vacía o si las longitudes
+        difieren más de un 10%
+    """
+    if scoring not in SCORING_MODES:
+        raise ValueError(f"Modo de puntuación desconocido: {scoring}")
+    
+    if len(seq1) == 0 or len(seq2) == 0:
+        return 0.0
+    
+    if abs(len(seq1) - len(seq2)) / max(len(seq1), len(seq2)) > MAX_LENGTH_DIFFERENCE:
+        return 0.0
+    
+    min_len = min(len(seq1), len(seq2))
+    if scoring == IDENTITY:
+        return ProteinSequence.of(seq1).matches(ProteinSequence.of(seq2)) / min_len
+    
+    query = _query_codes(ProteinSequence.of(seq1))[:min_len]
+    other = _query_codes(ProteinSequence.of(seq2))[:min_len]
+    best = int(BLOSUM62_BEST[query].sum())
+    return max(int(BLOSUM62_TABLE[query, other].sum()), 0) / best if best > 0 else 0.0
+
+
+def _query_codes(sequence: ProteinSequence) -> np.ndarray:
+    """Codificación uint8 de la consulta; los caracteres no ASCII no coinciden con nada"""
+    codes = sequence.codes
+    if codes.dtype != np.uint8:
+        codes = np.where(codes < 128, codes, _NO_MATCH).astype(np.uint8)
+    return codes
+
+
+class _Scorer:
+    """
+    Puntuación de una consulta codificada contra bloques de filas de un bucket
+    
+    ceiling[i] es la puntuación máxima que pueden sumar los primeros i residuos
+    de la consulta (i con identidad; la mejor puntuación de cada residuo con
+    BLOSUM62, que en los 20 estándar es la diagonal). La similitud de una fila
+    es su puntuación entre ceiling[posiciones comparadas].
+    """
+    
+    __slots__ = ('query', 'profile', 'offsets', 'ceiling')
+    
+    def __init__(self, query: np.ndarray, scoring: str = IDENTITY):
+        if scoring not in SCORING_MODES:
+            raise ValueError(f"Modo de puntuación desconocido: {scoring}")
+        self.query = query
+        self.profile = self.offsets = None
+        if scoring == BLOSUM62:
+            # Perfil de la consulta: fila i = puntuación de su residuo i contra cada byte,
+            # aplanado para que la posición (i, byte) sea i·256 + byte
+            self.profile = BLOSUM62_TABLE[query].ravel()
+            self.offsets = np.arange(len(query), dtype=np.intp) * 256
+            best = BLOSUM62_BEST[query]
+        else:
+            best = np.ones(len(query), dtype=np.int64)
+        self.ceiling = np.concatenate(([0], np.cumsum(best, dtype=np.int64)))
+    
+    def score(self, block: np.ndarray, start: int) -> np.ndarray:
+        """Puntuación de cada fila del bloque contra las columnas start .. start + ancho del bloque"""
+        if self.profile is None:
+            return np.count_nonzero(block == self.query[start:start + block.shape[1]], axis=1)
+        
+        offsets = self.offsets[start:start + block.shape[1]]
+        scores = np.empty(len(block), dtype=np.int64)
+        for row in range(0, len(block), SCORE_ROWS):
+            # Una indexación del perfil por grupo de filas
+            rows = block[row:row + SCORE_ROWS]
+            scores[row:row + len(rows)] = self.profile[rows + offsets].sum(axis=1, dtype=np.int64)
+        return scores
+    
+    def similarity(self, scores: np.ndarray, compared: np.ndarray) -> np.ndarray:
+        """Similitud normalizada en [0, 1] para filas comparadas en sus primeras compared posiciones"""
+        return np.maximum(scores, 0) / np.maximum(self.ceiling[compared], 1)
+
+
+class _Bucket:
+    """Filas de las secuencias con longitud en [índice·BUCKET_WIDTH, (índice+1)·BUCKET_WIDTH)"""
+    
+    __slots__ = ('rows', 'lengths', 'entries', 'count')
+    
+    def __init__(self, width: int, capacity: int):
+        self.rows = np.full((capacity, width), PAD, dtype=np.uint8)
+        self.lengths = array('i')
+        self.entries = array('i')
+        self.count = 0
+    
+    def append(self, entry: int, codes: np.ndarray) -> int:
+        """Añade una fila, duplicando la capacidad si hace falta, y devuelve su índice"""
+        if self.count == len(self.rows):
+            grown = np.full((max(2 * len(self.rows), 4), self.rows.shape[1]), PAD, dtype=np.uint8)
+            grown[:self.count] = self.rows[:self.count]
+            self.rows = grown
+        
+        row = self.count
+        self.rows[row, :len(codes)] = codes
+        self.lengths.append(len(codes))
+        self.entries.append(entry)
+        self.count += 1
+        return row
+    
+    def matches(self, scorer: _Scorer, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Puntuación de cada fila con la consulta (posiciones idénticas con identidad)
+        
+        Una sola operación con broadcasting sobre las primeras min(n, ancho)
+        columnas; el relleno no coincide ni puntúa, así que cada fila cuenta
+        solo hasta la longitud menor.
+        """
+        width = min(len(scorer.query), self.rows.shape[1])
+        matrix = self.rows[:self.count] if rows is None else self.rows[rows]
+        return scorer.score(matrix[:, :width], 0)
+    
+    def bounded_matches(self, scorer: _Scorer, rows: np.ndarray, compared: np.ndarray,
+                        threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Puntuación comparando por bloques de columnas con un margen de diferencias
+        
+        Tras cada bloque se abandonan las filas cuya similitud máxima alcanzable
+        (puntuación hasta ahora más la máxima de las columnas que les quedan) ya
+        es menor que el umbral; con identidad, las que superaron (1 - umbral)·longitud
+        diferencias.
+        
+        Args:
+            scorer: Consulta codificada y modo de puntuación
+            rows: Filas a comparar
+            compared: Longitud comparada de cada fila (mínimo con la consulta)
+            threshold: Similitud mínima
+        
+        Returns:
+            Tupla (índices en rows de las filas que alcanzan el umbral, sus puntuaciones)
+        """
+        width = min(len(scorer.query), self.rows.shape[1])
+        alive = np.arange(len(rows))
+        matches = np.zeros(len(rows), dtype=np.int64)
+        
+        for start in range(0, width, CHUNK_COLUMNS):
+            stop = min(start + CHUNK_COLUMNS, width)
+            matches[alive] += scorer.score(self.rows[rows[alive], start:stop], start)
+            
+            # Misma división que la similitud final, así que el descarte es exacto
+            remaining = scorer.ceiling[compared[alive]] - scorer.ceiling[np.minimum(compared[alive], stop)]
+            alive = alive[scorer.similarity(matches[alive] + remaining, compared[alive]) >= threshold]
+            if not len(alive):
+                break
+        
+        return alive, matches[alive]
+
+
+class SequenceMatrix:
+    """
+    Secuencias de la base de datos empaquetadas en matrices uint8 por longitud
+    
+    Las entradas se identifican por su posición de inserción, igual que en
+    KmerIndex. Las secuencias no ASCII se guardan aparte y se comparan con
+    sequence_similarity.
+    """
+    
+    def __init__(self):
+        self._buckets: Dict[int, _Bucket] = {}
+        self._locations = array('i')
+        self._rows = array('i')
+        self._active = bytearray()
+        self._irregular: Dict[int, ProteinSequence] = {}
+    
+    def __len__(self) -> int:
+        return len(self._active)
+    
+    def build(self, sequences: Sequence[str]):
+        """
+        Reconstruye la matriz; la entrada i corresponde a sequences[i]
+        
+        Args:
+            sequences: Secuencias de la base de datos
+        """
+        self._buckets = {}
+        self._locations = array('i')
+        self._rows = array('i')
+        self._active = bytearray()
+        self._irregular = {}
+        
+        # Reservar cada bucket con su tamaño final para no copiar al crecer
+        sizes: Dict[int, int] = {}
+        for sequence in sequences:
+            bucket = len(sequence) // BUCKET_WIDTH
+            sizes[bucket] = sizes.get(bucket, 0) + 1
+        for bucket, size in sizes.items():
+            self._buckets[bucket] = _Bucket((bucket + 1) * BUCKET_WIDTH, size)
+        
+        for sequence in sequences:
+            self.add(sequence)
+    
+    def add(self, sequence: str) -> int:
+        """
+        Añade una secuencia
+        
+        Returns:
+            Posición asignada a la entrada
+        """
+        entry = len(self._active)
+        self._active.append(1)
+        
+        if not sequence.isascii():
+            self._irregular[entry] = ProteinSequence.of(sequence)
+            self._locations.append(-1)
+            self._rows.append(-1)
+            return entry
+        
+        bucket_index = len(sequence) // BUCKET_WIDTH
+        bucket = self._buckets.get(bucket_index)
+        if bucket is None:
+            bucket = self._buckets[bucket_index] = _Bucket((bucket_index + 1) * BUCKET_WIDTH, 4)
+        
+        codes = np.frombuffer(sequence.encode('ascii'), dtype=np.uint8)
+        self._locations.append(bucket_index)
+        self._rows.append(bucket.append(entry, codes))
+        return entry
+    
+    def remove(self, entry: int):
+        """Marca una entrada como eliminada"""
+        self._active[entry] = 0
+        self._irregular.pop(entry, None)
+    
+    def similarities(self, sequence, entries: Optional[np.ndarray] = None,
+                     min_similarity: float = 0.0, scoring: str = IDENTITY) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Similitud de la consulta con las entradas de su ventana de longitud
+        
+        Args:
+            sequence: Secuencia de consulta (str o ProteinSequence)
+            entries: Restringir el cálculo a estas entradas (p. ej. candidatas de KmerIndex)
+            min_similarity: Si es > 0, solo se devuelven las entradas que lo alcanzan
+                y la comparación de cada fila se abandona en cuanto no puede alcanzarlo
+            scoring: 'identity' o 'blosum62' (ver sequence_similarity)
+        
+        Returns:
+            Tupla (entradas, similitudes) ordenada por entrada; las entradas
+            fuera de la ventana de ±10% (similitud 0.0) no se incluyen
+        """
+        query = ProteinSequence.of(sequence)
+        length = len(query)
+        scorer = _Scorer(_query_codes(query), scoring)
+        if length == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        
+        found_entries: List[np.ndarray] = []
+        found_similarities: List[np.ndarray] = []
+        
+        for bucket, rows in self._bucket_rows(length, entries):
+            lengths = np.frombuffer(bucket.lengths, dtype=np.int32)[:bucket.count]
+            bucket_entries = np.frombuffer(bucket.entries, dtype=np.int32)[:bucket.count]
+            if rows is not None:
+                lengths, bucket_entries = lengths[rows], bucket_entries[rows]
+            
+            keep = self._comparable(lengths, length)
+            keep &= np.frombuffer(self._active, dtype=np.bool_)[bucket_entries]
+            if not keep.any():
+                continue
+            
+            selected = np.flatnonzero(keep) if rows is None else rows[keep]
+            bucket_entries, compared = bucket_entries[keep], np.minimum(lengths[keep], length)
+            if min_similarity > 0:
+                alive, matches = bucket.bounded_matches(scorer, selected, compared, min_similarity)
+                bucket_entries, compared = bucket_entries[alive], compared[alive]
+            else:
+                matches = bucket.matches(scorer, selected)
+            found_entries.append(bucket_entries)
+            found_similarities.append(scorer.similarity(matches, compared))
+        
+        for entry, other in self._irregular_comparable(length, entries):
+            found_entries.append(np.array([entry]))
+            found_similarities.append(np.array([sequence_similarity(query, other, scoring)]))
+        
+        if not found_entries:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        
+        all_entries = np.concatenate(found_entries).astype(np.int64)
+        similarities = np.concatenate(found_similarities)
+        if min_similarity > 0:
+            keep = similarities >= min_similarity
+            all_entries, similarities = all_entries[keep], similarities[keep]
+        
+        order = np.argsort(all_entries, kind='stable')
+        return all_entries[order], similarities[order]
+    
+    def top_k(self, sequence, k: int, min_similarity: float = 0.0,
+              entries: Optional[np.ndarray] = None, scoring: str = IDENTITY) -> List[Tuple[int, float]]:
+        """
+        Las k entradas más similares, con un heap de las k mejores hasta el momento
+        
+        Cuando el heap está lleno, la peor similitud guardada pasa a ser el
+        umbral de los buckets siguientes, así que cada fila se abandona en
+        cuanto sus diferencias le impiden entrar en el top-k.
+        
+        Args:
+            sequence: Secuencia de consulta
+            k: Número máximo de resultados
+            min_similarity: Similitud mínima de los resultados
+            entries: Restringir el cálculo a estas entradas
+            scoring: 'identity' o 'blosum62' (ver sequence_similarity)
+        
+        Returns:
+            Lista de (entrada, similitud) por similitud descendente (empates por entrada)
+        """
+        query = ProteinSequence.of(sequence)
+        length = len(query)
+        scorer = _Scorer(_query_codes(query), scoring)
+        if k <= 0 or length == 0:
+            return []
+        
+        # Min-heap de (similitud, -entrada): la raíz es la peor de las k mejores
+        heap: List[Tuple[float, int]] = []
+        
+        def threshold() -> float:
+            return max(min_similarity, heap[0][0]) if len(heap) == k else min_similarity
+        
+        def offer(found: np.ndarray, similarities: np.ndarray):
+            if len(found) > k:
+                best = np.lexsort((found, -similarities))[:k]
+                found, similarities = found[best], similarities[best]
+            for entry, similarity in zip(found.tolist(), similarities.tolist()):
+                if len(heap) < k:
+                    heapq.heappush(heap, (similarity, -entry))
+                elif (similarity, -entry) > heap[0]:
+                    heapq.heapreplace(heap, (similarity, -entry))
+        
+        # Empezar por el bucket de la propia longitud, donde suelen estar las mejores
+        for bucket, rows in sorted(self._bucket_rows(length, entries),
+                                   key=lambda pair: abs(pair[0].rows.shape[1] - BUCKET_WIDTH // 2 - length)):
+            lengths = np.frombuffer(bucket.lengths, dtype=np.int32)[:bucket.count]
+            bucket_entries = np.frombuffer(bucket.entries, dtype=np.int32)[:bucket.count]
+            if rows is not None:
+                lengths, bucket_entries = lengths[rows], bucket_entries[rows]
+            
+            keep = self._comparable(lengths, length)
+            keep &= np.frombuffer(self._active, dtype=np.bool_)[bucket_entries]
+            if not keep.any():
+                continue
+            
+            selected = np.flatnonzero(keep) if rows is None else rows[keep]
+            compared = np.minimum(lengths[keep], length)
+            alive, matches = bucket.bounded_matches(scorer, selected, compared, threshold())
+            offer(bucket_entries[keep][alive].astype(np.int64), scorer.similarity(matches, compared[alive]))
+        
+        for entry, other in self._irregular_comparable(length, entries):
+            similarity = sequence_similarity(query, other, scoring)
+            if similarity >= threshold():
+                offer(np.array([entry]), np.array([similarity]))
+        
+        return [(-entry, similarity) for similarity, entry in sorted(heap, key=lambda item: (-item[0], -item[1]))]
+    
+    def _irregular_comparable(self, length: int, entries: Optional[np.ndarray]):
+        """Entradas no ASCII (entrada, secuencia) activas y comparables con una consulta de esa longitud"""
+        allowed = None if entries is None else set(np.asarray(entries).tolist())
+        for entry, other in self._irregular.items():
+            if allowed is not None and entry not in allowed:
+                continue
+            if self._comparable(np.array([len(other)]), length)[0]:
+                yield entry, other
+    
+    def _bucket_rows(self, length: int, entries: Optional[np.ndarray]):
+        """Pares (bucket, filas o None) a comparar para una consulta de la longitud dada"""
+        if entries is None:
+            low = int(length * (1 - MAX_LENGTH_DIFFERENCE)) // BUCKET_WIDTH
+            high = int(length / (1 - MAX_LENGTH_DIFFERENCE)) // BUCKET_WIDTH + 1
+            for bucket_index in range(low, high + 1):
+                bucket = self._buckets.get(bucket_index)
+                if bucket is not None and bucket.count:
+                    yield bucket, None
+            return
+        
+        entries = np.asarray(entries, dtype=np.int64)
+        locations = np.frombuffer(self._locations, dtype=np.int32)[entries]
+        rows = np.frombuffer(self._rows, dtype=np.int32)[entries]
+        regular = locations >= 0
+        locations, rows = locations[regular], rows[regular]
+        
+        order = np.argsort(locations, kind='stable')
+        locations, rows = locations[order], rows[order]
+        boundaries = np.flatnonzero(np.diff(locations)) + 1
+        for bucket_rows, bucket_index in zip(np.split(rows, boundaries),
+                                             locations[np.concatenate(([0], boundaries))].tolist()
+                                             if len(locations) else []):
+            yield self._buckets[bucket_index], bucket_rows.astype(np.int64)
+    
+    @staticmethod
+    def _comparable(lengths: np.ndarray, length: int) -> np.ndarray:
+        """Mismo filtro de longitud que sequence_similarity, aplicado a un vector de longitudes"""
+        lengths = lengths.astype(np.int64)
+        return (lengths > 0) & (
+            np.abs(lengths - length) / np.maximum(lengths, length) <= MAX_LENGTH_DIFFERENCE
+        )
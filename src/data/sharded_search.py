@@ -0,0 +1,178 @@
+"""
+Búsqueda por similitud repartida entre procesos para bases de datos grandes
+Cada proceso abre con mmap los mismos almacenes binarios y empaqueta solo su fragmento
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple, Union
+import numpy as np
+from src.data.composition_index import CompositionIndex
+from src.data.kmer_index import KmerIndex
+from src.data.protein_sequence import ProteinSequence
+from src.data.protein_store import ProteinStore
+from src.data.sequence_matrix import IDENTITY, SequenceMatrix
+
+# Resultado de un fragmento: (posición global en los almacenes, uniprot_id, similitud)
+ShardHit = Tuple[int, str, float]
+
+
+class _Shard:
+    """
+    Entradas [start, stop) de los almacenes (en su orden de iteración) con sus índices de búsqueda
+    
+    Los almacenes se abren con mmap, así que todos los procesos comparten las
+    mismas páginas; cada uno solo copia sus secuencias a la matriz empaquetada.
+    """
+    
+    def __init__(self, store_paths: Sequence[str], shard: int, shards: int):
+        self.stores = [ProteinStore(path) for path in store_paths]
+        self._bases = np.cumsum([0] + [store.count for store in self.stores])
+        total = int(self._bases[-1])
+        self.start = shard * total // shards
+        self.stop = (shard + 1) * total // shards
+        
+        sequences = [store.sequence(entry) for store, entry in map(self._locate, range(self.start, self.stop))]
+        self.kmer_index = KmerIndex()
+        self.kmer_index.build(sequences)
+        self.sequence_matrix = SequenceMatrix()
+        self.sequence_matrix.build(sequences)
+        self.composition_index = CompositionIndex()
+        self.composition_index.build(sequences)
+    
+    def __len__(self) -> int:
+        return self.stop - self.start
+    
+    def _locate(self, index: int) -> Tuple[ProteinStore, int]:
+        """Almacén y entrada de una posición global"""
+        store = int(np.searchsorted(self._bases, index, side='right')) - 1
+        return self.stores[store], index - int(self._bases[store])
+    
+    def _hits(self, positions: Sequence[int], similarities: Sequence[float]) -> List[ShardHit]:
+        """Traduce posiciones del fragmento a (posición global, uniprot_id, similitud)"""
+        hits = []
+        for position, similarity in zip(positions, similarities):
+            store, entry = self._locate(self.start + position)
+            hits.append((self.start + position, store.uniprot_id(entry), similarity))
+        return hits
+    
+    def _candidates(self, sequence: str, min_similarity: float, scoring: str) -> Optional[np.ndarray]:
+        """Mismo prefiltro que ProteinDatabase: k-mers y después composición (solo con identidad)"""
+        if min_similarity <= 0 or scoring != IDENTITY:
+            return None
+        candidates = self.kmer_index.candidates(sequence, min_similarity)
+        return self.composition_index.filter(sequence, min_similarity, candidates)
+    
+    def similar(self, sequence: str, min_similarity: float, scoring: str) -> List[ShardHit]:
+        """Entradas del fragmento con similitud >= min_similarity, por posición"""
+        query = ProteinSequence.of(sequence)
+        candidates = self._candidates(query.text, min_similarity, scoring)
+        positions, similarities = self.sequence_matrix.similarities(query, candidates, min_similarity, scoring)
+        found = dict(zip(positions.tolist(), similarities.tolist()))
+        if min_similarity <= 0:
+            # Las entradas fuera de la ventana de longitud tienen similitud 0.0
+            found = {position: found.get(position, 0.0) for position in range(len(self))}
+        else:
+            found = {position: similarity for position, similarity in found.items() if similarity >= min_similarity}
+        return self._hits(list(found), list(found.values()))
+    
+    def top_k(self, sequence: str, k: int, min_similarity: float, scoring: str) -> List[ShardHit]:
+        """Las k entradas más similares del fragmento (empates por posición)"""
+        query = ProteinSequence.of(sequence)
+        candidates = self._candidates(query.text, min_similarity, scoring)
+        best = self.sequence_matrix.top_k(query, k, min_similarity, candidates, scoring)
+        if min_similarity <= 0 and len(best) < k:
+            included = {position for position, _ in best}
+            best.extend((position, 0.0) for position in range(len(self))
+                        if position not in included)
+            best = best[:k]
+        return self._hits([position for position, _ in best], [similarity for _, similarity in best])
+
+
+# Fragmento del proceso actual (solo en los procesos de la pool)
+_shard: Optional[_Shard] = None
+
+
+def _start_shard(store_paths: Sequence[str], shard: int, shards: int):
+    """Inicializador de cada proceso: abre los almacenes y construye los índices de su fragmento"""
+    global _shard
+    _shard = _Shard(store_paths, shard, shards)
+
+
+def _shard_size() -> int:
+    """Entradas del fragmento del proceso"""
+    return len(_shard)
+
+
+def _shard_similar(sequence: str, min_similarity: float, scoring: str) -> List[ShardHit]:
+    """Búsqueda por umbral en el fragmento del proceso"""
+    return _shard.similar(sequence, min_similarity, scoring)
+
+
+def _shard_top_k(sequence: str, k: int, min_similarity: float, scoring: str) -> List[ShardHit]:
+    """Top-k en el fragmento del proceso"""
+    return _shard.top_k(sequence, k, min_similarity, scoring)
+
+
+class ShardedSearch:
+    """
+    Pool persistente de procesos, uno por fragmento de los almacenes
+    
+    Cada proceso tiene su propio ejecutor para que las consultas puedan dirigirse
+    a todos los fragmentos a la vez. Los procesos se crean con 'spawn' (la
+    aplicación tiene hilos en marcha) y construyen sus índices al arrancar.
+    """
+    
+    def __init__(self, store_paths: Sequence[Union[str, Path]], shards: int):
+        """
+        Args:
+            store_paths: Almacenes binarios en el orden de StoreProteins
+            shards: Número de procesos (fragmentos)
+        """
+        if shards < 1:
+            raise ValueError("El número de fragmentos debe ser al menos 1")
+        context = multiprocessing.get_context('spawn')
+        paths = [str(path) for path in store_paths]
+        self._executors = [
+            ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_start_shard,
+                                initargs=(paths, shard, shards))
+            for shard in range(shards)
+        ]
+    
+    def __len__(self) -> int:
+        return len(self._executors)
+    
+    def wait_ready(self) -> int:
+        """Espera a que todos los procesos tengan sus índices y devuelve el total de entradas"""
+        return sum(future.result() for future in [executor.submit(_shard_size) for executor in self._executors])
+    
+    def _fan_out(self, function, *args) -> List[List[ShardHit]]:
+        """Envía la consulta a todos los fragmentos y recoge sus resultados en orden"""
+        futures = [executor.submit(function, *args) for executor in self._executors]
+        return [future.result() for future in futures]
+    
+    def similar(self, sequence: str, min_similarity: float, scoring: str = IDENTITY) -> List[ShardHit]:
+        """
+        Entradas con similitud >= min_similarity de todos los fragmentos
+        
+        Returns:
+            Lista de (posición global, uniprot_id, similitud) por posición
+        """
+        return [hit for hits in self._fan_out(_shard_similar, sequence, min_similarity, scoring) for hit in hits]
+    
+    def top_k(self, sequence: str, k: int, min_similarity: float, scoring: str = IDENTITY) -> List[ShardHit]:
+        """
+        Las k mejores de todos los fragmentos (cada uno devuelve sus k mejores)
+        
+        Returns:
+            Lista de hasta k (posición global, uniprot_id, similitud) por similitud
+            descendente, con empates por posición
+        """
+        hits = [hit for hits in self._fan_out(_shard_top_k, sequence, k, min_similarity, scoring) for hit in hits]
+        hits.sort(key=lambda hit: (-hit[2], hit[0]))
+        return hits[:k]
+    
+    def close(self):
+        """Detiene los procesos cuando terminen las consultas pendientes"""
+        for executor in self._executors:
+            executor.shutdown(wait=False)
@@ -0,0 +1,274 @@
+"""
+Array de sufijos sobre las secuencias concatenadas para buscar fragmentos y dominios
+Cada consulta es una búsqueda binaria de O(m log N) que devuelve todas las apariciones
+"""
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+import numpy as np
+
+SUFFIX_ARRAY_SUFFIX = '.sa.npz'
+SUFFIX_ARRAY_VERSION = 1
+
+# Byte entre secuencias: no aparece en ninguna consulta, así que ninguna coincidencia cruza dos entradas
+_SEPARATOR = b'\x00'
+# Bytes de cada sufijo que se ordenan de una vez antes de empezar a duplicar
+_PACKED_BYTES = 8
+# Lotes de al menos este tamaño forman su propio bloque; las entradas sueltas se recorren con str.find
+_SEGMENT_MIN_ENTRIES = 256
+
+
+class _Segment(NamedTuple):
+    """Bloque de entradas consecutivas con su texto concatenado y su array de sufijos"""
+    base: int             # Posición de la primera entrada del bloque
+    text: bytes           # Secuencias seguidas cada una de _SEPARATOR
+    suffixes: np.ndarray  # int64, inicio de cada sufijo de text en orden lexicográfico
+    starts: np.ndarray    # int64, inicio de cada secuencia en text
+
+
+def suffix_array_path_for(database_path: Union[str, Path]) -> Path:
+    """Ruta del array de sufijos guardado junto a la base de datos"""
+    return Path(database_path).with_suffix(SUFFIX_ARRAY_SUFFIX)
+
+
+def build_suffix_array(text: bytes) -> np.ndarray:
+    """
+    Array de sufijos por duplicación de prefijos, vectorizado con NumPy
+    
+    Primero se ordenan los sufijos por sus 8 primeros bytes empaquetados en un
+    uint64. En cada ronda, los grupos de sufijos que aún empatan se reordenan
+    por el rango de los h bytes siguientes (h se duplica en cada ronda); los
+    sufijos ya resueltos no se vuelven a tocar. El rango de cada sufijo es la
+    posición del primero de su grupo, así que ordenar por (rango, rango siguiente)
+    equivale a comparar los 2h primeros bytes.
+    """
+    size = len(text)
+    if not size:
+        return np.zeros(0, dtype=np.int64)
+    
+    data = np.zeros(size + _PACKED_BYTES, dtype=np.uint64)
+    data[:size] = np.frombuffer(text, dtype=np.uint8)
+    packed = np.zeros(size, dtype=np.uint64)
+    for shift in range(_PACKED_BYTES):
+        packed = (packed << np.uint64(8)) | data[shift:shift + size]
+    order = np.argsort(packed, kind='stable')
+    packed = packed[order]
+    
+    slots = np.arange(size, dtype=np.int64)
+    boundary = np.ones(size, dtype=bool)
+    boundary[1:] = packed[1:] != packed[:-1]
+    rank = np.empty(size, dtype=np.int64)
+    rank[order] = np.maximum.accumulate(np.where(boundary, slots, 0))
+    # Posiciones de order cuyo grupo tiene más de un sufijo
+    pending = slots[~(boundary & np.append(boundary[1:], True))]
+    
+    step = _PACKED_BYTES
+    while len(pending):
+        members = order[pending]
+        following = np.full(len(members), -1, dtype=np.int64)
+        inside = members + step < size
+        following[inside] = rank[members[inside] + step]
+        key = rank[members] * (size + 1) + following + 1
+        sub = np.argsort(key, kind='stable')
+        members, key = members[sub], key[sub]
+        order[pending] = members
+        
+        boundary = np.ones(len(members), dtype=bool)
+        boundary[1:] = key[1:] != key[:-1]
+        rank[members] = np.maximum.accumulate(np.where(boundary, pending, 0))
+        pending = pending[~(boundary & np.append(boundary[1:], True))]
+        step *= 2
+    return order
+
+
+def _build_segment(base: int, sequences: Sequence[str]) -> _Segment:
+    """Bloque con las entradas base .. base + len(sequences) - 1"""
+    lengths = np.fromiter((len(sequence) + 1 for sequence in sequences), dtype=np.int64, count=len(sequences))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int64)
+    text = b''.join(sequence.encode('ascii', errors='replace') + _SEPARATOR for sequence in sequences)
+    return _Segment(base, text, build_suffix_array(text), starts)
+
+
+class SuffixArray:
+    """
+    Índice de fragmentos: array de sufijos del texto con todas las secuencias
+    
+    Como los demás índices, cada lote añadido con extend forma un bloque nuevo
+    y las entradas sueltas se guardan aparte y se recorren directamente. Al
+    guardar, las entradas sueltas pasan a formar un bloque más.
+    """
+    
+    def __init__(self):
+        self._segments: List[_Segment] = []
+        self._extra: Dict[int, str] = {}
+        self._active = bytearray()
+    
+    def __len__(self) -> int:
+        return len(self._active)
+    
+    def build(self, sequences: Sequence[str]):
+        """
+        Reconstruye el índice; la entrada i corresponde a sequences[i]
+        
+        Args:
+            sequences: Secuencias de la base de datos
+        """
+        self._segments = [_build_segment(0, sequences)] if len(sequences) else []
+        self._extra = {}
+        self._active = bytearray(b'\x01' * len(sequences))
+    
+    def extend(self, sequences: Sequence[str]) -> int:
+        """
+        Añade un lote de entradas
+        
+        Returns:
+            Posición asignada a la primera entrada del lote
+        """
+        base = len(self._active)
+        # Las marcas de activa van primero: find() consulta la de cada entrada que encuentra
+        self._active.extend(b'\x01' * len(sequences))
+        if len(sequences) >= _SEGMENT_MIN_ENTRIES:
+            self._segments.append(_build_segment(base, sequences))
+        else:
+            for offset, sequence in enumerate(sequences):
+                self._extra[base + offset] = sequence
+        return base
+    
+    def add(self, sequence: str) -> int:
+        """
+        Añade una entrada
+        
+        Returns:
+            Posición asignada a la entrada
+        """
+        return self.extend([sequence])
+    
+    def remove(self, entry: int):
+        """Excluye una entrada de los resultados"""
+        if 0 <= entry < len(self._active):
+            self._active[entry] = 0
+    
+    @staticmethod
+    def _bounds(segment: _Segment, fragment: bytes) -> Tuple[int, int]:
+        """Rango [lo, hi) de sufijos que empiezan por el fragmento (dos búsquedas binarias)"""
+        text, suffixes, length = segment.text, segment.suffixes, len(fragment)
+        lo, hi = 0, len(suffixes)
+        while lo < hi:
+            middle = (lo + hi) // 2
+            start = int(suffixes[middle])
+            if text[start:start + length] < fragment:
+                lo = middle + 1
+            else:
+                hi = middle
+        first, hi = lo, len(suffixes)
+        while lo < hi:
+            middle = (lo + hi) // 2
+            start = int(suffixes[middle])
+            if text[start:start + length] <= fragment:
+                lo = middle + 1
+            else:
+                hi = middle
+        return first, lo
+    
+    def find(self, fragment: str, limit: Optional[int] = None) -> List[Tuple[int, int]]:
+        """
+        Todas las apariciones del fragmento en las entradas activas
+        
+        Args:
+            fragment: Secuencia a buscar (ya limpia)
+            limit: Número máximo de apariciones (None = todas)
+        
+        Returns:
+            Lista de (posición de la entrada, desplazamiento en su secuencia),
+            ordenada por entrada y desplazamiento
+        """
+        if not fragment or not fragment.isascii():
+            return []
+        data = fragment.encode('ascii')
+        
+        found: List[Tuple[int, int]] = []
+        for segment in self._segments:
+            first, last = self._bounds(segment, data)
+            if first == last:
+                continue
+            positions = segment.suffixes[first:last]
+            entries = np.searchsorted(segment.starts, positions, side='right') - 1
+            offsets = positions - segment.starts[entries]
+            entries += segment.base
+            found.extend((entry, offset) for entry, offset in zip(entries.tolist(), offsets.tolist())
+                         if self._active[entry])
+        
+        for entry, sequence in list(self._extra.items()):
+            if not self._active[entry]:
+                continue
+            offset = sequence.find(fragment)
+            while offset >= 0:
+                found.append((entry, offset))
+                offset = sequence.find(fragment, offset + 1)
+        
+        found.sort()
+        return found if limit is None else found[:limit]
+    
+    def save(self, path: Union[str, Path], fingerprint: str):
+        """
+        Guarda el índice de forma atómica (archivo temporal + os.replace)
+        
+        Args:
+            path: Ruta de destino
+            fingerprint: Identifica la versión de la base de datos indexada
+        """
+        path = Path(path)
+        if self._extra:
+            # Las entradas sueltas forman un bloque por cada tramo de posiciones consecutivas
+            entries = sorted(self._extra)
+            runs = np.split(np.array(entries), np.flatnonzero(np.diff(entries) != 1) + 1)
+            for run in runs:
+                self._segments.append(_build_segment(int(run[0]), [self._extra[entry] for entry in run.tolist()]))
+            self._segments.sort(key=lambda segment: segment.base)
+            self._extra = {}
+        
+        header = {'version': SUFFIX_ARRAY_VERSION, 'fingerprint': fingerprint,
+                  'bases': [segment.base for segment in self._segments]}
+        arrays = {}
+        for number, segment in enumerate(self._segments):
+            arrays[f'text_{number}'] = np.frombuffer(segment.text, dtype=np.uint8)
+            arrays[f'suffixes_{number}'] = segment.suffixes
+            arrays[f'starts_{number}'] = segment.starts
+        
+        fd, temp_path = tempfile.mkstemp(prefix=path.name, suffix='.tmp', dir=path.parent)
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                np.savez(handle, header=np.frombuffer(json.dumps(header).encode('utf-8'), dtype=np.uint8),
+                         active=np.frombuffer(self._active, dtype=np.uint8), **arrays)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    
+    @classmethod
+    def load(cls, path: Union[str, Path], fingerprint: str) -> Optional['SuffixArray']:
+        """
+        Carga un índice guardado con save
+        
+        Returns:
+            El índice, o None si no existe, está dañado o corresponde a otra versión
+            de la base de datos
+        """
+        try:
+            with np.load(path) as data:
+                header = json.loads(data['header'].tobytes().decode('utf-8'))
+                if header.get('version') != SUFFIX_ARRAY_VERSION or header.get('fingerprint') != fingerprint:
+                    return None
+                index = cls()
+                index._active = bytearray(data['active'].tobytes())
+                index._segments = [
+                    _Segment(base, data[f'text_{number}'].tobytes(), data[f'suffixes_{number}'],
+                             data[f'starts_{number}'])
+                    for number, base in enumerate(header['bases'])
+                ]
+        except (OSError, KeyError, ValueError):
+            return None
+        return index
@@ -1,6 +1,8 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify, send_file, make_response
+import json
+from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify, send_file, make_response, Response, stream_with_context
 from .forms import SequenceComparisonForm, UserSearchForm
 from src.business.comparison_manager import ComparisonManager
+from src.data.fasta_reader import FastaFormatError
 from config.config import get_config_dict
 
 # Crear blueprint para las rutas principales
@@ -90,6 +92,65 @@ def api_user_comparisons(username):
     comparisons_data = comparison_manager.get_user_comparisons(username)
     return jsonify(comparisons_data)
 
+@main_bp.route('/api/comparisons/fasta', methods=['POST'])
+def api_upload_fasta_comparisons():
+    """
+    API endpoint para cargar un multi-FASTA (admite Transfer-Encoding: chunked)
+    
+    El cuerpo se lee en streaming y la respuesta es NDJSON: un resultado por par
+    a medida que se procesa. Con ?save=false solo se validan los pares. Si el
+    archivo resulta mal formado a mitad de la lectura, la última línea es
+    {"error": ...} (el estado 200 ya se ha enviado).
+    """
+    import io
+    
+    save = request.args.get('save', 'true').lower() != 'false'
+    username = request.args.get('username')
+    email = request.args.get('email')
+    
+    if save and not (username and email):
+        return jsonify({'error': 'Los parámetros username y email son obligatorios para guardar'}), 400
+    
+    lines = io.TextIOWrapper(request.stream, encoding='utf-8')
+    results = comparison_manager.iter_fasta_comparisons(lines, username=username, email=email, save=save)
+    
+    def generate():
+        try:
+            for result in results:
+                yield json.dumps(result, ensure_ascii=False) + '\n'
+        except (FastaFormatError, UnicodeDecodeError) as e:
+            yield json.dumps({'error': f'Archivo FASTA no válido: {e}'}, ensure_ascii=False) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@main_bp.route('/api/saturation-scan')
+def api_saturation_scan():
+    """API endpoint para el escaneo de mutagénesis por saturación (?sequence= o ?uniprot_id=)"""
+    result = comparison_manager.scan_saturation_mutagenesis(
+        sequence=request.args.get('sequence'),
+        uniprot_id=request.args.get('uniprot_id')
+    )
+    
+    if not result['success']:
+        return jsonify({'errors': result['errors']}), 400
+    
+    return jsonify(result['scan'])
+
+@main_bp.route('/api/protein-database/statistics')
+def api_protein_database_statistics():
+    """API endpoint con las estadísticas de la base de datos de proteínas conocidas"""
+    return jsonify(comparison_manager.get_protein_database_statistics())
+
+@main_bp.route('/api/backends/health')
+def api_backends_health():
+    """API endpoint con el estado de los backends externos (circuit breaker y latencia)"""
+    return jsonify(comparison_manager.get_backend_status())
+
+@main_bp.route('/api/prediction-cache/statistics')
+def api_prediction_cache_statistics():
+    """API endpoint con los aciertos y la ocupación de la caché de predicciones"""
+    return jsonify(comparison_manager.get_prediction_cache_stats())
+
 @main_bp.route('/comparison/<int:comparison_id>/alphafold')
 def alphafold_results(comparison_id):
     """Página que muestra los resultados detallados de AlphaFold"""
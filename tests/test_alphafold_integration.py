@@ -5,8 +5,19 @@ import unittest
 import tempfile
 import os
 import json
+import gzip
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import Mock, patch, MagicMock
 from src.business.alphafold_service import AlphaFoldService, AlphaFoldIntegrationError
+from src.business.backend_health import BackendHealth, CLOSED, OPEN, HALF_OPEN
+from src.business.http_transport import DownloadError, HttpTransport
+from src.data.afdb_metadata_cache import AlphaFoldMetadataCache
+from src.data.prediction_cache import PredictionCache, prediction_key
+from src.business.mutagenesis_scan import SaturationMutagenesisScanner, SCAN_AMINO_ACIDS
+from src.business.sequence_service import SequenceValidationError
 
 class TestAlphaFoldService(unittest.TestCase):
     """Test para el servicio AlphaFold"""
@@ -25,8 +36,18 @@ class TestAlphaFoldService(unittest.TestCase):
     def tearDown(self):
         """Limpieza después de cada test"""
         import shutil
+        self.service.close()
         shutil.rmtree(self.temp_dir, ignore_errors=True)
     
+    def test_close_stops_background_threads(self):
+        """Test: close detiene el sondeo de ColabFold"""
+        thread = self.service.colabfold_health._thread
+        self.assertIsNotNone(self.service.colabfold_health.available)  # Primer sondeo ya hecho
+        
+        self.service.close()
+        self.assertFalse(thread.is_alive())
+        self.service.close()
+    
     def test_service_initialization(self):
         """Test: Inicialización correcta del servicio"""
         self.assertEqual(self.service.api_endpoint, 'https://test-api.com')
@@ -37,7 +58,7 @@ class TestAlphaFoldService(unittest.TestCase):
         # Verificar que el directorio de modelos se crea
         self.assertTrue(os.path.exists(self.temp_dir))
     
-    @patch('src.business.alphafold_service.requests.get')
+    @patch('src.business.http_transport.HttpTransport.get')
     def test_colabfold_not_available(self, mock_get):
         """Test: ColabFold no disponible"""
         mock_get.side_effect = Exception("Connection error")
@@ -45,7 +66,7 @@ class TestAlphaFoldService(unittest.TestCase):
         is_available = self.service._is_colabfold_available()
         self.assertFalse(is_available)
     
-    @patch('src.business.alphafold_service.requests.get')
+    @patch('src.business.http_transport.HttpTransport.get')
     def test_colabfold_available(self, mock_get):
         """Test: ColabFold disponible"""
         mock_response = Mock()
@@ -191,6 +212,7 @@ class TestAlphaFoldIntegration(unittest.TestCase):
     def tearDown(self):
         """Limpieza"""
         import shutil
+        self.service.close()
         shutil.rmtree(self.temp_dir, ignore_errors=True)
     
     @patch('src.business.alphafold_service.AlphaFoldService._is_colabfold_available')
@@ -222,6 +244,351 @@ class TestAlphaFoldIntegration(unittest.TestCase):
         self.assertTrue(os.path.exists(original_result['model_path']))
         self.assertTrue(os.path.exists(mutated_result['model_path']))
 
+class TestBackendHealth(unittest.TestCase):
+    """Test para el sondeo cacheado y el circuit breaker de los backends"""
+    
+    def test_is_available_does_not_probe(self):
+        """Test: is_available solo lee el último sondeo"""
+        probe = Mock(return_value=True)
+        health = BackendHealth('test', probe)
+        
+        self.assertFalse(health.is_available())  # Aún sin sondear
+        probe.assert_not_called()
+        
+        self.assertTrue(health.probe())
+        self.assertTrue(health.is_available())
+        self.assertEqual(probe.call_count, 1)
+        status = health.status()
+        self.assertEqual(status['state'], CLOSED)
+        self.assertIsNotNone(status['last_probe_latency'])
+    
+    def test_start_waits_for_first_probe_and_stop_joins(self):
+        """Test: Tras esperar al primer sondeo el backend ya está disponible y stop detiene el hilo"""
+        health = BackendHealth('test', Mock(return_value=True))
+        health.start()
+        
+        self.assertTrue(health.wait_for_probe(5))
+        self.assertTrue(health.is_available())
+        thread = health._thread
+        health.stop()
+        self.assertFalse(thread.is_alive())
+    
+    def test_circuit_opens_and_recovers(self):
+        """Test: El circuito se abre tras varios fallos y se cierra con un sondeo correcto"""
+        probe = Mock(return_value=False)
+        health = BackendHealth('test', probe, failure_threshold=2)
+        
+        health.probe()
+        self.assertEqual(health.state, CLOSED)
+        health.record_failure()
+        self.assertEqual(health.state, OPEN)
+        self.assertFalse(health.is_available())
+        
+        # Sondeo semiabierto fallido: vuelve a abrirse
+        health.probe()
+        self.assertEqual(health.state, OPEN)
+        
+        probe.side_effect = lambda: health.state == HALF_OPEN
+        self.assertTrue(health.probe())
+        self.assertEqual(health.state, CLOSED)
+        self.assertEqual(health.status()['consecutive_failures'], 0)
+    
+    def test_predict_structure_falls_back_when_colabfold_fails(self):
+        """Test: Un fallo de ColabFold en la predicción usa AlphaFold DB y cuenta para el circuito"""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            service = AlphaFoldService({'MODELS_DIRECTORY': temp_dir})
+            service.colabfold_health.stop()
+            service.colabfold_health.record_success()
+            
+            with patch.object(service, '_predict_with_colabfold', side_effect=Exception("timeout")), \
+                 patch.object(service, '_predict_with_alphafold_db', return_value={'prediction_method': 'db'}):
+                result = service.predict_structure("MKLLSLVCLASFA", "fallback")
+            
+            self.assertEqual(result['prediction_method'], 'db')
+            self.assertEqual(service.get_backend_status()['colabfold']['consecutive_failures'], 1)
+            service.close()
+        finally:
+            import shutil
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """Servidor local que falla las primeras peticiones a /flaky y anota cada conexión"""
+    
+    protocol_version = 'HTTP/1.1'
+    
+    def do_GET(self):
+        server = self.server
+        server.connections.add(self.client_address)
+        if self.path.startswith('/model'):
+            return self._send_model()
+        if self.path == '/flaky' and server.failures > 0:
+            server.failures -= 1
+            status, body = 503, b'busy'
+        else:
+            status, body = 200, b'ok'
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _send_model(self):
+        """Modelo con soporte de Range; /model.gz lo envía con Content-Encoding gzip"""
+        body = self.server.model
+        self.server.ranges.append(self.headers.get('Range'))
+        headers = {'Content-Type': 'chemical/x-mmcif'}
+        requested = self.headers.get('Range')
+        if requested:
+            start = int(requested.split('=')[1].rstrip('-'))
+            status, body = 206, body[start:]
+            headers['Content-Range'] = f"bytes {start}-{len(self.server.model) - 1}/{len(self.server.model)}"
+        elif self.path == '/model.gz':
+            status, body = 200, gzip.compress(body)
+            headers['Content-Encoding'] = 'gzip'
+        else:
+            status = 200
+        headers['Content-Length'] = str(len(body))
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        # Con delay el cuerpo llega en varios bloques para que las descargas se solapen
+        step = len(body) // 4 if self.server.delay else len(body)
+        for start in range(0, len(body), max(step, 1)):
+            self.wfile.write(body[start:start + step])
+            self.wfile.flush()
+            time.sleep(self.server.delay)
+    
+    def log_message(self, *args):
+        pass
+
+class TestHttpTransport(unittest.TestCase):
+    """Test del transporte HTTP compartido contra un servidor local"""
+    
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _StandInHandler)
+        self.server.connections = set()
+        self.server.failures = 0
+        self.server.model = b''.join(b'ATOM %6d CA ALA A 1\n' % i for i in range(5000))
+        self.server.ranges = []
+        self.server.delay = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+        self.transport = HttpTransport(pool_size=2, retries=3, backoff_factor=0)
+    
+    def tearDown(self):
+        self.transport.close()
+        self.server.shutdown()
+        self.server.server_close()
+    
+    def test_connections_are_reused(self):
+        """Test: Las peticiones al mismo host reutilizan la conexión"""
+        for _ in range(5):
+            self.assertEqual(self.transport.get(f"{self.base}/health", timeout=5).status_code, 200)
+        
+        self.assertEqual(len(self.server.connections), 1)
+        stats = self.transport.stats()[self.base]
+        self.assertEqual(stats['requests'], 5)
+        self.assertEqual(stats['errors'], 0)
+    
+    def test_get_retries_transient_errors(self):
+        """Test: Los GET se reintentan ante un 503 y los sondeos no"""
+        self.server.failures = 2
+        self.assertEqual(self.transport.get(f"{self.base}/flaky", timeout=5).status_code, 200)
+        
+        self.server.failures = 1
+        self.assertEqual(self.transport.get(f"{self.base}/flaky", timeout=5, retry=False).status_code, 503)
+    
+    def test_download_resumes_partial_file(self):
+        """Test: La descarga continúa desde el archivo parcial con Range y comprueba la suma"""
+        destination = os.path.join(tempfile.mkdtemp(), 'model.cif')
+        with open(destination + '.part', 'wb') as f:
+            f.write(self.server.model[:10000])
+        
+        download = self.transport.download(f"{self.base}/model", destination,
+                                           sha256=hashlib.sha256(self.server.model).hexdigest())
+        
+        self.assertTrue(download['resumed'])
+        self.assertEqual(self.server.ranges, ['bytes=10000-'])
+        with open(destination, 'rb') as f:
+            self.assertEqual(f.read(), self.server.model)
+        self.assertFalse(os.path.exists(destination + '.part'))
+    
+    def test_download_gzip_and_checksum_mismatch(self):
+        """Test: Content-Encoding gzip se descomprime al escribir y una suma errónea descarta el parcial"""
+        directory = tempfile.mkdtemp()
+        download = self.transport.download(f"{self.base}/model.gz", os.path.join(directory, 'model.cif'))
+        self.assertEqual(download['size'], len(self.server.model))
+        
+        with self.assertRaises(DownloadError):
+            self.transport.download(f"{self.base}/model", os.path.join(directory, 'other.cif'), sha256='0' * 64)
+        self.assertEqual(os.listdir(directory), ['model.cif'])
+    
+    def test_concurrent_downloads_of_same_url(self):
+        """Test: Dos descargas simultáneas de la misma URL no comparten el archivo parcial"""
+        directory = tempfile.mkdtemp()
+        part_path = os.path.join(directory, 'model.part')
+        self.server.delay = 0.05
+        results, errors = {}, []
+        
+        def fetch(name):
+            try:
+                results[name] = self.transport.download(f"{self.base}/model", os.path.join(directory, name),
+                                                        part_path=part_path, timeout=5)
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=fetch, args=(name,)) for name in ('first.cif', 'second.cif')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(errors, [])
+        for name in ('first.cif', 'second.cif'):
+            self.assertEqual(results[name]['size'], len(self.server.model))
+            with open(os.path.join(directory, name), 'rb') as f:
+                self.assertEqual(f.read(), self.server.model)
+        self.assertEqual(sorted(os.listdir(directory)), ['first.cif', 'second.cif'])
+
+class TestPredictionCache(unittest.TestCase):
+    """Test para la caché de predicciones por secuencia"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _model(self, name, size):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'w') as f:
+            f.write('A' * size)
+        return path
+    
+    def test_put_get_and_lru_eviction(self):
+        """Test: Aciertos, fallos y expulsión del modelo menos usado"""
+        cache = PredictionCache(os.path.join(self.temp_dir, 'cache'), max_bytes=250)
+        keys = [prediction_key(seq, 'alphafold_db', {}) for seq in ('MKV', 'MKL', 'MKI')]
+        
+        self.assertIsNone(cache.get(keys[0]))
+        cache.put(keys[0], {'model_path': self._model('a.cif', 100), 'confidence': 90.0})
+        cache.put(keys[1], {'model_path': self._model('b.cif', 100), 'confidence': 80.0})
+        
+        hit = cache.get(keys[0], link_stem=os.path.join(self.temp_dir, 'again'))
+        self.assertEqual(hit['model_path'], os.path.join(self.temp_dir, 'again.cif'))
+        self.assertTrue(hit['cache_hit'])
+        
+        # keys[1] es la entrada usada hace más tiempo
+        cache.put(keys[2], {'model_path': self._model('c.cif', 100), 'confidence': 70.0})
+        self.assertIsNotNone(cache.get(keys[0]))
+        self.assertIsNone(cache.get(keys[1]))
+        
+        # La expulsión no borra los modelos que usan las comparaciones
+        for name in ('a.cif', 'b.cif', 'c.cif', 'again.cif'):
+            self.assertTrue(os.path.exists(os.path.join(self.temp_dir, name)))
+        
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (2, 2, 2))
+        cache.close()
+        
+        # Otro proceso con el mismo directorio ve las mismas entradas
+        reopened = PredictionCache(os.path.join(self.temp_dir, 'cache'), max_bytes=250)
+        self.assertEqual(reopened.get(keys[2])['confidence'], 70.0)
+        reopened.close()
+    
+    def _fake_download(self, cif_url, job_name):
+        return self._model(f"{job_name}_download.cif", 100)
+    
+    def test_repeated_sequence_is_served_from_cache(self):
+        """Test: La misma secuencia no se vuelve a predecir ni se guarda dos veces"""
+        service = AlphaFoldService({'MODELS_DIRECTORY': self.temp_dir})
+        service.colabfold_health.stop()
+        
+        with patch.object(service, '_search_similar_protein_in_alphafold_db',
+                          return_value=('https://example.org/P68871.cif', 'exact')), \
+             patch.object(service, '_download_real_alphafold_structure', side_effect=self._fake_download):
+            first = service.predict_structure("MKLLSLVCLASFA", "original")
+        with patch.object(service, '_predict_with_alphafold_db') as mock_predict:
+            second = service.predict_structure("MKLLSLVCLASFA", "original")
+        
+        mock_predict.assert_not_called()
+        self.assertEqual(first['prediction_method'], 'alphafold_db_real')
+        self.assertTrue(second['cache_hit'])
+        self.assertNotEqual(second['model_path'], first['model_path'])
+        self.assertEqual(os.stat(second['model_path']).st_ino, os.stat(first['model_path']).st_ino)
+        self.assertEqual(second['confidence'], first['confidence'])
+        self.assertEqual(service.get_prediction_cache_stats()['entries'], 1)
+        service.close()
+    
+    def test_simulated_fallback_is_not_cached(self):
+        """Test: Si falla la descarga de AlphaFold DB, la simulación de respaldo no se guarda"""
+        service = AlphaFoldService({'MODELS_DIRECTORY': self.temp_dir})
+        service.colabfold_health.stop()
+        
+        with patch.object(service, '_search_similar_protein_in_alphafold_db',
+                          return_value=('https://example.org/P68871.cif', 'exact')):
+            with patch.object(service, '_download_real_alphafold_structure',
+                              side_effect=AlphaFoldIntegrationError("503")):
+                fallback = service.predict_structure("MKLLSLVCLASFA", "original")
+            with patch.object(service, '_download_real_alphafold_structure', side_effect=self._fake_download):
+                real = service.predict_structure("MKLLSLVCLASFA", "original")
+        
+        self.assertEqual(fallback['prediction_method'], 'improved_simulation')
+        self.assertEqual(real['prediction_method'], 'alphafold_db_real')
+        self.assertNotIn('cache_hit', real)
+        self.assertEqual(service.get_prediction_cache_stats()['entries'], 1)
+        service.close()
+
+class TestAlphaFoldMetadataCache(unittest.TestCase):
+    """Test para la caché de metadatos de AlphaFold DB"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_entries_expire_and_are_shared(self):
+        """Test: Entradas positivas y negativas con su caducidad, visibles desde otra conexión"""
+        path = os.path.join(self.temp_dir, 'afdb.sqlite')
+        cache = AlphaFoldMetadataCache(path, ttl=60, negative_ttl=0)
+        self.assertEqual(cache.lookup('P68871'), (False, None))
+        
+        cache.store('P68871', {'cifUrl': 'https://example.org/P68871.cif'})
+        cache.store('Q00000', None)
+        self.assertEqual(cache.lookup('P68871'), (True, {'cifUrl': 'https://example.org/P68871.cif'}))
+        self.assertEqual(cache.lookup('Q00000'), (False, None))  # negative_ttl=0: ya caducada
+        
+        other = AlphaFoldMetadataCache(path, ttl=60, negative_ttl=60)
+        self.assertEqual(other.lookup('P68871')[1]['cifUrl'], 'https://example.org/P68871.cif')
+        other.store('Q00000', None)
+        self.assertEqual(other.lookup('Q00000'), (True, None))
+        self.assertEqual(other.stats()['negative_entries'], 1)
+        cache.close()
+        other.close()
+    
+    def test_service_queries_api_once_per_uniprot(self):
+        """Test: Los 404 se guardan y los errores transitorios no"""
+        service = AlphaFoldService({'MODELS_DIRECTORY': self.temp_dir})
+        service.colabfold_health.stop()
+        
+        found = Mock(status_code=200)
+        found.json.return_value = [{'cifUrl': 'https://example.org/P68871.cif'}]
+        responses = {'P68871': found, 'Q00000': Mock(status_code=404), 'Q11111': Mock(status_code=503)}
+        with patch.object(service.http, 'get',
+                          side_effect=lambda url, **kwargs: responses[url.rsplit('/', 1)[1]]) as mock_get:
+            for _ in range(3):
+                self.assertEqual(service._alphafold_db_entry('P68871')['cifUrl'], 'https://example.org/P68871.cif')
+                self.assertIsNone(service._alphafold_db_entry('Q00000'))
+                with self.assertRaises(AlphaFoldIntegrationError):
+                    service._alphafold_db_entry('Q11111')
+        
+        self.assertEqual(mock_get.call_count, 2 + 3)
+        service.close()
+
 class TestAlphaFoldErrorHandling(unittest.TestCase):
     """Test para manejo de errores en AlphaFold"""
     
@@ -230,6 +597,10 @@ class TestAlphaFoldErrorHandling(unittest.TestCase):
         self.config = {'MODELS_DIRECTORY': '/tmp/test'}
         self.service = AlphaFoldService(self.config)
     
+    def tearDown(self):
+        """Limpieza"""
+        self.service.close()
+    
     def test_prediction_error_handling(self):
         """Test: Manejo de errores en predicción"""
         # El servicio en modo demo no lanza errores por secuencias vacías
@@ -246,5 +617,50 @@ class TestAlphaFoldErrorHandling(unittest.TestCase):
         comparison = self.service.compare_structures(result1, result2)
         self.assertIsInstance(comparison, dict)
 
+class TestSaturationMutagenesisScan(unittest.TestCase):
+    """Test para el escaneo de mutagénesis por saturación"""
+    
+    def setUp(self):
+        """Configuración inicial"""
+        self.service = AlphaFoldService({'MODELS_DIRECTORY': tempfile.mkdtemp()})
+        self.scanner = SaturationMutagenesisScanner(self.service.protein_db)
+        self.reference = "MVHLTPEEKSAVTALWGKVNVDEVGGEALGRLLVVYPWTQRFFESFGDLSTPDAVMGNPKVKAHGKKVLGAFSDG"
+    
+    def tearDown(self):
+        """Limpieza"""
+        self.service.close()
+    
+    def test_scan_matches_per_mutant_heuristics(self):
+        """Test: Cada celda coincide con las heurísticas calculadas mutante a mutante"""
+        scan = self.scanner.scan(sequence=self.reference)
+        
+        self.assertEqual(scan['length'], len(self.reference))
+        self.assertEqual(scan['mutant_count'], 19 * len(self.reference))
+        
+        for position in (0, 6, len(self.reference) - 1):
+            for column, aa in enumerate(SCAN_AMINO_ACIDS):
+                mutant = self.reference[:position] + aa + self.reference[position + 1:]
+                self.assertAlmostEqual(
+                    scan['tables']['stability'][position][column],
+                    self.service._calculate_stability_score(mutant), places=1
+                )
+                self.assertAlmostEqual(
+                    scan['tables']['secondary_structure_confidence'][position][column],
+                    self.service._predict_secondary_structure_confidence(mutant), places=1
+                )
+    
+    def test_scan_by_uniprot_id(self):
+        """Test: La referencia se resuelve desde la base de datos de proteínas"""
+        scan = self.scanner.scan(uniprot_id='P68871')
+        
+        self.assertEqual(scan['reference_sequence'], self.service.protein_db.get_protein_info('P68871')['sequence'])
+    
+    def test_scan_unknown_reference(self):
+        """Test: Referencias inexistentes o inválidas lanzan SequenceValidationError"""
+        with self.assertRaises(SequenceValidationError):
+            self.scanner.scan(uniprot_id='NOEXISTE')
+        with self.assertRaises(SequenceValidationError):
+            self.scanner.scan(sequence='MVH123')
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+import io
 import sys
 import os
 from unittest.mock import patch, MagicMock
@@ -315,5 +316,74 @@ class TestBusinessRulesIntegration(unittest.TestCase):
                         self.assertIn(case['error_contains'], error_text,
                                     f"Error esperado no encontrado en {case['name']}")
 
+class TestFastaComparisons(unittest.TestCase):
+    """Tests para la carga de comparaciones desde archivos multi-FASTA"""
+    
+    FASTA = (
+        ">hb1|original\n"
+        "MVHLTPEEKS\n"
+        "AVTALWGKV\n"
+        ">hb1|mutated\n"
+        "MVHLTPVEKSAVTALWGKV\n"
+        ">bad|original\nARNDCQ\n"
+        ">bad|mutated\nXRNDCQ\n"
+        ">lonely|original\nARNDCQ\n"
+    )
+    
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        self.manager = ComparisonManager()
+    
+    def test_read_fasta_multiline_records(self):
+        """Test: Los registros multilínea se unen y se emparejan por ID"""
+        from src.data.fasta_reader import read_fasta, pair_records
+        
+        # Act
+        pairs = list(pair_records(read_fasta(io.StringIO(self.FASTA))))
+        
+        # Assert
+        self.assertEqual(pairs[0], ('hb1', 'MVHLTPEEKSAVTALWGKV', 'MVHLTPVEKSAVTALWGKV'))
+        self.assertEqual(pairs[1], ('bad', 'ARNDCQ', 'XRNDCQ'))
+        self.assertEqual(pairs[2], ('lonely', 'ARNDCQ', None))
+    
+    def test_iter_fasta_comparisons_validate_only(self):
+        """Test: Validación en streaming sin guardar en la base de datos"""
+        # Act
+        results = list(self.manager.iter_fasta_comparisons(
+            io.BytesIO(self.FASTA.encode()), save=False
+        ))
+        
+        # Assert
+        self.assertEqual([r['pair_id'] for r in results], ['hb1', 'bad', 'lonely'])
+        self.assertTrue(results[0]['valid'])
+        self.assertEqual(results[0]['description'], 'E7V')
+        self.assertIn('caracteres inválidos', results[1]['errors'][0])
+        self.assertIn('no puede estar vacía', results[2]['errors'][0])
+    
+    @patch('src.business.comparison_manager.UserRepository')
+    @patch('src.business.comparison_manager.ProteinComparisonRepository')
+    def test_iter_fasta_comparisons_saves_valid_pairs(self, mock_protein_repo, mock_user_repo):
+        """Test: Solo los pares válidos se guardan, una vez por par"""
+        # Arrange
+        mock_user_repo.get_or_create_user.return_value = MagicMock(id=1)
+        mock_protein_repo.create_comparison.return_value = MagicMock(id=7)
+        
+        # Act
+        results = list(self.manager.iter_fasta_comparisons(
+            io.StringIO(self.FASTA), username='test_user', email='test@example.com'
+        ))
+        
+        # Assert
+        self.assertEqual(results[0]['comparison_id'], 7)
+        mock_user_repo.get_or_create_user.assert_called_once_with('test_user', 'test@example.com')
+        mock_protein_repo.create_comparison.assert_called_once_with(
+            user_id=1,
+            original_sequence='MVHLTPEEKSAVTALWGKV',
+            mutated_sequence='MVHLTPVEKSAVTALWGKV',
+            mutation_positions=[7],
+            mutations_description='E7V',
+            comparison_name='hb1'
+        )
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
@@ -0,0 +1,990 @@
+"""
+Tests para la base de datos de proteínas conocidas
+"""
+import unittest
+import tempfile
+import os
+import json
+import shutil
+import random
+import threading
+import time
+from unittest import mock
+from src.data.protein_database import ProteinDatabase
+from src.data.kmer_index import KmerIndex
+from src.data.composition_index import CompositionIndex, composition_vectors
+from src.data.minhash_index import MinHashIndex, minhash_path_for
+from src.data.suffix_array import SuffixArray, build_suffix_array, suffix_array_path_for
+from src.data.sequence_matrix import BLOSUM62, SequenceMatrix, sequence_similarity
+from src.data.protein_store import ProteinStore, StoreProteins, compile_fasta, import_segment_paths, store_path_for
+from src.data.protein_log import log_path_for
+from src.data.protein_importer import UNIPROT_FORMAT, detect_format, import_reference_file, read_uniprot_flatfile
+
+HEMOGLOBIN_BETA = "MVHLTPEEKSAVTALWGKVNVDEVGGEALGRLLVVYPWTQRFFESFGDLSTPDAVMGNPKVKAHGKKVLGAFSDGLAHLDNLKGTFATLSELHCDKLHVDPENFRLLGNVLVCVLAHHFGKEFTPPVQAAYQKVVAGVANALAHKYH"
+MYOGLOBIN = "MGLSDGEWQLVLNVWGKVEADIPGHGQEVLIRLFKGHPETLEKFDKFKHLKSEDEMKASEDLKKHGATVLTALGGILKKKGHHEAEIKPLAQSHATKHKIPVKYLEFISECIIQVLQSKHPGDFGADAQGAMNKALELFRKDMASNYKELGFQG"
+
+
+def write_database(directory: str, proteins: dict) -> str:
+    """Escribe un archivo JSON de base de datos de prueba"""
+    path = os.path.join(directory, "protein_database.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'proteins': proteins}, f)
+    return path
+
+
+class TestProteinDatabaseIndex(unittest.TestCase):
+    """Tests para el índice de búsqueda exacta"""
+    
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        self.temp_dir = tempfile.mkdtemp()
+        path = write_database(self.temp_dir, {
+            "P68871": {"name": "Hemoglobin subunit beta", "sequence": HEMOGLOBIN_BETA, "length": len(HEMOGLOBIN_BETA)},
+            "P02144": {"name": "Myoglobin", "sequence": MYOGLOBIN, "length": len(MYOGLOBIN)}
+        })
+        self.db = ProteinDatabase(path)
+    
+    def tearDown(self):
+        """Limpieza después de cada test"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_search_exact_match(self):
+        """Test: Búsqueda exacta por índice"""
+        uniprot_id, protein_data = self.db.search_exact_match(MYOGLOBIN)
+        
+        self.assertEqual(uniprot_id, "P02144")
+        self.assertEqual(protein_data['name'], "Myoglobin")
+        self.assertIsNone(self.db.search_exact_match(MYOGLOBIN[:-1]))
+    
+    def test_similarity_indexes_built_at_load(self):
+        """Test: Los índices de k-mers y de composición se construyen al cargar, no en la primera búsqueda"""
+        state = self.db._state
+        
+        self.assertTrue(state.search_indexes_ready)
+        self.assertEqual(len(state.kmer_index), 2)
+        self.assertEqual(len(state.composition_index), 2)
+        self.assertEqual(state.entry_ids, ["P68871", "P02144"])
+    
+    def test_add_protein_updates_index(self):
+        """Test: add_protein mantiene el índice y el mapeo secuencia -> ID"""
+        mapping = self.db.get_sequence_to_uniprot_mapping()
+        self.db.add_protein("TEST1", {"name": "Test", "sequence": "MKTAYIAKQR", "length": 10})
+        
+        self.assertEqual(self.db.search_exact_match("MKTAYIAKQR")[0], "TEST1")
+        self.assertEqual(mapping["MKTAYIAKQR"], "TEST1")
+        
+        # Reemplazar la secuencia de una entrada elimina la anterior del índice
+        self.db.add_protein("TEST1", {"name": "Test", "sequence": "MKTAYIAKQA", "length": 10})
+        
+        self.assertIsNone(self.db.search_exact_match("MKTAYIAKQR"))
+        self.assertNotIn("MKTAYIAKQR", mapping)
+        self.assertEqual(mapping["MKTAYIAKQA"], "TEST1")
+    
+    def test_mapping_matches_entries(self):
+        """Test: El mapeo mantenido coincide con las entradas cargadas"""
+        self.assertEqual(
+            self.db.get_sequence_to_uniprot_mapping(),
+            {HEMOGLOBIN_BETA: "P68871", MYOGLOBIN: "P02144"}
+        )
+
+class TestSimilaritySearch(unittest.TestCase):
+    """Tests para la búsqueda de secuencias similares con índice de k-mers"""
+    
+    def setUp(self):
+        """Base de datos con familias de variantes de unas pocas secuencias"""
+        rng = random.Random(7)
+        amino_acids = "ARNDCQEGHILKMFPSTWYV"
+        proteins = {}
+        for family in range(20):
+            base = ''.join(rng.choice(amino_acids) for _ in range(rng.randint(3, 300)))
+            for variant in range(10):
+                residues = list(base)
+                for _ in range(rng.randint(0, max(1, len(base) // 10))):
+                    residues[rng.randrange(len(residues))] = rng.choice(amino_acids)
+                proteins[f"F{family}V{variant}"] = {"name": f"Variante {variant}", "sequence": ''.join(residues)}
+        
+        self.temp_dir = tempfile.mkdtemp()
+        self.db = ProteinDatabase(write_database(self.temp_dir, proteins))
+        self.queries = [protein['sequence'] for protein in list(proteins.values())[::7]]
+    
+    def tearDown(self):
+        """Limpieza después de cada test"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def full_scan(self, sequence, min_similarity):
+        """Resultado de referencia comparando contra todas las entradas"""
+        results = []
+        for uniprot_id, protein_data in self.db.proteins.items():
+            similarity = self.db._calculate_similarity(sequence, protein_data['sequence'])
+            if similarity >= min_similarity:
+                results.append((uniprot_id, similarity))
+        return sorted(results)
+    
+    def test_index_matches_full_scan(self):
+        """Test: La poda por k-mers no pierde ningún resultado"""
+        for query in self.queries:
+            for min_similarity in (1.0, 0.95, 0.8, 0.3):
+                with self.subTest(length=len(query), min_similarity=min_similarity):
+                    found = self.db.search_similar_sequences(query, min_similarity)
+                    self.assertEqual(
+                        sorted((uniprot_id, similarity) for uniprot_id, _, similarity in found),
+                        self.full_scan(query, min_similarity)
+                    )
+    
+    def test_top_k_matches_sorted_results(self):
+        """Test: search_top_k con abandono temprano coincide con los k primeros del resultado completo"""
+        for query in self.queries:
+            mutated = query[:len(query) // 2] + "W" + query[len(query) // 2 + 1:]
+            for min_similarity in (0.95, 0.8, 0.3):
+                for k in (1, 3):
+                    with self.subTest(length=len(query), min_similarity=min_similarity, k=k):
+                        expected = [(uniprot_id, similarity) for uniprot_id, _, similarity in
+                                    self.db.search_similar_sequences(mutated, min_similarity)[:k]]
+                        found = [(uniprot_id, similarity) for uniprot_id, _, similarity in
+                                 self.db.search_top_k(mutated, k, min_similarity)]
+                        self.assertEqual(found, expected)
+    
+    def test_blosum62_search_matches_full_scan(self):
+        """Test: La búsqueda con BLOSUM62 coincide con puntuar todas las entradas par a par"""
+        for query in self.queries[:10]:
+            with self.subTest(length=len(query)):
+                found = self.db.search_similar_sequences(query, 0.8, scoring=BLOSUM62)
+                expected = sorted(
+                    (uniprot_id, similarity) for uniprot_id, protein_data in self.db.proteins.items()
+                    for similarity in [self.db._calculate_similarity(query, protein_data['sequence'], BLOSUM62)]
+                    if similarity >= 0.8
+                )
+                self.assertEqual(sorted((uniprot_id, similarity) for uniprot_id, _, similarity in found), expected)
+                top = self.db.search_top_k(query, 3, 0.8, scoring=BLOSUM62)
+                self.assertEqual([item[0] for item in top], [item[0] for item in found[:3]])
+    
+    def test_index_prunes_candidates(self):
+        """Test: Solo se verifican las entradas que comparten suficientes k-mers"""
+        query = self.db.proteins["F3V0"]['sequence']
+        candidates = self.db._kmer_index.candidates(query, 0.95)
+        
+        self.assertLess(len(candidates), len(self.db.proteins) // 5)
+    
+    def test_composition_filter_keeps_reachable_entries(self):
+        """Test: La cota de composición nunca descarta una entrada que alcanza la similitud"""
+        sequences = [protein['sequence'] for protein in self.db.proteins.values()]
+        index = CompositionIndex()
+        index.build(sequences)
+        
+        for query in self.queries:
+            for min_similarity in (0.95, 0.8, 0.3):
+                with self.subTest(length=len(query), min_similarity=min_similarity):
+                    kept = set(index.filter(query, min_similarity).tolist())
+                    reachable = {entry for entry, sequence in enumerate(sequences)
+                                 if sequence_similarity(query, sequence) >= min_similarity}
+                    self.assertLessEqual(reachable, kept)
+        
+        self.assertEqual(composition_vectors(["AAW", "X"]).tolist()[1], [0] * 20)
+    
+    def test_search_statistics(self):
+        """Test: Los contadores de poda reflejan las entradas descartadas"""
+        self.db.search_similar_sequences(self.queries[0], 0.9)
+        stats = self.db.get_search_statistics()
+        
+        self.assertEqual(stats['searches'], 1)
+        self.assertEqual(stats['entries'], len(self.db.proteins))
+        self.assertEqual(stats['kmer_pruned'] + stats['composition_pruned'] + stats['compared'], stats['entries'])
+        self.assertGreater(stats['kmer_pruned'] + stats['composition_pruned'], 0)
+    
+    def test_added_proteins_are_searchable(self):
+        """Test: Las proteínas añadidas en memoria aparecen en la búsqueda"""
+        sequence = self.db.proteins["F5V0"]['sequence'] + "W"
+        self.db.add_protein("NEW1", {"name": "Nueva", "sequence": sequence})
+        
+        found = [uniprot_id for uniprot_id, _, _ in self.db.search_similar_sequences(sequence, 0.99)]
+        self.assertIn("NEW1", found)
+    
+    def test_replaced_protein_leaves_composition_index(self):
+        """Test: Al reemplazar una entrada su fila de composición deja de proponerse"""
+        old_sequence = self.db.proteins["F5V0"]['sequence']
+        self.db.search_similar_sequences(old_sequence, 0.9)
+        state = self.db._state
+        old_position = state.entry_positions["F5V0"]
+        
+        self.db.add_protein("F5V0", {"name": "Reemplazada", "sequence": "W" * len(old_sequence)})
+        
+        self.assertNotIn(old_position, state.composition_index.filter(old_sequence, 0.9).tolist())
+        self.assertIn(state.entry_positions["F5V0"], state.composition_index.filter("W" * len(old_sequence), 0.9).tolist())
+    
+    def test_search_while_protein_is_added(self):
+        """Test: Una búsqueda entre dos pasos de add_protein nunca ve posiciones sin ID ni datos"""
+        sequence = self.db.proteins["F5V0"]['sequence'] + "W"
+        self.db.search_similar_sequences(sequence, 0.9)
+        self.db.search_homologs(sequence)
+        self.db.search_fragment(sequence[:20])
+        state = self.db._state
+        
+        def search_during(original):
+            def add(added):
+                position = original(added)
+                self.db.search_similar_sequences(sequence, 0.9)
+                self.db.search_similar_sequences(sequence, 0.0)
+                self.db.search_top_k(sequence, 3, 0.9)
+                self.db.search_homologs(sequence)
+                self.db.search_fragment(sequence[:20])
+                return position
+            return add
+        
+        indexes = (state.sequence_matrix, state.composition_index, state.kmer_index,
+                   state.homolog_index, state.fragment_index)
+        patches = [mock.patch.object(index, 'add', side_effect=search_during(index.add)) for index in indexes]
+        for patch in patches:
+            patch.start()
+        try:
+            self.db.add_protein("NEW1", {"name": "Nueva", "sequence": sequence})
+            self.db.add_protein("F5V1", {"name": "Reemplazada", "sequence": sequence})
+        finally:
+            for patch in patches:
+                patch.stop()
+        
+        found = [uniprot_id for uniprot_id, _, _ in self.db.search_similar_sequences(sequence, 0.99)]
+        self.assertEqual(sorted(found), ["F5V0", "F5V1", "NEW1"])
+    
+    def test_invalid_kmer_size(self):
+        """Test: Longitudes de k-mer fuera de rango"""
+        with self.assertRaises(ValueError):
+            KmerIndex(k=7)
+
+class TestSequenceMatrix(unittest.TestCase):
+    """Tests para la matriz empaquetada de secuencias"""
+    
+    def setUp(self):
+        """Variantes de hemoglobina de distintas longitudes y una secuencia no relacionada"""
+        self.sequences = [
+            HEMOGLOBIN_BETA,
+            HEMOGLOBIN_BETA[:140],
+            HEMOGLOBIN_BETA.replace("E", "V", 1),
+            HEMOGLOBIN_BETA[:100],
+            MYOGLOBIN,
+            ""
+        ]
+        self.matrix = SequenceMatrix()
+        self.matrix.build(self.sequences)
+    
+    def test_similarities_match_pairwise(self):
+        """Test: La comparación por buckets coincide con la similitud par a par"""
+        entries, similarities = self.matrix.similarities(HEMOGLOBIN_BETA)
+        found = dict(zip(entries.tolist(), similarities.tolist()))
+        
+        for entry, sequence in enumerate(self.sequences):
+            self.assertEqual(found.get(entry, 0.0), sequence_similarity(HEMOGLOBIN_BETA, sequence))
+    
+    def test_top_k(self):
+        """Test: top_k devuelve las mejores entradas ordenadas"""
+        self.matrix.add(HEMOGLOBIN_BETA)
+        
+        best = self.matrix.top_k(HEMOGLOBIN_BETA, 3, min_similarity=0.5)
+        
+        self.assertEqual([entry for entry, _ in best], [0, 1, 6])
+        self.assertEqual(best[0][1], 1.0)
+    
+    def test_bounded_similarities(self):
+        """Test: Abandonar las filas sin margen de diferencias no cambia las que alcanzan el umbral"""
+        entries, similarities = self.matrix.similarities(HEMOGLOBIN_BETA)
+        for min_similarity in (0.5, 0.99, 1.0):
+            with self.subTest(min_similarity=min_similarity):
+                bounded_entries, bounded = self.matrix.similarities(HEMOGLOBIN_BETA, min_similarity=min_similarity)
+                keep = similarities >= min_similarity
+                self.assertEqual(bounded_entries.tolist(), entries[keep].tolist())
+                self.assertEqual(bounded.tolist(), similarities[keep].tolist())
+    
+    def test_blosum62_matches_pairwise(self):
+        """Test: La puntuación BLOSUM62 por buckets coincide con la par a par, con y sin umbral"""
+        query = HEMOGLOBIN_BETA.replace("L", "I", 3)
+        entries, similarities = self.matrix.similarities(query, scoring=BLOSUM62)
+        for entry, similarity in zip(entries.tolist(), similarities.tolist()):
+            self.assertAlmostEqual(similarity, sequence_similarity(query, self.sequences[entry], BLOSUM62))
+        
+        for min_similarity in (0.5, 0.95):
+            with self.subTest(min_similarity=min_similarity):
+                bounded_entries, bounded = self.matrix.similarities(query, min_similarity=min_similarity,
+                                                                    scoring=BLOSUM62)
+                keep = similarities >= min_similarity
+                self.assertEqual(bounded_entries.tolist(), entries[keep].tolist())
+                self.assertEqual(bounded.tolist(), similarities[keep].tolist())
+                best = self.matrix.top_k(query, 2, min_similarity, scoring=BLOSUM62)
+                order = sorted(zip(entries[keep].tolist(), similarities[keep].tolist()), key=lambda x: (-x[1], x[0]))
+                self.assertEqual(best, order[:2])
+    
+    def test_blosum62_rewards_conservative_substitutions(self):
+        """Test: Una sustitución conservadora puntúa más que una radical y la identidad no las distingue"""
+        conservative = "I" + HEMOGLOBIN_BETA[1:]   # M -> I
+        radical = "P" + HEMOGLOBIN_BETA[1:]        # M -> P
+        self.assertEqual(sequence_similarity(HEMOGLOBIN_BETA, HEMOGLOBIN_BETA, BLOSUM62), 1.0)
+        self.assertEqual(sequence_similarity(HEMOGLOBIN_BETA, conservative),
+                         sequence_similarity(HEMOGLOBIN_BETA, radical))
+        self.assertGreater(sequence_similarity(HEMOGLOBIN_BETA, conservative, BLOSUM62),
+                           sequence_similarity(HEMOGLOBIN_BETA, radical, BLOSUM62))
+        with self.assertRaises(ValueError):
+            sequence_similarity(HEMOGLOBIN_BETA, radical, 'pam250')
+    
+    def test_removed_entries_are_skipped(self):
+        """Test: Las entradas eliminadas no se devuelven"""
+        self.matrix.remove(0)
+        
+        entries, _ = self.matrix.similarities(HEMOGLOBIN_BETA)
+        self.assertNotIn(0, entries.tolist())
+
+class TestProteinStore(unittest.TestCase):
+    """Tests para el almacén binario con mmap"""
+    
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.proteins = {
+            "P68871": {"name": "Hemoglobin subunit beta", "organism": "Homo sapiens", "sequence": HEMOGLOBIN_BETA},
+            "P02144": {"name": "Myoglobin", "organism": "Homo sapiens", "sequence": MYOGLOBIN},
+            "A00001": {"name": "Copia", "sequence": MYOGLOBIN}
+        }
+        self.json_path = write_database(self.temp_dir, self.proteins)
+    
+    def tearDown(self):
+        """Limpieza después de cada test"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_database_uses_compiled_store(self):
+        """Test: La base de datos compila el JSON y lee desde el almacén"""
+        db = ProteinDatabase(self.json_path)
+        
+        self.assertTrue(store_path_for(self.json_path).exists())
+        self.assertIsInstance(db.proteins, StoreProteins)
+        self.assertEqual(dict(db.proteins.items()), self.proteins)
+        self.assertEqual(db.search_exact_match(MYOGLOBIN)[0], "P02144")
+        self.assertEqual(db.get_protein_info("A00001")['name'], "Copia")
+        self.assertIsNone(db.get_protein_info("NOEXISTE"))
+    
+    def test_store_rebuilds_when_json_is_newer(self):
+        """Test: El almacén se regenera si el JSON es más reciente"""
+        ProteinDatabase(self.json_path)
+        store_mtime = os.path.getmtime(store_path_for(self.json_path))
+        
+        self.proteins["Q99999"] = {"name": "Nueva", "sequence": "MKTAYIAKQR"}
+        write_database(self.temp_dir, self.proteins)
+        os.utime(self.json_path, (time.time(), store_mtime + 10))
+        
+        db = ProteinDatabase(self.json_path)
+        self.assertEqual(len(db.proteins), 4)
+        self.assertEqual(db.search_exact_match("MKTAYIAKQR")[0], "Q99999")
+    
+    def test_overlay_entries(self):
+        """Test: add_protein reemplaza o añade entradas sobre el almacén"""
+        db = ProteinDatabase(self.json_path)
+        db.add_protein("P02144", {"name": "Myoglobin", "sequence": MYOGLOBIN[:-1]})
+        db.add_protein("NEW1", {"name": "Nueva", "sequence": "MKTAYIAKQR"})
+        
+        self.assertEqual(len(db.proteins), 4)
+        self.assertEqual(list(db.proteins), ["P68871", "P02144", "A00001", "NEW1"])
+        self.assertEqual(db.search_exact_match(MYOGLOBIN)[0], "A00001")
+        self.assertEqual(db.search_exact_match(MYOGLOBIN[:-1])[0], "P02144")
+        self.assertEqual(db.get_sequence_to_uniprot_mapping()["MKTAYIAKQR"], "NEW1")
+    
+    def test_compile_fasta(self):
+        """Test: Compilación de un volcado FASTA de UniProt"""
+        fasta_path = os.path.join(self.temp_dir, "uniprot.fasta")
+        with open(fasta_path, 'w', encoding='utf-8') as f:
+            f.write(">sp|P68871|HBB_HUMAN Hemoglobin subunit beta OS=Homo sapiens OX=9606 GN=HBB PE=1 SV=2\n")
+            f.write(HEMOGLOBIN_BETA[:60] + "\n" + HEMOGLOBIN_BETA[60:] + "\n")
+        
+        store = ProteinStore(compile_fasta(fasta_path))
+        
+        self.assertEqual(len(store), 1)
+        self.assertEqual(store.find("P68871"), 0)
+        self.assertEqual(store.protein(0), {
+            "name": "Hemoglobin subunit beta", "organism": "Homo sapiens", "gene": "HBB",
+            "sequence": HEMOGLOBIN_BETA, "length": len(HEMOGLOBIN_BETA)
+        })
+        store.close()
+    
+    def test_id_in_two_stores_is_counted_once(self):
+        """Test: Un ID que está en el JSON y en las importaciones se itera y se cuenta una vez"""
+        db = ProteinDatabase(self.json_path)
+        db.import_proteins([("Q99999", {"name": "Importada", "organism": "Mus musculus",
+                                        "sequence": "MKTAYIAKQR"})])
+        self.proteins["Q99999"] = {"name": "Editada", "sequence": "MKTAYIAKQRQISFVK"}
+        write_database(self.temp_dir, self.proteins)
+        os.utime(self.json_path, (time.time(), time.time() + 10))
+        
+        db = ProteinDatabase(self.json_path)
+        
+        self.assertEqual(list(db.proteins), ["P68871", "P02144", "A00001", "Q99999"])
+        self.assertEqual(len(db.proteins), 4)
+        self.assertEqual(db.proteins["Q99999"]['name'], "Importada")
+        self.assertEqual(dict(db.proteins.items())["Q99999"]['name'], "Importada")
+        self.assertEqual(db.get_statistics()['total_proteins'], 4)
+        self.assertEqual(db.get_statistics()['organism_counts'], {"Homo sapiens": 2, "Unknown": 1, "Mus musculus": 1})
+        self.assertIsNone(db.search_exact_match("MKTAYIAKQRQISFVK"))
+        self.assertEqual(db.search_exact_match("MKTAYIAKQR")[0], "Q99999")
+    
+    def test_non_ascii_sequence_loads_json(self):
+        """Test: Una secuencia no ASCII hace cargar el JSON completo en lugar del respaldo mínimo"""
+        self.proteins["Q11111"] = {"name": "Con acento", "sequence": "MKTÁYIAKQR"}
+        write_database(self.temp_dir, self.proteins)
+        
+        db = ProteinDatabase(self.json_path)
+        
+        self.assertNotIsInstance(db.proteins, StoreProteins)
+        self.assertEqual(len(db.proteins), 4)
+        self.assertEqual(db.get_protein_info("Q11111")['name'], "Con acento")
+        self.assertEqual(db.search_exact_match(MYOGLOBIN)[0], "P02144")
+        self.assertFalse(store_path_for(self.json_path).exists())
+    
+    def test_close_releases_mapping(self):
+        """Test: close cierra el mmap aunque se hayan hecho búsquedas"""
+        db = ProteinDatabase(self.json_path)
+        db.search_exact_match(MYOGLOBIN)
+        store = ProteinStore(store_path_for(self.json_path))
+        self.assertEqual(store.find("P02144"), 1)
+        self.assertEqual(store.protein(1)['sequence'], MYOGLOBIN)
+        
+        store.close()
+        self.assertTrue(store._mmap.closed)
+
+
+class TestBulkImport(unittest.TestCase):
+    """Tests para la importación masiva de conjuntos de referencia"""
+    
+    FLATFILE = """ID   HBB_HUMAN               Reviewed;         147 AA.
+AC   P68871; A4GX73; B2ZUE0;
+DE   RecName: Full=Hemoglobin subunit beta {ECO:0000303|PubMed:123};
+DE   AltName: Full=Beta-globin;
+GN   Name=HBB {ECO:0000312|HGNC:4827};
+OS   Homo sapiens
+OS   (Human).
+SQ   SEQUENCE   147 AA;  15998 MW;  A31F6D621C6556A1 CRC64;
+     MVHLTPEEKS AVTALWGKVN VDEVGGEALG RLLVVYPWTQ RFFESFGDLS TPDAVMGNPK
+     VKAHGKKVLG AFSDGLAHLD NLKGTFATLS ELHCDKLHVD PENFRLLGNV LVCVLAHHFG
+     KEFTPPVQAA YQKVVAGVAN ALAHKYH
+//
+ID   TEST_HUMAN              Unreviewed;        12 AA.
+AC   Q00001;
+DE   SubName: Full=Test protein;
+OS   Homo sapiens (Human).
+SQ   SEQUENCE   12 AA;  1400 MW;  0000000000000000 CRC64;
+     MKTAYIAKQR QL
+//
+"""
+    
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.json_path = write_database(self.temp_dir, {
+            "P02144": {"name": "Myoglobin", "sequence": MYOGLOBIN, "length": len(MYOGLOBIN)}
+        })
+        self.flatfile_path = os.path.join(self.temp_dir, "uniprot_sprot.dat")
+        with open(self.flatfile_path, 'w', encoding='utf-8') as f:
+            f.write(self.FLATFILE)
+    
+    def tearDown(self):
+        """Limpieza después de cada test"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_read_uniprot_flatfile(self):
+        """Test: Lectura de entradas en formato UniProt flat file"""
+        with open(self.flatfile_path, encoding='utf-8') as f:
+            entries = list(read_uniprot_flatfile(f))
+        
+        self.assertEqual(detect_format(self.flatfile_path), UNIPROT_FORMAT)
+        self.assertEqual([uniprot_id for uniprot_id, _ in entries], ["P68871", "Q00001"])
+        self.assertEqual(entries[0][1], {
+            "name": "Hemoglobin subunit beta", "organism": "Homo sapiens (Human)", "gene": "HBB",
+            "sequence": HEMOGLOBIN_BETA, "length": len(HEMOGLOBIN_BETA)
+        })
+    
+    def test_import_is_persistent_and_deduplicated(self):
+        """Test: Las importaciones se deduplican y sobreviven a recargas y recompilaciones del JSON"""
+        db = ProteinDatabase(self.json_path)
+        report = import_reference_file(db, self.flatfile_path)
+        self.assertEqual((report['read'], report['imported'], report['duplicate_sequences']), (2, 2, 0))
+        self.assertGreater(report['peak_rss_mb'], 0)
+        
+        # Reimportar el mismo archivo no añade nada
+        report = import_reference_file(db, self.flatfile_path)
+        self.assertEqual((report['imported'], report['duplicate_sequences'], report['total_proteins']), (0, 2, 3))
+        
+        write_database(self.temp_dir, {"P02144": {"name": "Myoglobin", "sequence": MYOGLOBIN}})
+        os.utime(self.json_path, (time.time(), time.time() + 10))
+        db = ProteinDatabase(self.json_path)
+        self.assertEqual(list(db.proteins), ["P02144", "P68871", "Q00001"])
+        self.assertEqual(db.search_exact_match(HEMOGLOBIN_BETA)[0], "P68871")
+    
+    def test_import_updates_built_indexes(self):
+        """Test: Los índices de similitud ya construidos incluyen las entradas importadas"""
+        db = ProteinDatabase(self.json_path)
+        db.search_similar_sequences(MYOGLOBIN, min_similarity=0.9)
+        report = import_reference_file(db, self.flatfile_path, batch_size=1)
+        self.assertEqual(report['batches'], 2)
+        
+        query = HEMOGLOBIN_BETA[:50] + "W" + HEMOGLOBIN_BETA[51:]
+        fresh = ProteinDatabase(self.json_path)
+        for min_similarity in (0.0, 0.9):
+            with self.subTest(min_similarity=min_similarity):
+                found = [(uniprot_id, similarity) for uniprot_id, _, similarity in
+                         db.search_similar_sequences(query, min_similarity=min_similarity)]
+                expected = [(uniprot_id, similarity) for uniprot_id, _, similarity in
+                            fresh.search_similar_sequences(query, min_similarity=min_similarity)]
+                self.assertEqual(found, expected)
+        self.assertEqual(found[0][0], "P68871")
+    
+    def test_readers_see_only_finished_batches(self):
+        """Test: Durante la importación las búsquedas ven los lotes terminados y nunca uno a medias"""
+        db = ProteinDatabase(self.json_path)
+        db.search_similar_sequences(MYOGLOBIN, min_similarity=0.9)
+        seen = []
+        
+        def search():
+            seen.append([uniprot_id for uniprot_id, _, _ in db.search_similar_sequences(HEMOGLOBIN_BETA, 0.5)])
+            seen[-1].extend(uniprot_id for uniprot_id, _, _ in db.search_fragment("MKTAYIAKQR"))
+        
+        def records():
+            yield "P68871", {"name": "Hemoglobin subunit beta", "sequence": HEMOGLOBIN_BETA}
+            # El primer lote ya está publicado; una búsqueda concurrente lo encuentra completo
+            reader = threading.Thread(target=search)
+            reader.start()
+            reader.join()
+            yield "Q00001", {"name": "Otra", "sequence": "MKTAYIAKQRQISFVKSHFSRQ"}
+        
+        # Una búsqueda entre la vista y las filas del segundo lote no recibe posiciones sin datos
+        state = db._state
+        extend = state.kmer_index.extend
+        
+        def extend_after_search(sequences):
+            search()
+            return extend(sequences)
+        
+        with mock.patch.object(state.kmer_index, 'extend', side_effect=extend_after_search):
+            report = db.import_proteins(records(), batch_size=1)
+        
+        self.assertEqual(report['imported'], 2)
+        self.assertEqual(seen, [[], ["P68871"], ["P68871"]])
+        self.assertEqual(db.search_similar_sequences(HEMOGLOBIN_BETA, 0.9)[0][0], "P68871")
+        self.assertEqual(len(db.proteins), 3)
+    
+    def test_batches_are_appended_without_rebuilding(self):
+        """Test: Cada lote es un segmento nuevo; ni se reescriben los anteriores ni se reconstruyen los índices"""
+        db = ProteinDatabase(self.json_path)
+        db.search_similar_sequences(MYOGLOBIN, min_similarity=0.9)
+        db.import_proteins([("P68871", {"name": "Hemoglobin subunit beta", "sequence": HEMOGLOBIN_BETA})])
+        first = import_segment_paths(self.json_path)
+        self.assertEqual(len(first), 1)
+        first_version = os.stat(first[0]).st_mtime_ns
+        
+        builds = [mock.patch.object(index, 'build') for index in (KmerIndex, CompositionIndex, SequenceMatrix,
+                                                                  MinHashIndex, SuffixArray)]
+        mocks = [patch.start() for patch in builds]
+        try:
+            report = db.import_proteins([
+                ("Q00001", {"name": "Otra", "sequence": "MKTAYIAKQRQISFVKSHFSRQ"}),
+                ("Q00002", {"name": "Repetida", "sequence": HEMOGLOBIN_BETA}),
+                ("P68871", {"name": "ID repetido", "sequence": "MKTAYIAKQRQL"}),
+                ("Q00003", {"name": "Tercera", "sequence": "GGGGSGGGGSGGGGS"})
+            ], batch_size=1)
+        finally:
+            for patch in builds:
+                patch.stop()
+        for build in mocks:
+            build.assert_not_called()
+        
+        self.assertEqual((report['imported'], report['duplicate_sequences'], report['duplicate_ids']), (2, 1, 1))
+        self.assertEqual(len(import_segment_paths(self.json_path)), 3)
+        self.assertEqual(os.stat(first[0]).st_mtime_ns, first_version)
+        self.assertEqual(db.search_fragment("GGGGSGGGGS")[0][0], "Q00003")
+        
+        # Una carga nueva lee todos los segmentos y reutiliza los índices guardados
+        with mock.patch.object(SuffixArray, 'build') as build:
+            fresh = ProteinDatabase(self.json_path)
+        build.assert_not_called()
+        self.assertEqual(list(fresh.proteins), ["P02144", "P68871", "Q00001", "Q00003"])
+        self.assertEqual(fresh.get_statistics()['total_proteins'], 4)
+
+
+class TestHotReload(unittest.TestCase):
+    """Tests para la recarga en caliente de la base de datos"""
+    
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.proteins = {"P02144": {"name": "Myoglobin", "sequence": MYOGLOBIN}}
+        self.json_path = write_database(self.temp_dir, self.proteins)
+        self.db = ProteinDatabase(self.json_path)
+    
+    def tearDown(self):
+        """Limpieza después de cada test"""
+        self.db.stop_watching()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def touch_database(self, proteins):
+        """Reescribe el JSON con un mtime posterior al del almacén compilado"""
+        write_database(self.temp_dir, proteins)
+        later = os.path.getmtime(store_path_for(self.json_path)) + 10
+        os.utime(self.json_path, (later, later))
+    
+    def test_reload_swaps_snapshot(self):
+        """Test: Un cambio en el archivo se carga con índices listos y conserva las proteínas en memoria"""
+        self.assertFalse(self.db.check_for_updates())
+        self.db.search_similar_sequences(MYOGLOBIN, 0.9)
+        self.db.add_protein("NEW1", {"name": "Nueva", "sequence": "MKTAYIAKQR"})
+        previous = self.db._state
+        
+        self.touch_database(dict(self.proteins, P68871={"name": "Hemoglobin", "sequence": HEMOGLOBIN_BETA}))
+        self.assertTrue(self.db.check_for_updates())
+        
+        self.assertIsNot(self.db._state, previous)
+        self.assertTrue(self.db._state.search_indexes_ready)
+        self.assertEqual(self.db.search_exact_match(HEMOGLOBIN_BETA)[0], "P68871")
+        self.assertEqual(self.db.search_exact_match("MKTAYIAKQR")[0], "NEW1")
+        # El snapshot anterior sigue siendo consistente para las búsquedas en curso
+        self.assertNotIn("P68871", previous.proteins)
+    
+    def test_failed_reload_keeps_current_data(self):
+        """Test: Si el archivo nuevo no se puede cargar se conservan los datos actuales"""
+        with open(self.json_path, 'w', encoding='utf-8') as f:
+            f.write('{"proteins": ')
+        later = os.path.getmtime(store_path_for(self.json_path)) + 10
+        os.utime(self.json_path, (later, later))
+        
+        self.assertFalse(self.db.check_for_updates())
+        self.assertEqual(self.db.search_exact_match(MYOGLOBIN)[0], "P02144")
+    
+    def test_watcher_reloads_in_background(self):
+        """Test: El hilo de vigilancia detecta el cambio y recarga"""
+        reloaded = threading.Event()
+        original_reload = self.db.reload
+        self.db.reload = lambda: original_reload() and (reloaded.set() or True)
+        
+        self.db.start_watching(interval=0.01)
+        self.touch_database(dict(self.proteins, Q99999={"name": "Nueva", "sequence": "MKTAYIAKQR"}))
+        
+        self.assertTrue(reloaded.wait(5))
+        self.assertEqual(len(self.db.proteins), 2)
+
+
+class TestHomologSearch(unittest.TestCase):
+    """Tests para la búsqueda aproximada de homólogos con MinHash/LSH"""
+    
+    def setUp(self):
+        """Base de datos con familias de homólogos a ~75 % de identidad"""
+        self.rng = random.Random(11)
+        self.families = {}
+        proteins = {}
+        for family in range(30):
+            base = self.random_sequence(self.rng.randint(150, 400))
+            self.families[family] = base
+            for variant in range(3):
+                proteins[f"H{family}V{variant}"] = {"name": f"Homólogo {variant}", "sequence": self.mutate(base, 0.25)}
+        
+        self.temp_dir = tempfile.mkdtemp()
+        self.json_path = write_database(self.temp_dir, proteins)
+        self.db = ProteinDatabase(self.json_path)
+    
+    def tearDown(self):
+        """Limpieza después de cada test"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def random_sequence(self, length):
+        """Secuencia aleatoria de aminoácidos estándar"""
+        return ''.join(self.rng.choice("ARNDCQEGHILKMFPSTWYV") for _ in range(length))
+    
+    def mutate(self, sequence, fraction):
+        """Sustituye aproximadamente esa fracción de posiciones"""
+        residues = list(sequence)
+        for position in self.rng.sample(range(len(residues)), int(len(residues) * fraction)):
+            residues[position] = self.rng.choice("ARNDCQEGHILKMFPSTWYV")
+        return ''.join(residues)
+    
+    def test_finds_homologs_of_the_same_family(self):
+        """Test: Los mejores resultados son de la familia de la consulta y la identidad estimada es razonable"""
+        for family, base in list(self.families.items())[:10]:
+            with self.subTest(family=family):
+                found = self.db.search_homologs(self.mutate(base, 0.2), k=3, min_identity=0.5)
+                self.assertTrue(found)
+                self.assertTrue(found[0][0].startswith(f"H{family}V"))
+                self.assertGreater(found[0][2], 0.5)
+                self.assertLess(found[0][2], 0.95)
+        
+        self.assertEqual(self.db.search_homologs(self.random_sequence(300), min_identity=0.5), [])
+    
+    def test_rerank_uses_exact_similarity(self):
+        """Test: Con rerank la lista se ordena por la similitud exacta"""
+        query = self.mutate(self.families[3], 0.2)
+        found = self.db.search_homologs(query, k=3, min_identity=0.3, rerank=True)
+        self.assertTrue(found)
+        for uniprot_id, protein_data, identity in found:
+            self.assertEqual(identity, sequence_similarity(query, protein_data['sequence']))
+        self.assertEqual([identity for _, _, identity in found], sorted((identity for _, _, identity in found),
+                                                                       reverse=True))
+    
+    def test_index_is_saved_with_the_database(self):
+        """Test: El índice se guarda junto a la base de datos y la siguiente carga lo reutiliza"""
+        self.assertTrue(minhash_path_for(self.json_path).exists())
+        expected = self.db.search_homologs(self.families[5], k=3)
+        
+        with mock.patch.object(MinHashIndex, 'build', side_effect=AssertionError("no debe reconstruirse")):
+            reloaded = ProteinDatabase(self.json_path)
+        self.assertEqual(reloaded.search_homologs(self.families[5], k=3), expected)
+        
+        # Las proteínas añadidas después se indexan sin reconstruir
+        reloaded.add_protein("NEW1", {"name": "Nueva", "sequence": self.families[5]})
+        self.assertEqual(reloaded.search_homologs(self.families[5], k=1)[0][0], "NEW1")
+
+
+class TestShardedSearch(unittest.TestCase):
+    """Tests para la búsqueda repartida entre procesos"""
+    
+    def setUp(self):
+        """Base de datos con variantes de dos familias y una copia local sin fragmentos"""
+        rng = random.Random(17)
+        self.bases = [''.join(rng.choice("ARNDCQEGHILKMFPSTWYV") for _ in range(length)) for length in (120, 200)]
+        proteins = {}
+        for index in range(40):
+            residues = list(self.bases[index % 2])
+            for position in rng.sample(range(len(residues)), index):
+                residues[position] = rng.choice("ARNDCQEGHILKMFPSTWYV")
+            proteins[f"S{index:03d}"] = {"name": f"Variante {index}", "sequence": ''.join(residues)}
+        
+        self.temp_dir = tempfile.mkdtemp()
+        self.json_path = write_database(self.temp_dir, proteins)
+        self.local = ProteinDatabase(self.json_path)
+        self.sharded = ProteinDatabase(self.json_path, search_shards=2)
+    
+    def tearDown(self):
+        """Detiene los procesos y limpia"""
+        self.sharded.stop_search_workers()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def assertSameResults(self, query):
+        """Ambas bases de datos devuelven lo mismo en las dos búsquedas"""
+        for min_similarity in (0.9, 0.7, 0.0):
+            with self.subTest(min_similarity=min_similarity):
+                self.assertEqual(
+                    [(uniprot_id, round(similarity, 9)) for uniprot_id, _, similarity in self.sharded.search_similar_sequences(query, min_similarity)],
+                    [(uniprot_id, round(similarity, 9)) for uniprot_id, _, similarity in self.local.search_similar_sequences(query, min_similarity)])
+                self.assertEqual(
+                    [(uniprot_id, round(similarity, 9)) for uniprot_id, _, similarity in self.sharded.search_top_k(query, 5, min_similarity)],
+                    [(uniprot_id, round(similarity, 9)) for uniprot_id, _, similarity in self.local.search_top_k(query, 5, min_similarity)])
+    
+    def test_matches_local_search(self):
+        """Test: Repartir la búsqueda no cambia los resultados"""
+        for base in self.bases:
+            self.assertSameResults(base)
+        
+        found = self.sharded.search_top_k(self.bases[0], 3, 0.5, scoring=BLOSUM62)
+        self.assertEqual([uniprot_id for uniprot_id, _, _ in found],
+                         [uniprot_id for uniprot_id, _, _ in self.local.search_top_k(self.bases[0], 3, 0.5, scoring=BLOSUM62)])
+    
+    def test_overlay_entries_are_searched(self):
+        """Test: Las entradas añadidas en ejecución se buscan en el proceso principal"""
+        for db in (self.local, self.sharded):
+            db.add_protein("NEW1", {"name": "Nueva", "sequence": self.bases[1]})
+            db.add_protein("S000", {"name": "Reemplazada", "sequence": self.bases[1][:-1]})
+        
+        self.assertSameResults(self.bases[1])
+        self.assertEqual([uniprot_id for uniprot_id, _, _ in self.sharded.search_top_k(self.bases[1], 2)], ["NEW1", "S000"])
+
+
+class TestFragmentSearch(unittest.TestCase):
+    """Tests para la búsqueda de fragmentos con el array de sufijos"""
+    
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.proteins = {
+            "P68871": {"name": "Hemoglobin subunit beta", "sequence": HEMOGLOBIN_BETA},
+            "P02144": {"name": "Myoglobin", "sequence": MYOGLOBIN},
+            "R00001": {"name": "Repetida", "sequence": "MKTAYIAKQRMKTAYIAKQR"}
+        }
+        self.json_path = write_database(self.temp_dir, self.proteins)
+    
+    def tearDown(self):
+        """Limpieza después de cada test"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_suffix_array_order(self):
+        """Test: Los sufijos quedan en orden lexicográfico, también con repeticiones largas"""
+        rng = random.Random(5)
+        block = ''.join(rng.choice("ACDE") for _ in range(40))
+        text = (block * 3 + '\x00' + ''.join(rng.choice("ACDE") for _ in range(200)) + '\x00').encode('ascii')
+        suffixes = build_suffix_array(text)
+        self.assertEqual([text[start:] for start in suffixes], sorted(text[start:] for start in range(len(text))))
+    
+    def test_finds_every_occurrence(self):
+        """Test: Devuelve todas las proteínas y desplazamientos que contienen el fragmento"""
+        db = ProteinDatabase(self.json_path)
+        
+        found = db.search_fragment(MYOGLOBIN[40:70])
+        self.assertEqual([(uniprot_id, offset) for uniprot_id, _, offset in found], [("P02144", 40)])
+        self.assertEqual([offset for _, _, offset in db.search_fragment("MKTAYIAKQR")], [0, 10])
+        self.assertEqual(len(db.search_fragment("MKTAYIAKQR", limit=1)), 1)
+        self.assertEqual(db.search_fragment("WWWWWWWW"), [])
+        
+        # Cada aparición coincide con su búsqueda directa en la secuencia
+        for uniprot_id, protein_data, offset in db.search_fragment("LV"):
+            self.assertEqual(protein_data['sequence'][offset:offset + 2], "LV")
+        self.assertEqual(len(db.search_fragment("LV")), HEMOGLOBIN_BETA.count("LV") + MYOGLOBIN.count("LV"))
+    
+    def test_index_is_saved_and_updated(self):
+        """Test: El índice se guarda junto a la base de datos y sigue a add_protein"""
+        ProteinDatabase(self.json_path)
+        self.assertTrue(suffix_array_path_for(self.json_path).exists())
+        
+        with mock.patch.object(SuffixArray, 'build') as build:
+            reloaded = ProteinDatabase(self.json_path)
+            self.assertEqual(len(reloaded.search_fragment("MKTAYIAKQR")), 2)
+        build.assert_not_called()
+        
+        reloaded.add_protein("R00001", {"name": "Reemplazada", "sequence": "GGGGMKTAYIAKQR"})
+        reloaded.add_protein("NEW1", {"name": "Nueva", "sequence": MYOGLOBIN[40:70]})
+        self.assertEqual([(uniprot_id, offset) for uniprot_id, _, offset in reloaded.search_fragment("MKTAYIAKQR")],
+                         [("R00001", 4)])
+        self.assertEqual([uniprot_id for uniprot_id, _, _ in reloaded.search_fragment(MYOGLOBIN[40:70])],
+                         ["P02144", "NEW1"])
+    
+    
+    def test_scan_without_index_matches_index(self):
+        """Test: Sin array de sufijos se recorren las secuencias con el mismo resultado"""
+        with mock.patch.object(SuffixArray, 'build', side_effect=MemoryError):
+            scanned = ProteinDatabase(self.json_path)
+        self.assertIsNone(scanned._state.fragment_index)
+        indexed = ProteinDatabase(self.json_path)
+        
+        for fragment in (MYOGLOBIN[40:70], "MKTAYIAKQR", "LV", "WWWWWWWW", ""):
+            with self.subTest(fragment=fragment):
+                self.assertEqual(scanned.search_fragment(fragment), indexed.search_fragment(fragment))
+        self.assertEqual(scanned.search_fragment("LV", limit=3), indexed.search_fragment("LV", limit=3))
+    
+    def test_reload_prepares_index(self):
+        """Test: La recarga prepara el array de sufijos aunque aún no se haya buscado ningún fragmento"""
+        db = ProteinDatabase(self.json_path)
+        self.proteins["NEW1"] = {"name": "Nueva", "sequence": MYOGLOBIN[40:70]}
+        write_database(self.temp_dir, self.proteins)
+        os.utime(self.json_path, (time.time(), time.time() + 10))
+        
+        self.assertTrue(db.reload())
+        self.assertIsNotNone(db._state.fragment_index)
+        with mock.patch.object(SuffixArray, 'build') as build:
+            self.assertEqual([uniprot_id for uniprot_id, _, _ in db.search_fragment(MYOGLOBIN[40:70])],
+                             ["P02144", "NEW1"])
+        build.assert_not_called()
+
+
+class TestProteinLog(unittest.TestCase):
+    """Tests para el registro persistente de add_protein"""
+    
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.json_path = write_database(self.temp_dir, {
+            "P68871": {"name": "Hemoglobin subunit beta", "sequence": HEMOGLOBIN_BETA},
+            "P02144": {"name": "Myoglobin", "sequence": MYOGLOBIN}
+        })
+        self.log_path = log_path_for(self.json_path)
+    
+    def tearDown(self):
+        """Limpieza después de cada test"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_added_proteins_survive_restart(self):
+        """Test: Las proteínas añadidas se recuperan al volver a cargar, incluida una línea final incompleta"""
+        db = ProteinDatabase(self.json_path)
+        db.add_protein("NEW1", {"name": "Nueva", "sequence": "MKTAYIAKQR"})
+        db.add_protein("P02144", {"name": "Myoglobin", "sequence": MYOGLOBIN[:-1]})
+        db.add_protein("NEW1", {"name": "Nueva v2", "sequence": "MKTAYIAKQRQ"})
+        self.assertFalse(db.check_for_updates())
+        with open(self.log_path, 'ab') as f:
+            f.write(b'{"id": "CUT", "prot')
+        
+        restarted = ProteinDatabase(self.json_path)
+        self.assertEqual(len(restarted.proteins), 3)
+        self.assertEqual(restarted.get_protein_info("NEW1")['name'], "Nueva v2")
+        self.assertEqual(restarted.search_exact_match("MKTAYIAKQRQ")[0], "NEW1")
+        self.assertIsNone(restarted.search_exact_match(MYOGLOBIN))
+        self.assertEqual(restarted.search_top_k(MYOGLOBIN[:-1], k=1)[0][0], "P02144")
+    
+    def test_compaction_moves_entries_to_store(self):
+        """Test: Compactar pasa las entradas nuevas al almacén sin reconstruir los índices"""
+        db = ProteinDatabase(self.json_path)
+        db.search_top_k(MYOGLOBIN, k=1)
+        db.add_protein("NEW1", {"name": "Nueva", "sequence": "MKTAYIAKQR"})
+        db.add_protein("NEW2", {"name": "Nueva 2", "sequence": "A" + MYOGLOBIN[1:]})
+        db.add_protein("P02144", {"name": "Myoglobin", "sequence": MYOGLOBIN[:-1]})
+        
+        with mock.patch.object(SequenceMatrix, 'build') as build:
+            self.assertEqual(db.compact_log(), {'moved': 2, 'kept': 1})
+            self.assertEqual(set(db.proteins.overlay), {"P02144"})
+            self.assertEqual(db.search_exact_match("MKTAYIAKQR")[0], "NEW1")
+            self.assertEqual([uniprot_id for uniprot_id, _, _ in db.search_top_k(MYOGLOBIN, k=2, min_similarity=0.9)],
+                             ["P02144", "NEW2"])
+        build.assert_not_called()
+        self.assertFalse(db.check_for_updates())
+        
+        with open(self.log_path, encoding='utf-8') as f:
+            self.assertEqual([json.loads(line)['id'] for line in f], ["P02144"])
+        restarted = ProteinDatabase(self.json_path)
+        self.assertEqual(dict(restarted.proteins.items()), dict(db.proteins.items()))
+        self.assertEqual(len(restarted.proteins), 4)
+
+
+class TestDatabaseStatistics(unittest.TestCase):
+    """Tests para las estadísticas mantenidas de forma incremental"""
+    
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.json_path = write_database(self.temp_dir, {
+            "P68871": {"name": "Hemoglobin subunit beta", "organism": "Homo sapiens", "sequence": HEMOGLOBIN_BETA},
+            "P02144": {"name": "Myoglobin", "organism": "Homo sapiens", "sequence": MYOGLOBIN},
+            "A00001": {"name": "Corta", "sequence": "MKTAYIAKQR"}
+        })
+    
+    def tearDown(self):
+        """Limpieza después de cada test"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def expected(self, proteins):
+        """Estadísticas calculadas recorriendo todas las entradas"""
+        lengths = [len(protein_data['sequence']) for protein_data in proteins.values()]
+        organisms = {}
+        for protein_data in proteins.values():
+            organism = protein_data.get('organism', 'Unknown')
+            organisms[organism] = organisms.get(organism, 0) + 1
+        return {'total_proteins': len(lengths), 'avg_length': sum(lengths) / len(lengths),
+                'min_length': min(lengths), 'max_length': max(lengths), 'organisms': sorted(organisms),
+                'organism_counts': organisms}
+    
+    def assertMatchesScan(self, db):
+        """Las estadísticas coinciden con un recorrido completo"""
+        stats = db.get_statistics()
+        expected = self.expected(db.proteins)
+        self.assertEqual({key: stats[key] for key in expected if key != 'avg_length'},
+                         {key: value for key, value in expected.items() if key != 'avg_length'})
+        self.assertAlmostEqual(stats['avg_length'], expected['avg_length'])
+        self.assertEqual(sum(bin_['count'] for bin_ in stats['length_histogram']), len(db.proteins))
+    
+    def test_statistics_follow_changes(self):
+        """Test: Las estadísticas se mantienen al añadir, reemplazar e importar"""
+        db = ProteinDatabase(self.json_path)
+        self.assertMatchesScan(db)
+        self.assertEqual(db.get_statistics()['length_histogram'][0], {'min': 0, 'max': 49, 'count': 1})
+        self.assertIs(db.get_statistics(), db.get_statistics())
+        
+        db.add_protein("A00001", {"name": "Larga", "organism": "Mus musculus", "sequence": "M" * 6000})
+        db.add_protein("NEW1", {"name": "Nueva", "organism": "Mus musculus", "sequence": "MKTAYIAKQRQ"})
+        self.assertMatchesScan(db)
+        self.assertEqual(db.get_statistics()['max_length'], 6000)
+        
+        db.add_protein("A00001", {"name": "Corta", "sequence": "MKTAY"})
+        self.assertMatchesScan(db)
+        self.assertEqual(db.get_statistics()['max_length'], len(MYOGLOBIN))
+        self.assertEqual(db.get_statistics()['min_length'], 5)
+        
+        db.import_proteins([("IMP1", {"name": "Importada", "organism": "Mus musculus", "sequence": "MKTAYIAKQRQRS"})])
+        self.assertMatchesScan(db)
+        self.assertMatchesScan(ProteinDatabase(self.json_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,6 +6,7 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from src.business.sequence_service import SequenceValidator, SequenceComparisonService, SequenceValidationError
+from src.data.protein_sequence import ProteinSequence
 
 class TestSequenceValidator(unittest.TestCase):
     """Tests para las reglas de negocio de validación de secuencias"""
@@ -129,6 +130,37 @@ class TestSequenceValidator(unittest.TestCase):
         self.assertEqual(differences[0], (1, 'A', 'G'))
         self.assertEqual(differences[1], (4, 'D', 'G'))
     
+    def test_find_differences_batch(self):
+        """Test: Diferencias de varios pares en una sola llamada"""
+        # Arrange
+        pairs = [
+            ("ARNDCQ", "GRNGCQ"),
+            ("ARNDCQ", "ARNDCQ"),
+            ("MVHLTPEEK", "MVHLTPVEK"),
+            ("ARNDCQ", "ARND"),  # Como zip(): solo hasta la longitud menor
+        ]
+
+        # Act
+        batch = SequenceValidator.find_differences_batch(pairs)
+
+        # Assert
+        self.assertEqual(batch, [
+            [(1, 'A', 'G'), (4, 'D', 'G')],
+            [],
+            [(7, 'E', 'V')],
+            [],
+        ])
+        for (original, mutated), differences in zip(pairs, batch):
+            self.assertEqual(SequenceValidator.find_differences(original, mutated), differences)
+
+    def test_find_differences_non_ascii(self):
+        """Test: Caracteres no ASCII conservan su posición"""
+        # Arrange & Act
+        differences = SequenceValidator.find_differences("AÑDC", "AÑGC")
+
+        # Assert
+        self.assertEqual(differences, [(3, 'D', 'G')])
+
     def test_validate_mutation_count_valid(self):
         """Test: Número válido de mutaciones (1-2)"""
         # Arrange
@@ -303,6 +335,151 @@ class TestSequenceComparisonService(unittest.TestCase):
         self.assertEqual(result['mutated_sequence'], "GRNDCQ")
         self.assertEqual(result['mutations']['description'], "A1G")
 
+    BATCH_PAIRS = [
+        ("ARNDCQ", "GRNDCQ"),      # válida
+        ("ARNDCQ", "GRNGKQ"),      # demasiadas mutaciones
+        ("ARNDCQ", "ARNDCQG"),     # longitudes distintas
+        ("ARNDCQ", "XRNDZQ"),      # caracteres inválidos
+        ("AÑNDCQ", "ARNDCQ"),      # carácter no ASCII
+        ("ARNDCQ", "ARNDCQ"),      # sin diferencias
+        ("", "ARNDCQ"),            # secuencia vacía
+        ("a r n d c q", "grngcq"), # limpieza
+    ]
+
+    def _assert_matches_single_path(self, pairs, results):
+        self.assertEqual(len(results), len(pairs))
+        for (original, mutated), compact in zip(pairs, results):
+            single = self.service.validate_and_compare_sequences(original, mutated)
+            self.assertEqual(compact['valid'], single['valid'])
+            self.assertEqual(compact['errors'], single['errors'])
+            self.assertEqual(compact['sequence_length'], single['sequence_length'])
+            if single['valid']:
+                self.assertEqual(
+                    SequenceValidator.get_mutation_summary(compact['differences']),
+                    single['mutations']
+                )
+                self.assertEqual(compact['description'], single['mutations']['description'])
+
+    def test_validate_and_compare_many_matches_single_path(self):
+        """Test: El lote produce los mismos resultados y errores que el flujo individual"""
+        # Act: lotes pequeños para cruzar límites de lote, con un generador
+        results = list(self.service.validate_and_compare_many(
+            (pair for pair in self.BATCH_PAIRS), chunk_size=3
+        ))
+
+        # Assert
+        self._assert_matches_single_path(self.BATCH_PAIRS, results)
+
+    def test_validate_and_compare_many_process_pool(self):
+        """Test: El reparto en procesos conserva el orden y los resultados"""
+        # Arrange
+        pairs = self.BATCH_PAIRS * 5
+
+        # Act
+        results = list(self.service.validate_and_compare_many(pairs, chunk_size=4, processes=2))
+
+        # Assert
+        self._assert_matches_single_path(pairs, results)
+
+class TestAlignmentMode(unittest.TestCase):
+    """Tests para el modo de alineamiento con inserciones y deleciones"""
+
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        self.service = SequenceComparisonService(max_mutations=2, alignment_mode=True, expected_indels=3)
+
+    def test_deletion(self):
+        """Test: Deleción de un residuo"""
+        # Act
+        result = self.service.validate_and_compare_sequences("MVHLTPEEKS", "MVHLTPEKS")
+
+        # Assert
+        self.assertTrue(result['valid'])
+        self.assertEqual(result['sequence_length'], 10)
+        mutation = result['mutations']['mutations'][0]
+        self.assertEqual(mutation['mutation_type'], 'deletion')
+        self.assertEqual(mutation['original_amino_acid'], 'E')
+        self.assertEqual(mutation['mutated_amino_acid'], '-')
+        self.assertIn(mutation['mutation_notation'], ("E7del", "E8del"))
+
+    def test_insertion_and_substitution(self):
+        """Test: Inserción y sustitución en la misma comparación"""
+        # Act
+        result = self.service.validate_and_compare_sequences("ARNDCQEGHI", "GRNDWCQEGHI")
+
+        # Assert
+        self.assertTrue(result['valid'])
+        self.assertEqual(result['mutations']['description'], "A1G, 4_5insW")
+        types = [m['mutation_type'] for m in result['mutations']['mutations']]
+        self.assertEqual(types, ['substitution', 'insertion'])
+
+    def test_equal_length_substitutions_match_positional_diff(self):
+        """Test: Sin indels el alineamiento coincide con la comparación posicional"""
+        # Arrange
+        original = "MVHLTPEEKSAVTALWGKVNVDEVGGEALGRLLVVYPWTQRFFESFGDLSTPDAVMGNPKVKAHGKKVLGAF"
+        mutated = original[:5] + "V" + original[6:40] + "W" + original[41:]
+
+        # Act
+        aligned = self.service.validate_and_compare_sequences(original, mutated)
+        positional = SequenceComparisonService().validate_and_compare_sequences(original, mutated)
+
+        # Assert
+        self.assertEqual(aligned['mutations'], positional['mutations'])
+
+    def test_too_many_indels(self):
+        """Test: Los indels cuentan para el máximo de mutaciones"""
+        # Act
+        result = self.service.validate_and_compare_sequences("ARNDCQEGHI", "ARNEGHI")
+
+        # Assert
+        self.assertFalse(result['valid'])
+        self.assertIn('Demasiadas mutaciones encontradas: 3', str(result['errors']))
+
+class TestProteinSequence(unittest.TestCase):
+    """Tests para el tipo de valor compartido ProteinSequence"""
+    
+    def test_shared_instance(self):
+        """Test: La misma secuencia devuelve la misma instancia y sus datos derivados"""
+        # Arrange
+        sequence = "MVHLTPEEKSAVTALWGKV"
+        
+        # Act
+        first = ProteinSequence.of(sequence)
+        second = ProteinSequence.from_raw(" mvhltpeek savtalwgkv\n")
+        
+        # Assert
+        self.assertIs(first, second)
+        self.assertIs(ProteinSequence.of(first), first)
+        self.assertIs(first.composition, second.composition)
+    
+    def test_derived_values(self):
+        """Test: Codificación, composición y digest coinciden con el cálculo directo"""
+        import hashlib
+        
+        # Arrange
+        protein = ProteinSequence.of("AAGCW")
+        
+        # Assert
+        self.assertEqual(protein.codes.tolist(), [ord(aa) for aa in "AAGCW"])
+        self.assertEqual(protein.count('A'), 2)
+        self.assertEqual(int(protein.composition.sum()), 5)
+        self.assertEqual(protein.digest, hashlib.md5(b"AAGCW").hexdigest())
+        self.assertEqual(protein.matches(ProteinSequence.of("AAGCY")), 4)
+    
+    def test_non_ascii_not_in_composition(self):
+        """Test: Los caracteres no ASCII no entran en la composición pero sí en count"""
+        protein = ProteinSequence.of("AÁGÁ")
+        
+        self.assertEqual(int(protein.composition.sum()), 2)
+        self.assertEqual(int(protein.composition[ord('Á')]), 0)
+        self.assertEqual(protein.count('Á'), 2)
+        self.assertEqual(protein.count('A'), 1)
+    
+    def test_slots(self):
+        """Test: Las instancias no tienen __dict__"""
+        with self.assertRaises(AttributeError):
+            ProteinSequence.of("AAGCW").extra = 1
+
 if __name__ == '__main__':
     # Configurar y ejecutar los tests
     unittest.main(verbosity=2)